@@ -0,0 +1,3 @@
+"""
+Benchmarks and performance reports for server and AI
+"""
@@ -0,0 +1,360 @@
+"""
+ChessAI search benchmark
+Lets the AI play a few moves from test positions at a fixed depth and
+reports nodes per move, search speed, transposition table hit rate and
+first-move cutoff rate, for the full search and with parts switched off;
+--latency times get_move at each difficulty's budget, --eval times one
+leaf evaluation, --ui measures how long a 20 ms UI tick stalls while the
+AI thinks, --ponder compares thinking time and depth with pondering on
+and off against an opponent who thinks as long, and --match plays the
+full search against a variant at an equal node budget
+"""
+
+import argparse
+import json
+import sys
+import os
+import time
+
+import chess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from client.ai.chess_ai import ChessAI, SEARCH_LIMITS, PIECE_VALUES
+from client.ai.transposition import DEFAULT_TT_ENTRIES
+
+POSITIONS = {
+    "opening": chess.STARTING_FEN,
+    "italian": "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "middlegame": "r3k2r/pp1n1ppp/2p1pn2/q7/1bPP4/2N1PN2/P2B1PPP/R2QKB1R w KQkq - 0 10",
+    "endgame": "8/5pk1/6p1/3R4/7P/6P1/r4PK1/8 w - - 0 40",
+}
+
+
+# Search variants compared at equal depth: name -> ChessAI options
+VARIANTS = {
+    "full": {},
+    "no_ordering": {"move_ordering": False},
+    "no_tt": {"tt_entries": 0},
+    "no_quiescence": {"quiescence": False},
+    "scan_eval": {"incremental_eval": False},
+    "no_null_move": {"null_move": False},
+    "no_lmr": {"lmr": False},
+    "no_futility": {"futility": False},
+    "no_pvs": {"pvs": False},
+    "no_aspiration": {"aspiration": False},
+    "no_selectivity": {"null_move": False, "lmr": False, "futility": False, "pvs": False,
+                       "aspiration": False},
+}
+
+# Match openings, each played once with either color
+OPENINGS = [
+    chess.STARTING_FEN,
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkb1r/pppp1ppp/5n2/4p3/2P5/2N5/PP1PPPPP/R1BQKBNR w KQkq - 2 3",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "rnbqkb1r/ppp1pppp/5n2/3p4/3P4/5N2/PPP1PPPP/RNBQKB1R w KQkq - 2 3",
+    "rnbqkbnr/pp2pppp/2p5/3p4/3PP3/8/PPP2PPP/RNBQKBNR w KQkq - 0 3",
+]
+ADJUDICATE_MARGIN = 300  # Material lead that wins a game cut off at max plies
+
+
+def play(fen: str, plies: int, depth: int, **options) -> dict:
+    """Let one AI play both sides for `plies` moves from a position"""
+    ai = ChessAI('hard', **options)
+    board = chess.Board(fen)
+    nodes = []
+    hit_rates = []
+    cutoff_rates = []
+    elapsed = 0.0
+    for _ in range(plies):
+        if board.is_game_over():
+            break
+        start = time.perf_counter()
+        move = ai._get_minimax_move(board, depth)
+        elapsed += time.perf_counter() - start
+        nodes.append(ai.last_search["nodes"])
+        hit_rates.append(ai.last_search["tt_hit_rate"])
+        cutoff_rates.append(ai.last_search["first_move_cutoff_rate"])
+        board.push(move)
+    moves = len(nodes)
+    return {
+        "moves": moves,
+        "nodes_per_move": sum(nodes) / moves if moves else 0.0,
+        "ms_per_move": elapsed / moves * 1e3 if moves else 0.0,
+        "nps": sum(nodes) / elapsed if elapsed else 0.0,
+        "tt_hit_rate": sum(hit_rates) / moves if moves else 0.0,
+        "first_move_cutoff_rate": sum(cutoff_rates) / moves if moves else 0.0,
+    }
+
+
+def run(plies: int, depth: int, tt_entries: int = DEFAULT_TT_ENTRIES) -> dict:
+    """Benchmark every position with each search variant"""
+    variants = dict(VARIANTS)
+    variants["full"] = {"tt_entries": tt_entries}
+    return {
+        "depth": depth,
+        "plies": plies,
+        "positions": {
+            name: {variant: play(fen, plies, depth, **options)
+                   for variant, options in variants.items()}
+            for name, fen in POSITIONS.items()
+        },
+    }
+
+
+def material(board: chess.Board) -> int:
+    """White's material lead"""
+    return sum(PIECE_VALUES[piece.piece_type] * (1 if piece.color == chess.WHITE else -1)
+               for piece in board.piece_map().values() if piece.piece_type != chess.KING)
+
+
+def play_game(white: ChessAI, black: ChessAI, fen: str, max_plies: int) -> float:
+    """White's score in one game, adjudicated on material after max_plies"""
+    white.new_game()
+    black.new_game()
+    board = chess.Board(fen)
+    while not board.is_game_over(claim_draw=True) and board.ply() < max_plies:
+        player = white if board.turn == chess.WHITE else black
+        board.push(player.get_move(board))
+    if board.is_checkmate():
+        return 0.0 if board.turn == chess.WHITE else 1.0
+    if board.is_game_over(claim_draw=True):
+        return 0.5
+    lead = material(board)
+    return 1.0 if lead >= ADJUDICATE_MARGIN else 0.0 if lead <= -ADJUDICATE_MARGIN else 0.5
+
+
+def match(variant: str, games: int, node_limit: int, max_plies: int) -> dict:
+    """Full search against a variant, both limited to node_limit nodes per move"""
+    full = ChessAI('hard', node_limit=node_limit, time_limit=float('inf'))
+    other = ChessAI('hard', node_limit=node_limit, time_limit=float('inf'),
+                    **VARIANTS[variant])
+    wins = draws = losses = 0
+    for game in range(games):
+        fen = OPENINGS[game // 2 % len(OPENINGS)]
+        if game % 2 == 0:
+            score = play_game(full, other, fen, max_plies)
+        else:
+            score = 1.0 - play_game(other, full, fen, max_plies)
+        wins += score == 1.0
+        draws += score == 0.5
+        losses += score == 0.0
+    return {
+        "variant": variant,
+        "games": games,
+        "node_limit": node_limit,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "score": (wins + draws / 2) / games if games else 0.0,
+    }
+
+
+def latency(plies: int) -> dict:
+    """Time get_move under each difficulty's default budget"""
+    report = {}
+    for difficulty in SEARCH_LIMITS:
+        times, depths = [], []
+        for fen in POSITIONS.values():
+            ai = ChessAI(difficulty)
+            board = chess.Board(fen)
+            for _ in range(plies):
+                if board.is_game_over():
+                    break
+                start = time.perf_counter()
+                board.push(ai.get_move(board))
+                times.append(time.perf_counter() - start)
+                depths.append(ai.last_search["depth"])
+        report[difficulty] = {
+            "budget_s": SEARCH_LIMITS[difficulty][1],
+            "moves": len(times),
+            "mean_ms": sum(times) / len(times) * 1e3,
+            "max_ms": max(times) * 1e3,
+            "min_depth": min(depths),
+            "max_depth": max(depths),
+        }
+    return report
+
+
+def leaf_cost(repeats: int) -> dict:
+    """Microseconds per static evaluation, incremental against a full scan"""
+    incremental, scan = ChessAI('hard'), ChessAI('hard', incremental_eval=False)
+    report = {}
+    for name, fen in POSITIONS.items():
+        board = chess.Board(fen)
+        incremental.evaluator.reset(board)
+        timings = {}
+        for label, ai in (("incremental_us", incremental), ("scan_us", scan)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                ai._evaluate_board(board)
+            timings[label] = (time.perf_counter() - start) / repeats * 1e6
+        timings["speedup"] = timings["scan_us"] / timings["incremental_us"]
+        report[name] = timings
+    return report
+
+
+def ui_stall(budget: float, tick: float = 0.02) -> dict:
+    """Longest gap between UI ticks during a search, blocking and in the background"""
+    board = chess.Board(POSITIONS["middlegame"])
+    
+    # Blocking: the UI loop gets control back only when get_move returns
+    ai = ChessAI('hard', time_limit=budget)
+    start = time.perf_counter()
+    ai.get_move(board)
+    blocking = time.perf_counter() - start
+    
+    ai = ChessAI('hard', time_limit=budget)
+    handle = ai.start_search(board)
+    gaps = []
+    last = time.perf_counter()
+    while not handle.done():
+        time.sleep(tick)
+        now = time.perf_counter()
+        gaps.append(now - last - tick)
+        last = now
+    return {
+        "budget_s": budget,
+        "blocking_stall_ms": blocking * 1e3,
+        "background_max_stall_ms": max(gaps) * 1e3,
+        "background_mean_stall_ms": sum(gaps) / len(gaps) * 1e3,
+        "ticks": len(gaps),
+    }
+
+
+def ponder_gain(moves: int, budget: float) -> dict:
+    """Thinking time and depth per move with and without pondering"""
+    report = {}
+    for pondering in (False, True):
+        ai = ChessAI('hard', time_limit=budget)
+        opponent = ChessAI('hard', time_limit=budget / 4)
+        board = chess.Board(POSITIONS["italian"])
+        think, depths, hit_think = [], [], []
+        for _ in range(moves):
+            if board.is_game_over():
+                break
+            hits = ai.ponder_hits
+            board.push(ai.get_move(board))
+            think.append(ai.last_search["time_s"])
+            depths.append(ai.last_search["depth"])
+            if ai.ponder_hits > hits:
+                hit_think.append(think[-1])
+            if board.is_game_over():
+                break
+            reply = opponent.get_move(board)
+            if pondering:
+                ai.ponder(board)
+            time.sleep(budget)  # The opponent's thinking time
+            board.push(reply)
+        ai.cancel_search()
+        report["ponder" if pondering else "no_ponder"] = {
+            "moves": len(think),
+            "think_s": sum(think) / len(think),
+            "hit_think_s": sum(hit_think) / len(hit_think) if hit_think else 0.0,
+            "mean_depth": sum(depths) / len(depths),
+            "ponder_hits": ai.ponder_hits,
+            "ponder_misses": ai.ponder_misses,
+        }
+    return report
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--plies", type=int, default=6, help="Moves searched per position")
+    parser.add_argument("--tt-entries", type=int, default=DEFAULT_TT_ENTRIES)
+    parser.add_argument("--latency", action="store_true",
+                        help="Time get_move per difficulty instead of fixed-depth searches")
+    parser.add_argument("--eval", action="store_true",
+                        help="Time one leaf evaluation per position, incremental and full scan")
+    parser.add_argument("--ui", action="store_true",
+                        help="Measure UI tick stalls while searching, blocking and in the "
+                             "background")
+    parser.add_argument("--ponder", action="store_true",
+                        help="Compare thinking time per move with pondering on and off")
+    parser.add_argument("--match", choices=[name for name in VARIANTS if name != "full"],
+                        help="Play the full search against this variant")
+    parser.add_argument("--games", type=int, default=12)
+    parser.add_argument("--nodes", type=int, default=1500, help="Node budget per move in --match")
+    parser.add_argument("--max-plies", type=int, default=120)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    if args.match:
+        report = match(args.match, args.games, args.nodes, args.max_plies)
+        if args.json:
+            print(json.dumps(report))
+            return
+        print(f"⚔️  full vs {report['variant']} ({report['games']} games, "
+              f"{report['node_limit']} nodes per move)")
+        print(f"   +{report['wins']} ={report['draws']} -{report['losses']}  "
+              f"score {report['score']:.1%} for the full search")
+        return
+    
+    if args.eval:
+        report = leaf_cost(20000)
+        if args.json:
+            print(json.dumps(report))
+            return
+        print("🧮 Leaf evaluation cost")
+        for name, result in report.items():
+            print(f"   {name:12s} incremental {result['incremental_us']:6.1f} us  "
+                  f"scan {result['scan_us']:6.1f} us  {result['speedup']:5.1f}x")
+        return
+    
+    if args.ui:
+        report = ui_stall(SEARCH_LIMITS['hard'][1])
+        if args.json:
+            print(json.dumps(report))
+            return
+        print(f"🖥️  UI stalls during a {report['budget_s']:.1f} s search")
+        print(f"   blocking get_move     {report['blocking_stall_ms']:7.1f} ms")
+        print(f"   background search     max {report['background_max_stall_ms']:5.1f} ms  "
+              f"mean {report['background_mean_stall_ms']:5.1f} ms over {report['ticks']} ticks")
+        return
+    
+    if args.ponder:
+        report = ponder_gain(args.plies * 2, SEARCH_LIMITS['medium'][1])
+        if args.json:
+            print(json.dumps(report))
+            return
+        print(f"💭 Pondering ({SEARCH_LIMITS['medium'][1]:.1f} s per move, "
+              f"as long for the opponent)")
+        for mode, result in report.items():
+            print(f"   {mode:10s} think {result['think_s']:5.2f} s "
+                  f"({result['hit_think_s']:4.2f} s on hits)  depth {result['mean_depth']:4.1f}  "
+                  f"hits {result['ponder_hits']}/{result['ponder_hits'] + result['ponder_misses']}")
+        return
+    
+    if args.latency:
+        report = latency(args.plies)
+        if args.json:
+            print(json.dumps(report))
+            return
+        print(f"⏱️  get_move latency ({args.plies} moves per position)")
+        for difficulty, result in report.items():
+            print(f"   {difficulty:8s} budget {result['budget_s']:4.1f} s  "
+                  f"mean {result['mean_ms']:7.1f} ms  max {result['max_ms']:7.1f} ms  "
+                  f"depth {result['min_depth']}-{result['max_depth']}")
+        return
+    
+    report = run(args.plies, args.depth, args.tt_entries)
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"🤖 ChessAI search (depth {report['depth']}, {report['plies']} moves per position)")
+    print(f"   {'position':12s} {'variant':14s} {'nodes/move':>11s} {'ms/move':>9s} "
+          f"{'nodes/s':>8s} {'TT hits':>8s} {'1st cut':>8s}")
+    for name, result in report["positions"].items():
+        for variant, stats in result.items():
+            print(f"   {name:12s} {variant:14s} {stats['nodes_per_move']:11.0f} "
+                  f"{stats['ms_per_move']:9.1f} {stats['nps']:8.0f} {stats['tt_hit_rate']:8.1%} "
+                  f"{stats['first_move_cutoff_rate']:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
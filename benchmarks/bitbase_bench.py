@@ -0,0 +1,126 @@
+"""
+Endgame bitbase benchmark
+Times generating and probing the KPK, KRK and KQK bitbases, then plays
+won endings out with and without them, counting the plies to the win
+"""
+
+import argparse
+import json
+import random
+import sys
+import os
+import tempfile
+import time
+
+import chess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from client.ai.bitbase import BITBASE_NAMES, LOAD_ORDER, Bitbases, get_bitbases
+from client.ai.chess_ai import ChessAI
+
+ENDINGS = {
+    "KQK": "8/8/8/4k3/8/8/8/KQ6 w - - 0 1",
+    "KRK": "8/8/8/4k3/8/8/8/R3K3 w - - 0 1",
+    "KPK": "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1",
+}
+
+
+def random_positions(piece_type: chess.PieceType, count: int, rng: random.Random) -> list:
+    """Legal positions of king and piece against king"""
+    positions = []
+    while len(positions) < count:
+        board = chess.Board(None)
+        strong_king, weak_king, square = rng.sample(chess.SQUARES, 3)
+        strong = rng.random() < 0.5
+        board.set_piece_at(strong_king, chess.Piece(chess.KING, strong))
+        board.set_piece_at(weak_king, chess.Piece(chess.KING, not strong))
+        board.set_piece_at(square, chess.Piece(piece_type, strong))
+        board.turn = rng.random() < 0.5
+        if board.is_valid():
+            positions.append(board)
+    return positions
+
+
+def play_out(fen: str, bitbases: bool, nodes: int, max_plies: int) -> dict:
+    """Play an ending to its end, the defender always using the bitbases"""
+    attacker = ChessAI('hard', node_limit=nodes, time_limit=5.0, bitbases=bitbases)
+    defender = ChessAI('hard', node_limit=nodes, time_limit=5.0)
+    board = chess.Board(fen)
+    strong = board.turn
+    start = time.perf_counter()
+    while not board.is_game_over(claim_draw=True) and board.ply() < max_plies:
+        board.push((attacker if board.turn == strong else defender).get_move(board))
+    return {
+        "plies": board.ply(),
+        "result": board.result(claim_draw=True),
+        "time_s": time.perf_counter() - start,
+    }
+
+
+def run(probes: int, nodes: int, max_plies: int, seed: int = 1) -> dict:
+    """Generate the tables, time probes and play the endings out"""
+    bitbases = Bitbases(tempfile.mkdtemp())
+    generate_s = {}
+    for piece_type in LOAD_ORDER:
+        start = time.perf_counter()
+        bitbases.table(piece_type)
+        generate_s[BITBASE_NAMES[piece_type]] = time.perf_counter() - start
+    start = time.perf_counter()
+    Bitbases(bitbases.directory).table(chess.PAWN)
+    load_ms = (time.perf_counter() - start) * 1e3
+    
+    rng = random.Random(seed)
+    positions = [board for piece_type in BITBASE_NAMES
+                 for board in random_positions(piece_type, 1000, rng)]
+    start = time.perf_counter()
+    for i in range(probes):
+        bitbases.probe(positions[i % len(positions)])
+    probe_us = (time.perf_counter() - start) / probes * 1e6
+    bitbases.close()
+    
+    get_bitbases().warm_up().join()  # The tables the AI plays with
+    endings = {}
+    for name, fen in ENDINGS.items():
+        endings[name] = {label: play_out(fen, enabled, nodes, max_plies)
+                         for label, enabled in (("bitbases", True), ("search_only", False))}
+    return {
+        "generate_s": generate_s,
+        "table_bytes": os.path.getsize(bitbases.path(chess.PAWN)),
+        "load_ms": load_ms,
+        "probe_us": probe_us,
+        "nodes": nodes,
+        "endings": endings,
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--probes", type=int, default=100000)
+    parser.add_argument("--nodes", type=int, default=3000, help="Node budget per move")
+    parser.add_argument("--max-plies", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = run(args.probes, args.nodes, args.max_plies, args.seed)
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"📚 Endgame bitbases ({report['table_bytes'] // 1024} KiB each)")
+    for name, seconds in report["generate_s"].items():
+        print(f"   Generate {name}:            {seconds:8.2f} s")
+    print(f"   Map an existing table:   {report['load_ms']:8.2f} ms")
+    print(f"   Probe:                   {report['probe_us']:8.2f} us")
+    print(f"\n♟️  Won endings played out ({report['nodes']} nodes per move)")
+    for name, runs in report["endings"].items():
+        for label, outcome in runs.items():
+            print(f"   {name} {label:<12} {outcome['result']:>7} after {outcome['plies']:3d} plies "
+                  f"({outcome['time_s']:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Opening book benchmark
+Builds a Polyglot book from a generated PGN collection, then times book
+probes against the search ChessAI would otherwise run for the same
+opening positions
+"""
+
+import argparse
+import json
+import random
+import sys
+import os
+import tempfile
+import time
+
+import chess
+import chess.pgn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from client.ai.chess_ai import ChessAI
+from client.ai.opening_book import OpeningBook, build_book
+
+
+def write_games(path: str, games: int, plies: int, seed: int):
+    """PGN of games that follow a few main lines, then wander off at random"""
+    rng = random.Random(seed)
+    lines = [["e2e4", "e7e5", "g1f3", "b8c6"], ["e2e4", "c7c5", "g1f3"],
+             ["d2d4", "d7d5", "c2c4"], ["d2d4", "g8f6", "c2c4", "e7e6"], ["c2c4", "e7e5"]]
+    with open(path, 'w') as pgn:
+        for _ in range(games):
+            board = chess.Board()
+            line = rng.choice(lines)
+            for ply in range(plies):
+                if ply < len(line) and rng.random() < 0.9:
+                    move = chess.Move.from_uci(line[ply])
+                    if not board.is_legal(move):
+                        move = rng.choice(list(board.legal_moves))
+                else:
+                    move = rng.choice(list(board.legal_moves))
+                board.push(move)
+                if board.is_game_over():
+                    break
+            game = chess.pgn.Game.from_board(board)
+            game.headers["Result"] = rng.choice(["1-0", "0-1", "1/2-1/2"])
+            print(game, file=pgn, end="\n\n")
+
+
+def run(games: int, plies: int, probes: int, seed: int = 1) -> dict:
+    """Build a book and time probes against searches"""
+    directory = tempfile.mkdtemp()
+    pgn_path = os.path.join(directory, "games.pgn")
+    book_path = os.path.join(directory, "book.bin")
+    write_games(pgn_path, games, plies, seed)
+    
+    start = time.perf_counter()
+    entries = build_book([pgn_path], book_path, plies)
+    build_s = time.perf_counter() - start
+    
+    book = OpeningBook(book_path)
+    rng = random.Random(seed)
+    positions = [chess.Board()]
+    for moves in (["e2e4"], ["e2e4", "e7e5"], ["d2d4", "d7d5"], ["e2e4", "c7c5", "g1f3"]):
+        board = chess.Board()
+        for uci in moves:
+            board.push_uci(uci)
+        positions.append(board)
+    misses = [chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")]
+    
+    start = time.perf_counter()
+    for i in range(probes):
+        book.choose(positions[i % len(positions)], rng)
+    hit_us = (time.perf_counter() - start) / probes * 1e6
+    start = time.perf_counter()
+    for _ in range(probes):
+        book.choose(misses[0], rng)
+    miss_us = (time.perf_counter() - start) / probes * 1e6
+    
+    ai = ChessAI('medium')
+    start = time.perf_counter()
+    for board in positions:
+        ai._get_minimax_move(board, 2, time_limit=0.5)
+    search_ms = (time.perf_counter() - start) / len(positions) * 1e3
+    book.close()
+    
+    return {
+        "games": games,
+        "entries": entries,
+        "book_bytes": os.path.getsize(book_path),
+        "build_s": build_s,
+        "probe_hit_us": hit_us,
+        "probe_miss_us": miss_us,
+        "search_ms": search_ms,
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--plies", type=int, default=16)
+    parser.add_argument("--probes", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = run(args.games, args.plies, args.probes, args.seed)
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"📖 Opening book ({report['games']} games, {report['entries']} entries, "
+          f"{report['book_bytes'] / 1024:.0f} KiB, built in {report['build_s']:.1f} s)")
+    print(f"   Probe, position in book:    {report['probe_hit_us']:8.1f} us")
+    print(f"   Probe, position not in it:  {report['probe_miss_us']:8.1f} us")
+    print(f"   Medium search instead:      {report['search_ms'] * 1e3:8.0f} us")
+
+
+if __name__ == "__main__":
+    main()
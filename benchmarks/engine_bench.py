@@ -0,0 +1,276 @@
+"""
+ChessEngine benchmark suite
+Perft, make/undo/redo throughput, legal move latency and replay speed
+
+Results can be written as JSON and compared against a saved baseline:
+    python benchmarks/engine_bench.py --output baseline.json
+    python benchmarks/engine_bench.py --compare baseline.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import os
+import time
+from datetime import datetime
+
+import chess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'server'))
+
+from benchmarks.stats import percentile
+from chess_engine import ChessEngine, encode_move
+from position_cache import get_position_cache
+
+# name -> (FEN, [perft counts for depth 1, 2, 3, 4])
+PERFT_POSITIONS = {
+    "startpos": (chess.STARTING_FEN, [20, 400, 8902, 197281]),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 [48, 2039, 97862, 4085603]),
+    "endgame": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238]),
+    "promotion": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  [6, 264, 9467, 422333]),
+    "tricky": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+               [44, 1486, 62379, 2103487]),
+}
+
+
+def perft(engine: ChessEngine, depth: int) -> int:
+    """Count leaf nodes through the engine's make/undo path"""
+    moves = list(engine.board.legal_moves)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        engine.apply_moves((encode_move(move),))
+        nodes += perft(engine, depth - 1)
+        engine.undo_move()
+    return nodes
+
+
+def random_games(count: int, plies: int, seed: int):
+    """Generate reproducible random games as lists of chess.Move"""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = chess.Board()
+        moves = []
+        while len(moves) < plies and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move)
+        games.append(moves)
+    return games
+
+
+def move_args(move: chess.Move):
+    """Convert a move to make_move arguments"""
+    promotion = chess.piece_symbol(move.promotion) if move.promotion else None
+    return chess.square_name(move.from_square), chess.square_name(move.to_square), promotion
+
+
+def result(value: float, unit: str, higher_is_better: bool = True) -> dict:
+    """Build one benchmark result entry"""
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_perft(depth: int) -> dict:
+    """Run perft on the standard positions"""
+    results = {}
+    for name, (fen, counts) in PERFT_POSITIONS.items():
+        engine = ChessEngine()
+        engine.set_board_state(fen)
+        start = time.perf_counter()
+        nodes = perft(engine, depth)
+        elapsed = time.perf_counter() - start
+        if nodes != counts[depth - 1]:
+            raise AssertionError(f"perft({name}, {depth}) = {nodes}, expected {counts[depth - 1]}")
+        results[f"perft.{name}.d{depth}"] = result(nodes / elapsed, "nodes/s")
+    return results
+
+
+def bench_make_undo_redo(games) -> dict:
+    """Measure make_move, undo_move and redo_move throughput"""
+    engines = [ChessEngine() for _ in games]
+    total = sum(len(game) for game in games)
+    
+    start = time.perf_counter()
+    for engine, game in zip(engines, games):
+        for move in game:
+            engine.make_move(*move_args(move))
+    make_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for engine in engines:
+        while engine.undo_move():
+            pass
+    undo_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for engine in engines:
+        while engine.redo_move():
+            pass
+    redo_time = time.perf_counter() - start
+    
+    return {
+        "make_move": result(total / make_time, "moves/s"),
+        "undo_move": result(total / undo_time, "moves/s"),
+        "redo_move": result(total / redo_time, "moves/s"),
+    }
+
+
+def bench_legal_moves(games) -> dict:
+    """Measure get_legal_moves latency with a cold and a warm position cache"""
+    cache = get_position_cache()
+    samples = {"cold": [], "warm": []}
+    for game in games:
+        engine = ChessEngine()
+        for move in game:
+            board = engine.board
+            squares = [chess.square_name(sq)
+                       for sq in chess.SquareSet(board.occupied_co[board.turn])]
+            for phase in ("cold", "warm"):
+                for square in squares:
+                    if phase == "cold":
+                        # Every cold call must miss, not just the first after a clear
+                        cache.clear()
+                    start = time.perf_counter()
+                    engine.get_legal_moves(square)
+                    samples[phase].append(time.perf_counter() - start)
+            engine.make_move(*move_args(move))
+    
+    results = {}
+    for phase, times in samples.items():
+        name = f"get_legal_moves.{phase}"
+        results[f"{name}.p50"] = result(percentile(times, 0.50) * 1e6, "us", False)
+        results[f"{name}.p99"] = result(percentile(times, 0.99) * 1e6, "us", False)
+        results[f"{name}.mean"] = result(statistics.fmean(times) * 1e6, "us", False)
+    return results
+
+
+def bench_replay(games) -> dict:
+    """Measure full-game replay speed, per move and in bulk (validated and trusted)"""
+    total = sum(len(game) for game in games)
+    uci_games = [[move.uci() for move in game] for game in games]
+    packed_games = [[encode_move(move) for move in game] for game in games]
+    
+    start = time.perf_counter()
+    for game in games:
+        engine = ChessEngine()
+        for move in game:
+            engine.make_move(*move_args(move))
+    per_move = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for game in uci_games:
+        ChessEngine.from_moves(game)
+    bulk_uci = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for game in packed_games:
+        ChessEngine.from_moves(game)
+    bulk_packed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for game in packed_games:
+        ChessEngine.from_moves(game, trusted=True)
+    bulk_trusted = time.perf_counter() - start
+    
+    return {
+        "replay.make_move": result(total / per_move, "moves/s"),
+        "replay.bulk_uci": result(total / bulk_uci, "moves/s"),
+        "replay.bulk_packed": result(total / bulk_packed, "moves/s"),
+        "replay.bulk_trusted": result(total / bulk_trusted, "moves/s"),
+    }
+
+
+def run(args) -> dict:
+    """Run all benchmarks"""
+    games = random_games(args.games, args.plies, args.seed)
+    results = {}
+    results.update(bench_perft(args.perft_depth))
+    results.update(bench_make_undo_redo(games))
+    results.update(bench_legal_moves(games[:max(1, args.games // 4)]))
+    results.update(bench_replay(games))
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "python_chess": chess.__version__,
+            "games": args.games,
+            "plies": args.plies,
+            "seed": args.seed,
+            "perft_depth": args.perft_depth,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compare results against a baseline
+    
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous["value"]:
+            continue
+        change = current["value"] / previous["value"] - 1
+        if not current["higher_is_better"]:
+            change = -change
+        marker = "  "
+        if change < -tolerance:
+            marker = "❌"
+            regressions.append(f"{name}: {change:+.1%}")
+        print(f"{marker} {name:36s} {previous['value']:14.1f} -> "
+              f"{current['value']:14.1f} {current['unit']:8s} {change:+.1%}")
+    return regressions
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="ChessEngine benchmark suite")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--plies", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--perft-depth", type=int, default=3, choices=[1, 2, 3, 4])
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed slowdown before a result counts as a regression")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = run(args)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    
+    if args.json:
+        print(json.dumps(report))
+    elif not args.compare:
+        print("📊 ChessEngine benchmarks")
+        for name, entry in report["results"].items():
+            print(f"   {name:36s} {entry['value']:14.1f} {entry['unit']}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"⚠️  {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
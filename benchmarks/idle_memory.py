@@ -0,0 +1,102 @@
+"""
+Idle game memory report
+Measures bytes held per idle room before and after packing its game
+"""
+
+import argparse
+import chess
+import json
+import random
+import sys
+import os
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'server'))
+
+from game_manager import GameManager, Player
+from position_cache import get_position_cache
+
+
+def play_random_game(engine, plies: int, rng: random.Random):
+    """Play up to `plies` random legal moves on an engine"""
+    for _ in range(plies):
+        moves = list(engine.board.legal_moves)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        promotion = chess.piece_symbol(move.promotion) if move.promotion else None
+        engine.make_move(chess.square_name(move.from_square),
+                         chess.square_name(move.to_square), promotion)
+
+
+def build_rooms(games: int, plies: int, seed: int) -> GameManager:
+    """Create a manager with `games` started rooms"""
+    rng = random.Random(seed)
+    manager = GameManager()
+    for i in range(games):
+        white = Player(f"white{i}", None, None)
+        black = Player(f"black{i}", None, None)
+        manager.add_player(white)
+        manager.add_player(black)
+        room = manager.create_room(f"room{i}", white)
+        manager.join_room(room.room_id, black)
+        room.start_game()
+        play_random_game(room.game, plies, rng)
+    return manager
+
+
+def traced_bytes() -> int:
+    """Get traced memory, leaving out the shared position cache"""
+    # Freed cache entries can linger in allocator free lists, so filter by file
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, "*position_cache.py")
+    ])
+    return sum(stat.size for stat in snapshot.statistics('filename'))
+
+
+def measure(games: int, plies: int, seed: int) -> dict:
+    """Measure per-game memory of rooms with live and packed engines"""
+    tracemalloc.start()
+    baseline = traced_bytes()
+    manager = build_rooms(games, plies, seed)
+    get_position_cache().clear()
+    live = traced_bytes() - baseline
+    
+    packed_count = manager.pack_idle_rooms(0)
+    packed = traced_bytes() - baseline
+    tracemalloc.stop()
+    
+    return {
+        "games": games,
+        "plies": plies,
+        "packed_games": packed_count,
+        "bytes_per_game_live": live / games,
+        "bytes_per_game_packed": packed / games,
+        "reduction": 1 - packed / live if live else 0.0
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--plies", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = measure(args.games, args.plies, args.seed)
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"📦 Idle game memory ({report['games']} games, {report['plies']} plies)")
+    print(f"   Live:   {report['bytes_per_game_live']:10.0f} bytes/game")
+    print(f"   Packed: {report['bytes_per_game_packed']:10.0f} bytes/game")
+    print(f"   Saved:  {report['reduction']:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Socket-level load generator
+Spawns bot clients that log in, pair up in rooms and play random legal
+games against a running server, then reports throughput and latency
+
+Usage:
+    python server/main.py
+    python benchmarks/load_generator.py --bots 1000 --think 0.5 --duration 60
+"""
+
+import argparse
+import heapq
+import json
+import random
+import selectors
+import socket
+import sys
+import os
+import time
+
+import chess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from common.constants import *
+from common.protocol import create_message, MessageReader
+from common.tracing import TraceAggregator, new_trace, get_trace, stamp, STAGE_CLIENT_RECEIVE
+from benchmarks.stats import summarize
+
+
+class Bot:
+    """
+    One simulated client
+    
+    Follows NetworkHandler semantics (one connection, JSON messages, a
+    callback per received message) but is driven by the generator's
+    event loop instead of a thread of its own.
+    """
+    
+    def __init__(self, generator: "LoadGenerator", bot_id: int, creator: bool):
+        self.generator = generator
+        self.bot_id = bot_id
+        self.username = f"bot{bot_id}_{generator.run_id}"
+        self.creator = creator  # Creators open rooms, their partner joins
+        self.partner: "Bot" = None
+        self.socket = None
+        self.reader = None
+        self.connect_started = 0.0
+        self.logged_in = False
+        self.room_id = None
+        self.color = None
+        self.board = None
+        self.plies = 0
+        self.move_sent_at = None
+    
+    def connect(self):
+        """Open the connection and log in"""
+        self.connect_started = time.perf_counter()
+        self.socket = socket.create_connection(
+            (self.generator.host, self.generator.port), timeout=10)
+        self.generator.stats["connect"].append(time.perf_counter() - self.connect_started)
+        self.socket.setblocking(True)
+        self.socket.settimeout(None)
+        self.reader = MessageReader(self.socket, BUFFER_SIZE)
+        self.send(MSG_LOGIN, {"username": self.username})
+    
+    def send(self, msg_type: str, data: dict = None):
+        """Send message to server"""
+        try:
+            self.socket.sendall(create_message(msg_type, data).encode('utf-8'))
+        except OSError:
+            self.generator.drop(self)
+    
+    def on_readable(self):
+        """Read and handle everything the server sent"""
+        try:
+            messages = self.reader.read()
+        except OSError:
+            messages = None
+        if messages is None:
+            self.generator.drop(self)
+            return
+        for message in messages:
+            self.on_message(message.get("type"), message.get("data", {}))
+    
+    def on_message(self, msg_type: str, data: dict):
+        """Handle one server message"""
+        generator = self.generator
+        now = time.perf_counter()
+        
+        if msg_type == MSG_LOGIN_SUCCESS:
+            self.logged_in = True
+            generator.stats["setup"].append(now - self.connect_started)
+            if self.creator:
+                self.send(MSG_CREATE_ROOM, {"room_name": f"load {self.bot_id}"})
+            elif self.partner.room_id:
+                self.send(MSG_JOIN_ROOM, {"room_id": self.partner.room_id})
+        
+        elif msg_type == MSG_ROOM_JOINED:
+            if self.creator:
+                self.room_id = data.get("room_id")
+                if self.partner.logged_in:
+                    self.partner.send(MSG_JOIN_ROOM, {"room_id": self.room_id})
+        
+        elif msg_type == MSG_GAME_START:
+            self.color = data.get("your_color")
+            self.board = chess.Board(data.get("board_state"))
+            self.plies = 0
+            if self.creator:
+                generator.games_started += 1
+            self.maybe_schedule_move()
+        
+        elif msg_type == MSG_MOVE_UPDATE:
+            if self.move_sent_at is not None:
+                generator.stats["move"].append(now - self.move_sent_at)
+                generator.moves += 1
+                self.move_sent_at = None
+            trace = get_trace(data) if generator.traces else None
+            if trace:
+                stamp(trace, STAGE_CLIENT_RECEIVE)
+                generator.traces.record(trace)
+            self.board = chess.Board(data.get("board_state"))
+            self.plies += 1
+            self.maybe_schedule_move()
+        
+        elif msg_type == MSG_GAME_OVER:
+            self.board = None
+            self.move_sent_at = None
+            if self.creator:
+                generator.games_finished += 1
+                # Start the next game in a fresh room
+                self.room_id = None
+                generator.schedule(generator.think_time, self.create_room)
+        
+        elif msg_type in (MSG_ERROR, MSG_LOGIN_FAILED):
+            generator.errors += 1
+            if self.move_sent_at is not None:
+                self.move_sent_at = None
+                self.maybe_schedule_move()
+    
+    def create_room(self):
+        """Open a room for the next game"""
+        if self.socket:
+            self.send(MSG_CREATE_ROOM, {"room_name": f"load {self.bot_id}"})
+    
+    def maybe_schedule_move(self):
+        """Schedule a move after the think time if it is our turn"""
+        board = self.board
+        if board is None or board.is_game_over():
+            return
+        if (board.turn == chess.WHITE) != (self.color == COLOR_WHITE):
+            return
+        delay = self.generator.think_time * self.generator.rng.uniform(0.5, 1.5)
+        self.generator.schedule(delay, self.play_move)
+    
+    def play_move(self):
+        """Send a random legal move, or resign a game that ran too long"""
+        if self.board is None or self.socket is None:
+            return
+        if self.plies >= self.generator.max_plies:
+            self.send(MSG_RESIGN, {})
+            return
+        move = self.generator.rng.choice(list(self.board.legal_moves))
+        self.move_sent_at = time.perf_counter()
+        data = {
+            "from": chess.square_name(move.from_square),
+            "to": chess.square_name(move.to_square),
+            "promotion": chess.piece_symbol(move.promotion) if move.promotion else None
+        }
+        if self.generator.traces:
+            data["trace"] = new_trace()
+        self.send(MSG_MOVE, data)
+    
+    def close(self):
+        """Log out and close the connection"""
+        if self.socket:
+            try:
+                self.socket.sendall(create_message(MSG_LOGOUT).encode('utf-8'))
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+
+
+class LoadGenerator:
+    """Event loop driving many bots over real sockets"""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = SERVER_PORT, bots: int = 100,
+                 think_time: float = 0.5, duration: float = 30.0, ramp_rate: float = 200.0,
+                 max_plies: int = 120, seed: int = 1, trace: bool = False):
+        self.host = host
+        self.port = port
+        self.think_time = think_time
+        self.duration = duration
+        self.ramp_rate = ramp_rate  # New connections per second
+        self.max_plies = max_plies
+        self.rng = random.Random(seed)
+        self.run_id = f"{os.getpid()}_{seed}"
+        self.selector = selectors.DefaultSelector()
+        self.timers = []
+        self.timer_seq = 0
+        self.stats = {"connect": [], "setup": [], "move": []}
+        self.moves = 0
+        self.games_started = 0
+        self.games_finished = 0
+        self.errors = 0
+        self.failed_connections = 0
+        self.traces = TraceAggregator() if trace else None
+        
+        # Bots are paired: even ids create rooms, odd ids join them
+        self.bots = [Bot(self, i, creator=(i % 2 == 0)) for i in range(bots - bots % 2)]
+        for creator, joiner in zip(self.bots[::2], self.bots[1::2]):
+            creator.partner, joiner.partner = joiner, creator
+    
+    def schedule(self, delay: float, callback):
+        """Run callback after delay seconds"""
+        self.timer_seq += 1
+        heapq.heappush(self.timers, (time.perf_counter() + delay, self.timer_seq, callback))
+    
+    def drop(self, bot: Bot):
+        """Forget a bot whose connection closed"""
+        if bot.socket:
+            try:
+                self.selector.unregister(bot.socket)
+            except (KeyError, ValueError):
+                pass
+            bot.socket.close()
+            bot.socket = None
+            self.errors += 1
+    
+    def connect(self, bot: Bot):
+        """Connect one bot and register it with the event loop"""
+        try:
+            bot.connect()
+        except OSError:
+            self.failed_connections += 1
+            return
+        self.selector.register(bot.socket, selectors.EVENT_READ, bot)
+    
+    def run(self) -> dict:
+        """Run the load test and return a report"""
+        start = time.perf_counter()
+        interval = 1.0 / self.ramp_rate if self.ramp_rate > 0 else 0.0
+        for index, bot in enumerate(self.bots):
+            self.schedule(index * interval, lambda bot=bot: self.connect(bot))
+        
+        deadline = start + self.duration
+        while time.perf_counter() < deadline:
+            now = time.perf_counter()
+            timeout = max(0.0, min(deadline, self.timers[0][0] if self.timers else deadline) - now)
+            for key, _ in self.selector.select(timeout):
+                key.data.on_readable()
+            now = time.perf_counter()
+            while self.timers and self.timers[0][0] <= now:
+                heapq.heappop(self.timers)[2]()
+        
+        elapsed = time.perf_counter() - start
+        for bot in self.bots:
+            if bot.socket:
+                self.selector.unregister(bot.socket)
+            bot.close()
+        self.selector.close()
+        
+        return {
+            "bots": len(self.bots),
+            "duration_s": elapsed,
+            "think_time_s": self.think_time,
+            "failed_connections": self.failed_connections,
+            "errors": self.errors,
+            "games_started": self.games_started,
+            "games_finished": self.games_finished,
+            "moves": self.moves,
+            "moves_per_s": self.moves / elapsed if elapsed else 0.0,
+            "connect_ms": summarize(self.stats["connect"], 1e3),
+            "setup_ms": summarize(self.stats["setup"], 1e3),
+            "move_latency_ms": summarize(self.stats["move"], 1e3),
+            "move_trace_ms": self.traces.summary() if self.traces else {},
+        }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Socket-level load generator")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--bots", type=int, default=100, help="Number of bot clients (paired)")
+    parser.add_argument("--think", type=float, default=0.5, help="Mean seconds per move")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test length in seconds")
+    parser.add_argument("--ramp", type=float, default=200.0, help="New connections per second")
+    parser.add_argument("--max-plies", type=int, default=120, help="Resign games after this many plies")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace", action="store_true",
+                        help="Trace moves and report a per-stage latency breakdown")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    generator = LoadGenerator(args.host, args.port, args.bots, args.think, args.duration,
+                              args.ramp, args.max_plies, args.seed, args.trace)
+    report = generator.run()
+    
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"🤖 {report['bots']} bots for {report['duration_s']:.1f}s "
+          f"(think {report['think_time_s']}s)")
+    print(f"   Games: {report['games_started']} started, {report['games_finished']} finished")
+    print(f"   Moves: {report['moves']} ({report['moves_per_s']:.1f} moves/s)")
+    print(f"   Errors: {report['errors']}, failed connections: {report['failed_connections']}")
+    for name, label in (("connect_ms", "TCP connect"), ("setup_ms", "Connect+login"),
+                        ("move_latency_ms", "MOVE→MOVE_UPDATE")):
+        entry = report[name]
+        print(f"   {label:18s} p50 {entry['p50']:8.2f} ms  p99 {entry['p99']:8.2f} ms  "
+              f"max {entry['max']:8.2f} ms")
+    if generator.traces:
+        print("\n".join(generator.traces.report()))
+
+
+if __name__ == "__main__":
+    main()
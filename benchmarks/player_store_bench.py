@@ -0,0 +1,174 @@
+"""
+Player store benchmark
+Measures login and game-end throughput against a database of registered
+players, for the write-behind PlayerStore and for plain synchronous sqlite
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+import sys
+import os
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'server'))
+
+from common.constants import (DEFAULT_RATING, DEFAULT_RD, DEFAULT_VOLATILITY,
+                              RESULT_WHITE_WIN, RESULT_BLACK_WIN, RESULT_DRAW)
+from player_store import PlayerStore, SCHEMA, UPSERT
+
+RESULTS = (RESULT_WHITE_WIN, RESULT_BLACK_WIN, RESULT_DRAW)
+
+
+def seed_database(path: str, players: int):
+    """Create a database with `players` registered players"""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(SCHEMA)
+    now = time.time()
+    with connection:
+        connection.executemany(UPSERT, (
+            (f"player{i}", DEFAULT_RATING, DEFAULT_RD, DEFAULT_VOLATILITY, 0, 0, 0, 0, now)
+            for i in range(players)
+        ))
+    connection.close()
+
+
+def workload(players: int, logins: int, games: int, new_fraction: float, seed: int):
+    """Usernames to log in (some unregistered) and games to finish"""
+    rng = random.Random(seed)
+    names = [f"player{rng.randrange(players)}" if rng.random() >= new_fraction
+             else f"newcomer{i}" for i in range(logins)]
+    matches = [(f"player{rng.randrange(players)}", f"player{rng.randrange(players)}",
+                rng.choice(RESULTS)) for _ in range(games)]
+    return names, matches
+
+
+def bench_store(path: str, names, matches) -> dict:
+    """Write-behind store: in-memory reads and updates, batched writes"""
+    start = time.perf_counter()
+    store = PlayerStore(path)
+    load = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for name in names:
+        store.login(name)
+    login = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for white, black, result in matches:
+        store.record_game(white, black, result)
+    game_end = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    store.close()
+    drain = time.perf_counter() - start
+    
+    return {
+        "load_s": load,
+        "logins_per_s": len(names) / login,
+        "game_ends_per_s": len(matches) / game_end,
+        "drain_s": drain,
+        "flushes": store.flushes,
+        "rows_written": store.rows_written,
+    }
+
+
+def bench_synchronous(path: str, names, matches) -> dict:
+    """Baseline: one query per login and one transaction per game"""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA synchronous=NORMAL")
+    now = time.time()
+    
+    start = time.perf_counter()
+    for name in names:
+        row = connection.execute("SELECT rating FROM players WHERE username = ?",
+                                 (name,)).fetchone()
+        with connection:
+            if row is None:
+                connection.execute(UPSERT, (name, DEFAULT_RATING, DEFAULT_RD,
+                                                    DEFAULT_VOLATILITY, 0, 0, 0, 0, now))
+            else:
+                connection.execute("UPDATE players SET last_seen = ? WHERE username = ?",
+                                   (now, name))
+    login = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for white, black, result in matches:
+        with connection:
+            connection.execute(
+                "UPDATE players SET games = games + 1, wins = wins + ?, losses = losses + ?, "
+                "draws = draws + ? WHERE username = ?",
+                (result == RESULT_WHITE_WIN, result == RESULT_BLACK_WIN,
+                 result == RESULT_DRAW, white))
+            connection.execute(
+                "UPDATE players SET games = games + 1, wins = wins + ?, losses = losses + ?, "
+                "draws = draws + ? WHERE username = ?",
+                (result == RESULT_BLACK_WIN, result == RESULT_WHITE_WIN,
+                 result == RESULT_DRAW, black))
+    game_end = time.perf_counter() - start
+    connection.close()
+    
+    return {
+        "logins_per_s": len(names) / login,
+        "game_ends_per_s": len(matches) / game_end,
+    }
+
+
+def run(players: int, logins: int, games: int, new_fraction: float = 0.05,
+        seed: int = 1) -> dict:
+    """Seed two identical databases and benchmark both strategies"""
+    directory = tempfile.mkdtemp()
+    try:
+        names, matches = workload(players, logins, games, new_fraction, seed)
+        store_path = os.path.join(directory, "store.db")
+        sync_path = os.path.join(directory, "sync.db")
+        seed_database(store_path, players)
+        shutil.copy(store_path, sync_path)
+        return {
+            "players": players,
+            "logins": logins,
+            "games": games,
+            "write_behind": bench_store(store_path, names, matches),
+            "synchronous": bench_synchronous(sync_path, names, matches),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=100000, help="Registered players")
+    parser.add_argument("--logins", type=int, default=20000)
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--new", type=float, default=0.05,
+                        help="Fraction of logins by unregistered players")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = run(args.players, args.logins, args.games, args.new, args.seed)
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    store, sync = report["write_behind"], report["synchronous"]
+    print(f"💾 Player store ({report['players']} players, {report['logins']} logins, "
+          f"{report['games']} games)")
+    print(f"   Warm load:  {store['load_s'] * 1e3:10.1f} ms")
+    print(f"   Logins:     {store['logins_per_s']:10.0f}/s write-behind  "
+          f"{sync['logins_per_s']:10.0f}/s synchronous")
+    print(f"   Game ends:  {store['game_ends_per_s']:10.0f}/s write-behind  "
+          f"{sync['game_ends_per_s']:10.0f}/s synchronous")
+    print(f"   Drain:      {store['drain_s'] * 1e3:10.1f} ms "
+          f"({store['rows_written']} rows in {store['flushes']} flushes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Rating period benchmark
+Times a Glicko-2 rating period with a million games, vectorized and one
+player at a time, and checks that both give the same ratings
+"""
+
+import argparse
+import json
+import math
+import sys
+import os
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'server'))
+
+from common.constants import DEFAULT_RD, DEFAULT_VOLATILITY, GLICKO_TAU
+from ratings import rate_period, GLICKO_CENTER, GLICKO_SCALE, CONVERGENCE
+
+
+def rate_player(rating, rd, volatility, opponents, tau=GLICKO_TAU):
+    """
+    Reference Glicko-2 update for one player, step by step as in the paper
+    
+    Args:
+        opponents: (rating, rd, score) per game
+    """
+    mu, phi = (rating - GLICKO_CENTER) / GLICKO_SCALE, rd / GLICKO_SCALE
+    if not opponents:
+        return rating, min(math.sqrt(phi ** 2 + volatility ** 2) * GLICKO_SCALE, DEFAULT_RD), volatility
+    information = improvement = 0.0
+    for opponent_rating, opponent_rd, score in opponents:
+        mu_j, phi_j = (opponent_rating - GLICKO_CENTER) / GLICKO_SCALE, opponent_rd / GLICKO_SCALE
+        g = 1.0 / math.sqrt(1.0 + 3.0 * phi_j ** 2 / math.pi ** 2)
+        expected = 1.0 / (1.0 + math.exp(-g * (mu - mu_j)))
+        information += g * g * expected * (1.0 - expected)
+        improvement += g * (score - expected)
+    v = 1.0 / information
+    delta = v * improvement
+    
+    a = math.log(volatility ** 2)
+    f = lambda x: (math.exp(x) * (delta ** 2 - phi ** 2 - v - math.exp(x))
+                   / (2.0 * (phi ** 2 + v + math.exp(x)) ** 2) - (x - a) / tau ** 2)
+    big_a = a
+    if delta ** 2 > phi ** 2 + v:
+        big_b = math.log(delta ** 2 - phi ** 2 - v)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        big_b = a - k * tau
+    f_a, f_b = f(big_a), f(big_b)
+    while abs(big_b - big_a) > CONVERGENCE:
+        big_c = big_a + (big_a - big_b) * f_a / (f_b - f_a)
+        f_c = f(big_c)
+        if f_c * f_b <= 0:
+            big_a, f_a = big_b, f_b
+        else:
+            f_a /= 2.0
+        big_b, f_b = big_c, f_c
+    new_volatility = math.exp(big_a / 2.0)
+    
+    phi_star = math.sqrt(phi ** 2 + new_volatility ** 2)
+    new_phi = 1.0 / math.sqrt(1.0 / phi_star ** 2 + information)
+    new_mu = mu + new_phi ** 2 * improvement
+    return (new_mu * GLICKO_SCALE + GLICKO_CENTER, min(new_phi * GLICKO_SCALE, DEFAULT_RD),
+            new_volatility)
+
+
+def make_period(players: int, games: int, seed: int):
+    """Random players and games whose results follow the rating gap"""
+    rng = np.random.default_rng(seed)
+    ratings = rng.normal(1500.0, 300.0, players)
+    rds = rng.uniform(50.0, DEFAULT_RD, players)
+    volatilities = np.full(players, DEFAULT_VOLATILITY)
+    white = rng.integers(0, players, games)
+    black = (white + rng.integers(1, players, games)) % players
+    p_white = 1.0 / (1.0 + 10.0 ** ((ratings[black] - ratings[white]) / 400.0))
+    draw = rng.random(games) < 0.2
+    scores = np.where(draw, 0.5, (rng.random(games) < p_white).astype(np.float64))
+    return ratings, rds, volatilities, white, black, scores
+
+
+def measure(players: int, games: int, sample: int, seed: int) -> dict:
+    """Time the vectorized period and a per-player sample"""
+    ratings, rds, volatilities, white, black, scores = make_period(players, games, seed)
+    
+    start = time.perf_counter()
+    new_ratings, new_rds, new_volatilities = rate_period(ratings, rds, volatilities,
+                                                         white, black, scores)
+    vectorized = time.perf_counter() - start
+    
+    # Per-player reference for the first `sample` players
+    sample = min(sample, players)
+    opponents = [[] for _ in range(sample)]
+    for w, b, s in zip(white.tolist(), black.tolist(), scores.tolist()):
+        if w < sample:
+            opponents[w].append((ratings[b], rds[b], s))
+        if b < sample:
+            opponents[b].append((ratings[w], rds[w], 1.0 - s))
+    start = time.perf_counter()
+    reference = [rate_player(ratings[i], rds[i], volatilities[i], opponents[i])
+                 for i in range(sample)]
+    scalar = time.perf_counter() - start
+    
+    max_diff = max(abs(reference[i][0] - new_ratings[i]) for i in range(sample))
+    return {
+        "players": players,
+        "games": games,
+        "vectorized_s": vectorized,
+        "games_per_s": games / vectorized,
+        "scalar_sample_players": sample,
+        "scalar_estimate_s": scalar / sample * players,
+        "max_rating_diff": max_diff,
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=100000)
+    parser.add_argument("--games", type=int, default=1000000)
+    parser.add_argument("--sample", type=int, default=2000,
+                        help="Players rated one at a time for the scalar estimate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = measure(args.players, args.games, args.sample, args.seed)
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"📊 Glicko-2 period ({report['players']} players, {report['games']} games)")
+    print(f"   Vectorized:  {report['vectorized_s']:8.2f} s ({report['games_per_s']:.0f} games/s)")
+    print(f"   Per player:  {report['scalar_estimate_s']:8.2f} s (estimated from "
+          f"{report['scalar_sample_players']} players)")
+    print(f"   Max rating difference: {report['max_rating_diff']:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Traffic replayer
+Re-drives a server from a capture log written with `server/main.py --capture`
+
+By default the log is replayed in-process through ChessServer.dispatch,
+which gives reproducible benchmark runs. With --target it is replayed over
+real sockets against a running server. Messages from different
+connections are handled by different server threads, so fast socket
+replays can interleave them differently than recorded.
+
+Usage:
+    python benchmarks/replay_traffic.py capture.jsonl.gz --speed 10
+    python benchmarks/replay_traffic.py capture.jsonl.gz --speed 0 --target 127.0.0.1:5555
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import selectors
+import socket
+import sys
+import os
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'server'))
+
+from common.constants import *
+from common.protocol import create_message, MessageReader
+from benchmarks.server_harness import ServerHarness
+from traffic_capture import read_capture
+
+# Fields holding server-assigned ids, which differ between capture and replay
+ID_FIELDS = ("room_id", "simul_id", "tournament_id")
+
+# Reply, and its field, that carries the id a message creates
+CREATED_BY = {
+    MSG_CREATE_ROOM: (MSG_ROOM_JOINED, "room_id"),
+    MSG_JOIN_SIMUL: (MSG_ROOM_JOINED, "room_id"),
+    MSG_CREATE_SIMUL: (MSG_SIMUL_INFO, "simul_id"),
+    MSG_CREATE_TOURNAMENT: (MSG_TOURNAMENT_UPDATE, "tournament_id"),
+}
+
+
+def remap_ids(data, ids: dict):
+    """Payload with recorded ids replaced by the ones assigned during replay"""
+    if not isinstance(data, dict):
+        return data
+    mapped = {field: ids[data[field]] for field in ID_FIELDS
+              if isinstance(data.get(field), str) and data[field] in ids}
+    return {**data, **mapped} if mapped else data
+
+
+class Pacer:
+    """Waits so that events play back at a multiple of recorded speed"""
+    
+    def __init__(self, speed: float):
+        self.speed = speed  # 0 means as fast as possible
+        self.started = time.perf_counter()
+        self.lag = []
+    
+    def wait(self, recorded_at: float):
+        if self.speed <= 0:
+            return
+        due = self.started + recorded_at / self.speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self.lag.append(-delay)
+
+
+def replay_in_process(path: str, speed: float) -> dict:
+    """Replay a capture through an in-process server"""
+    harness = ServerHarness()
+    connections = {}
+    ids = {}  # Recorded room, simul or tournament id -> id assigned during replay
+    pacer = Pacer(speed)
+    events = 0
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        for recorded_at, conn_id, msg_type, data, created_id in read_capture(path):
+            pacer.wait(recorded_at)
+            connection = connections.get(conn_id)
+            if created_id:
+                if connection:
+                    ids[created_id] = harness.server.created_id(connection.player, msg_type)
+                continue
+            if msg_type is None:
+                # Disconnect: clean up like handle_client does
+                if connection and connection.player:
+                    harness.server.end_simul(connection.player)
+                    harness.server.leave_game(connection.player, disconnect=True)
+                connections.pop(conn_id, None)
+                continue
+            if connection is None:
+                connection = connections[conn_id] = harness.connect()
+            harness.send(connection, msg_type, remap_ids(data, ids))
+            events += 1
+    
+    elapsed = time.perf_counter() - pacer.started
+    return {
+        "mode": "in-process",
+        "events": events,
+        "elapsed_s": elapsed,
+        "events_per_s": events / elapsed if elapsed else 0.0,
+        "max_lag_ms": max(pacer.lag, default=0.0) * 1e3,
+        "errors_out": sum(c.socket.errors_sent for c in harness.connections),
+        "handlers": harness.stats.summary(),
+    }
+
+
+class ReplayConnection:
+    """One replayed client over a real socket"""
+    
+    def __init__(self, sock: socket.socket):
+        self.socket = sock
+        self.reader = MessageReader(sock, BUFFER_SIZE)
+        self.expected = None  # (reply type, id field) being waited for
+        self.created = None  # Id from the latest expected reply
+    
+    def drain(self):
+        """Read whatever the server sent without blocking"""
+        try:
+            messages = self.reader.read()
+        except (BlockingIOError, InterruptedError):
+            return True
+        except OSError:
+            return False
+        if messages is None:
+            return False
+        for message in messages:
+            if self.expected and message.get("type") == self.expected[0]:
+                self.created = message.get("data", {}).get(self.expected[1])
+        return True
+
+
+def replay_over_sockets(path: str, speed: float, host: str, port: int) -> dict:
+    """Replay a capture against a running server"""
+    selector = selectors.DefaultSelector()
+    connections = {}
+    ids = {}
+    pacer = Pacer(speed)
+    events = 0
+    
+    def pump(timeout: float = 0.0):
+        for key, _ in selector.select(timeout):
+            if not key.data.drain():
+                selector.unregister(key.fileobj)
+    
+    for recorded_at, conn_id, msg_type, data, created_id in read_capture(path):
+        pacer.wait(recorded_at)
+        pump()
+        connection = connections.get(conn_id)
+        if created_id:
+            if connection and connection.expected:
+                # Wait for the new id so later messages can be mapped to it
+                deadline = time.perf_counter() + 5.0
+                while connection.created is None and time.perf_counter() < deadline:
+                    pump(0.05)
+                ids[created_id] = connection.created
+                connection.expected = None
+            continue
+        if msg_type is None:
+            if connection:
+                selector.unregister(connection.socket)
+                connection.socket.setblocking(True)
+                try:
+                    connection.socket.sendall(create_message(MSG_LOGOUT).encode('utf-8'))
+                except OSError:
+                    pass
+                connection.socket.close()
+                del connections[conn_id]
+            continue
+        if connection is None:
+            sock = socket.create_connection((host, port))
+            sock.setblocking(False)
+            connection = connections[conn_id] = ReplayConnection(sock)
+            selector.register(sock, selectors.EVENT_READ, connection)
+        connection.expected, connection.created = CREATED_BY.get(msg_type), None
+        
+        connection.socket.setblocking(True)
+        connection.socket.sendall(create_message(msg_type, remap_ids(data, ids)).encode('utf-8'))
+        connection.socket.setblocking(False)
+        events += 1
+    
+    for connection in connections.values():
+        connection.socket.close()
+    selector.close()
+    
+    elapsed = time.perf_counter() - pacer.started
+    return {
+        "mode": "socket",
+        "events": events,
+        "elapsed_s": elapsed,
+        "events_per_s": events / elapsed if elapsed else 0.0,
+        "max_lag_ms": max(pacer.lag, default=0.0) * 1e3,
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Replay captured server traffic")
+    parser.add_argument("capture", help="Capture file from server/main.py --capture")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Playback speed multiplier (0 = as fast as possible)")
+    parser.add_argument("--target", metavar="HOST:PORT",
+                        help="Replay over sockets against a running server")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    if args.target:
+        host, _, port = args.target.rpartition(':')
+        report = replay_over_sockets(args.capture, args.speed, host or '127.0.0.1', int(port))
+    else:
+        report = replay_in_process(args.capture, args.speed)
+    
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    speed = "max" if args.speed <= 0 else f"{args.speed}x"
+    print(f"🎬 Replayed {report['events']} messages ({report['mode']}, {speed}) "
+          f"in {report['elapsed_s']:.2f}s")
+    print(f"   {report['events_per_s']:.0f} messages/s, max lag {report['max_lag_ms']:.1f} ms")
+    if "errors_out" in report:
+        print(f"   {report['errors_out']} ERROR replies")
+    for msg_type, entry in report.get("handlers", {}).items():
+        print(f"   {msg_type:16s} {entry['count']:8d} {entry['mean_us']:9.1f} us mean")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Headless in-process server harness
+Drives ChessServer.dispatch with fake sockets to measure handler
+throughput, per-handler cost and memory without network noise
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import os
+import time
+import tracemalloc
+
+import chess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'server'))
+
+from common.constants import *
+from benchmarks.stats import summarize
+from main import ChessServer
+
+
+class FakeSocket:
+    """Socket stand-in that counts outbound traffic"""
+    
+    def __init__(self):
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.errors_sent = 0
+    
+    def sendall(self, data: bytes):
+        self.messages_sent += 1
+        self.bytes_sent += len(data)
+        if data.startswith(b'{"type": "ERROR"'):
+            self.errors_sent += 1
+    
+    def close(self):
+        pass
+
+
+class HandlerStats:
+    """Per-message-type call counts and timings"""
+    
+    def __init__(self):
+        self.samples = {}
+    
+    def record(self, msg_type: str, elapsed: float):
+        self.samples.setdefault(msg_type, []).append(elapsed)
+    
+    def summary(self) -> dict:
+        summary = {}
+        for msg_type, samples in sorted(self.samples.items()):
+            stats = summarize(samples, 1e6)
+            summary[msg_type] = {
+                "count": stats["count"],
+                "total_ms": sum(samples) * 1e3,
+                "mean_us": stats["mean"],
+                "p50_us": stats["p50"],
+                "p99_us": stats["p99"],
+            }
+        return summary
+
+
+class Connection:
+    """One simulated client connection"""
+    
+    def __init__(self, conn_id: int):
+        self.socket = FakeSocket()
+        self.address = ("127.0.0.1", 40000 + conn_id)
+        self.player = None
+
+
+class ServerHarness:
+    """Runs simulated games against an in-process ChessServer"""
+    
+    def __init__(self, server: ChessServer = None, quiet: bool = True):
+        self.server = server or ChessServer()
+        self.server.running = True
+        self.stats = HandlerStats()
+        self.quiet = quiet
+        self.connections = []
+    
+    def connect(self) -> Connection:
+        """Open a simulated connection"""
+        connection = Connection(len(self.connections))
+        self.connections.append(connection)
+        return connection
+    
+    def send(self, connection: Connection, msg_type: str, data: dict = None):
+        """Deliver one message through the server's dispatch path"""
+        message = {"type": msg_type, "data": data or {}}
+        start = time.perf_counter()
+        connection.player = self.server.dispatch(
+            connection.socket, connection.address, connection.player, message)
+        self.stats.record(msg_type, time.perf_counter() - start)
+    
+    def setup_game(self, index: int):
+        """Log in two players and seat them in a new room"""
+        white, black = self.connect(), self.connect()
+        self.send(white, MSG_LOGIN, {"username": f"white{index}"})
+        self.send(black, MSG_LOGIN, {"username": f"black{index}"})
+        self.send(white, MSG_CREATE_ROOM, {"room_name": f"room{index}"})
+        self.send(black, MSG_LIST_ROOMS)
+        self.send(black, MSG_JOIN_ROOM, {"room_id": white.player.room_id})
+        return white, black
+    
+    def play(self, games: int, plies: int, seed: int, chat_every: int = 10) -> float:
+        """
+        Play `games` concurrent games, interleaving their moves
+        
+        Each move is preceded by a GET_LEGAL_MOVES for the piece, as the
+        clients send when a piece is selected.
+        
+        Returns:
+            Seconds spent in the move phase
+        """
+        rng = random.Random(seed)
+        output = io.StringIO() if self.quiet else sys.stdout
+        
+        with contextlib.redirect_stdout(output):
+            tables = [self.setup_game(i) for i in range(games)]
+            boards = [chess.Board() for _ in range(games)]
+            
+            start = time.perf_counter()
+            for ply in range(plies):
+                for (white, black), board in zip(tables, boards):
+                    if board.is_game_over():
+                        continue
+                    mover = white if board.turn == chess.WHITE else black
+                    move = rng.choice(list(board.legal_moves))
+                    from_sq = chess.square_name(move.from_square)
+                    self.send(mover, "GET_LEGAL_MOVES", {"square": from_sq})
+                    self.send(mover, MSG_MOVE, {
+                        "from": from_sq,
+                        "to": chess.square_name(move.to_square),
+                        "promotion": chess.piece_symbol(move.promotion) if move.promotion else None
+                    })
+                    board.push(move)
+                    if chat_every and ply % chat_every == 0:
+                        self.send(mover, MSG_CHAT, {"message": "gg"})
+            return time.perf_counter() - start
+
+
+def run(games: int, plies: int, seed: int, quiet: bool = True) -> dict:
+    """
+    Measure throughput, then memory in a second identical pass
+    
+    tracemalloc slows handlers down several times, so timings come from
+    a pass without it.
+    """
+    harness = ServerHarness(quiet=quiet)
+    elapsed = harness.play(games, plies, seed)
+    
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    memory_harness = ServerHarness(quiet=True)
+    memory_harness.play(games, plies, seed)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    handlers = harness.stats.summary()
+    game_messages = sum(
+        entry["count"] for msg_type, entry in handlers.items()
+        if msg_type in (MSG_MOVE, "GET_LEGAL_MOVES", MSG_CHAT)
+    )
+    return {
+        "games": games,
+        "plies": plies,
+        "elapsed_s": elapsed,
+        "messages": game_messages,
+        "messages_per_s": game_messages / elapsed if elapsed else 0.0,
+        "moves_per_s": handlers.get(MSG_MOVE, {}).get("count", 0) / elapsed if elapsed else 0.0,
+        "bytes_out": sum(c.socket.bytes_sent for c in harness.connections),
+        "errors_out": sum(c.socket.errors_sent for c in harness.connections),
+        "memory_bytes": current - baseline,
+        "memory_peak_bytes": peak - baseline,
+        "memory_bytes_per_game": (current - baseline) / games,
+        "handlers": handlers,
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Headless in-process server harness")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--plies", type=int, default=80)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Keep server log output")
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = run(args.games, args.plies, args.seed, quiet=not args.verbose)
+    
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"🖥️  In-process server: {report['games']} games x {report['plies']} plies")
+    print(f"   {report['messages_per_s']:10.0f} messages/s")
+    print(f"   {report['moves_per_s']:10.0f} moves/s")
+    print(f"   {report['memory_bytes_per_game']:10.0f} bytes/game "
+          f"(peak {report['memory_peak_bytes'] / 1e6:.1f} MB)")
+    print(f"   {'handler':16s} {'count':>8s} {'total ms':>10s} {'mean us':>9s} {'p99 us':>9s}")
+    for msg_type, entry in report["handlers"].items():
+        print(f"   {msg_type:16s} {entry['count']:8d} {entry['total_ms']:10.1f} "
+              f"{entry['mean_us']:9.1f} {entry['p99_us']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Simul host stream benchmark
+Plays one host against many boards through the in-process harness and
+counts what reaches the host: updates produced, updates after coalescing
+and SIMUL_UPDATE messages actually sent
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import os
+
+import chess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'server'))
+
+from common.constants import MSG_LOGIN, MSG_MOVE, MSG_CREATE_SIMUL, MSG_JOIN_SIMUL
+from benchmarks.server_harness import ServerHarness
+
+
+def move_data(move: chess.Move, room_id: str = None) -> dict:
+    """MOVE payload for a python-chess move"""
+    data = {
+        "from": chess.square_name(move.from_square),
+        "to": chess.square_name(move.to_square),
+        "promotion": chess.piece_symbol(move.promotion) if move.promotion else None,
+    }
+    if room_id:
+        data["room_id"] = room_id
+    return data
+
+
+def run(boards: int, rounds: int, student_moves: int, seed: int = 1) -> dict:
+    """
+    Play `rounds` host tours of every board
+    
+    Between flushes, which stand in for SIMUL_FLUSH_INTERVAL ticks, the
+    host moves on every board and each student replies, `student_moves`
+    times per board.
+    """
+    rng = random.Random(seed)
+    harness = ServerHarness()
+    simuls = harness.server.simuls
+    with contextlib.redirect_stdout(io.StringIO()):
+        host = harness.connect()
+        harness.send(host, MSG_LOGIN, {"username": "host"})
+        harness.send(host, MSG_CREATE_SIMUL, {"boards": boards})
+        simul = simuls.hosts["host"]
+        students = []
+        for i in range(boards):
+            student = harness.connect()
+            harness.send(student, MSG_LOGIN, {"username": f"student{i}"})
+            harness.send(student, MSG_JOIN_SIMUL, {"simul_id": simul.simul_id})
+            students.append((student, student.player.room_id, chess.Board()))
+        simuls.flush()
+        
+        start_messages = host.socket.messages_sent
+        start_queued, start_sent = simul.queued, simul.sent
+        for _ in range(rounds):
+            for student, room_id, board in students:
+                for _ in range(student_moves):
+                    if board.is_game_over():
+                        break
+                    if board.turn == chess.WHITE:
+                        move = rng.choice(list(board.legal_moves))
+                        harness.send(host, MSG_MOVE, move_data(move, room_id))
+                        board.push(move)
+                    move = rng.choice(list(board.legal_moves)) if not board.is_game_over() else None
+                    if move:
+                        harness.send(student, MSG_MOVE, move_data(move))
+                        board.push(move)
+            simuls.flush()
+    
+    produced = simul.queued - start_queued
+    delivered = simul.sent - start_sent
+    messages = host.socket.messages_sent - start_messages
+    return {
+        "boards": boards,
+        "rounds": rounds,
+        "updates_produced": produced,
+        "updates_delivered": delivered,
+        "host_messages": messages,
+        "coalescing_ratio": produced / delivered if delivered else 0.0,
+        "updates_per_message": delivered / messages if messages else 0.0,
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--boards", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--moves", type=int, default=2,
+                        help="Host/student exchanges per board between flushes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = run(args.boards, args.rounds, args.moves, args.seed)
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"🎪 Simul ({report['boards']} boards, {report['rounds']} flushes)")
+    print(f"   Updates for the host:   {report['updates_produced']:8d}")
+    print(f"   After coalescing:       {report['updates_delivered']:8d} "
+          f"({report['coalescing_ratio']:.1f}x fewer)")
+    print(f"   Messages to the host:   {report['host_messages']:8d} "
+          f"({report['updates_per_message']:.1f} updates each)")
+
+
+if __name__ == "__main__":
+    main()
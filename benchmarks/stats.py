@@ -0,0 +1,13 @@
+"""
+Small statistics helpers shared by the benchmarks
+Kept in common so move tracing reports the same summary
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.stats import percentile, summarize
+
+__all__ = ['percentile', 'summarize']
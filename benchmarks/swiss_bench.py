@@ -0,0 +1,107 @@
+"""
+Swiss pairing benchmark
+Plays a large tournament with results drawn from the rating gap, timing
+each round's pairing and checking the incremental tie-breaks against a
+recompute from the game list
+"""
+
+import argparse
+import json
+import random
+import sys
+import os
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'server'))
+
+from common.constants import COLOR_WHITE, COLOR_BLACK
+from tournament import Standing, pair_round, record_result, BYE_SCORE
+
+
+def play(white: Standing, black: Standing, rng: random.Random) -> float:
+    """White's score, with a 20% draw rate and Elo odds otherwise"""
+    if rng.random() < 0.2:
+        return 0.5
+    expected = 1.0 / (1.0 + 10.0 ** ((black.rating - white.rating) / 400.0))
+    return 1.0 if rng.random() < expected else 0.0
+
+
+def recompute_errors(standings) -> float:
+    """Largest difference between incremental and recomputed tie-breaks"""
+    worst = 0.0
+    for standing in standings:
+        buchholz = sum(opponent.score for opponent, _ in standing.games)
+        sonneborn_berger = sum(opponent.score * result for opponent, result in standing.games)
+        worst = max(worst, abs(buchholz - standing.buchholz),
+                    abs(sonneborn_berger - standing.sonneborn_berger))
+    return worst
+
+
+def run(players: int, rounds: int, seed: int = 1) -> dict:
+    """Play the tournament and time every round's pairing"""
+    rng = random.Random(seed)
+    standings = [Standing(f"player{i}", rng.gauss(1500.0, 300.0)) for i in range(players)]
+    pair_times = []
+    rematches = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        pairs, bye = pair_round(standings)
+        pair_times.append(time.perf_counter() - start)
+        if bye:
+            bye.had_bye = True
+            bye.add_score(BYE_SCORE)
+        for white, black in pairs:
+            rematches += black.username in white.opponents
+            white.opponents.add(black.username)
+            black.opponents.add(white.username)
+            for standing, step in ((white, 1), (black, -1)):
+                standing.color_balance += step
+                standing.last_color = COLOR_WHITE if step > 0 else COLOR_BLACK
+        for white, black in pairs:
+            record_result(white, black, play(white, black, rng))
+    
+    start = time.perf_counter()
+    ranked = sorted(standings, key=Standing.sort_key)
+    rank_time = time.perf_counter() - start
+    return {
+        "players": players,
+        "rounds": rounds,
+        "pair_max_ms": max(pair_times) * 1e3,
+        "pair_mean_ms": sum(pair_times) / len(pair_times) * 1e3,
+        "rank_ms": rank_time * 1e3,
+        "rematches": rematches,
+        "max_color_imbalance": max(abs(s.color_balance) for s in standings),
+        "tiebreak_error": recompute_errors(standings),
+        "winner": ranked[0].username,
+        "winner_score": ranked[0].score,
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print JSON only")
+    args = parser.parse_args()
+    
+    report = run(args.players, args.rounds, args.seed)
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"🏆 Swiss tournament ({report['players']} players, {report['rounds']} rounds)")
+    print(f"   Pairing:    {report['pair_mean_ms']:8.1f} ms mean  "
+          f"{report['pair_max_ms']:8.1f} ms worst round")
+    print(f"   Standings:  {report['rank_ms']:8.1f} ms")
+    print(f"   Rematches:  {report['rematches']}  "
+          f"max color imbalance {report['max_color_imbalance']}")
+    print(f"   Tie-break drift vs recompute: {report['tiebreak_error']:.2e}")
+    print(f"   Winner: {report['winner']} with {report['winner_score']}")
+
+
+if __name__ == "__main__":
+    main()
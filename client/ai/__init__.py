@@ -2,6 +2,6 @@
 AI package for chess game
 """
 
-from .chess_ai import ChessAI, AIOpponent
+from .chess_ai import ChessAI, AIOpponent, SearchHandle
 
-__all__ = ['ChessAI', 'AIOpponent']
+__all__ = ['ChessAI', 'AIOpponent', 'SearchHandle']
@@ -0,0 +1,306 @@
+"""
+Endgame bitbases
+Win/draw tables for king and pawn, king and rook, and king and queen
+against a lone king, generated by retrograde analysis, written to disk
+once and read back through a memory map; a probe is one bit lookup.
+Tables load on a background thread, never inside a search.
+"""
+
+import mmap
+import os
+import sys
+import threading
+from typing import Dict, Optional
+
+import chess
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from common.constants import BITBASE_DIR
+
+# Endings covered, by the piece the strong side has besides its king
+BITBASE_NAMES = {chess.PAWN: "KPK", chess.ROOK: "KRK", chess.QUEEN: "KQK"}
+
+# Positions are stored with the strong side as white:
+# index = weak side to move << 18 | strong king << 12 | weak king << 6 | piece,
+# and the bit is set when the strong side wins
+_HALF = 1 << 18
+BITBASE_POSITIONS = 2 * _HALF
+BITBASE_BYTES = BITBASE_POSITIONS // 8
+
+# Promotions make KPK read the other two tables, so they load first
+LOAD_ORDER = (chess.QUEEN, chess.ROOK, chess.PAWN)
+
+# Rook directions first, then the diagonals
+_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _square_tables():
+    """King targets, square distances and rays, padded with -1"""
+    king_targets = np.full((64, 8), -1, np.int64)
+    rays = np.full((64, 8, 7), -1, np.int64)
+    for square in chess.SQUARES:
+        targets = list(chess.scan_forward(chess.BB_KING_ATTACKS[square]))
+        king_targets[square, :len(targets)] = targets
+        for direction, (file_step, rank_step) in enumerate(_DIRECTIONS):
+            file, rank = chess.square_file(square), chess.square_rank(square)
+            for step in range(7):
+                file, rank = file + file_step, rank + rank_step
+                if not (0 <= file < 8 and 0 <= rank < 8):
+                    break
+                rays[square, direction, step] = chess.square(file, rank)
+    distance = np.array([[chess.square_distance(a, b) for b in chess.SQUARES]
+                         for a in chess.SQUARES])
+    return king_targets, distance, rays
+
+
+def _attack_table(piece_type: chess.PieceType) -> np.ndarray:
+    """Squares a white piece attacks, by piece square * 64 + the strong king's square"""
+    table = np.zeros(64 * 64, np.uint64)
+    for square in chess.SQUARES:
+        for king in chess.SQUARES:
+            occupied = chess.BB_SQUARES[king]
+            if piece_type == chess.PAWN:
+                attacks = chess.BB_PAWN_ATTACKS[chess.WHITE][square]
+            else:
+                attacks = (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+                           | chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied])
+                if piece_type == chess.QUEEN:
+                    attacks |= chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square]
+                                                              & occupied]
+            table[square * 64 + king] = attacks
+    return table
+
+
+def generate(piece_type: chess.PieceType,
+             promotions: Optional[Dict[chess.PieceType, np.ndarray]] = None) -> np.ndarray:
+    """
+    Solve an ending by retrograde analysis
+    
+    Starting from the mates, a position with the strong side to move is
+    won if some move reaches a won position, and one with the weak side
+    to move is won if every move does; this repeats until nothing
+    changes. Whatever is left over is a draw (or cannot occur).
+    
+    Args:
+        piece_type: The strong side's piece
+        promotions: Solved tables by piece, which pawn endings need for
+            promotions (KQK and KRK)
+    
+    Returns:
+        One flag per index, set where the strong side wins
+    """
+    king_targets, distance, rays = _square_tables()
+    index = np.arange(_HALF)
+    strong_king, weak_king, piece = index >> 12, (index >> 6) & 63, index & 63
+    attacks = _attack_table(piece_type)[piece * 64 + strong_king]
+    in_check = ((attacks >> weak_king.astype(np.uint64)) & np.uint64(1)).astype(bool)
+    legal = ((strong_king != weak_king) & (strong_king != piece) & (weak_king != piece)
+             & (distance[strong_king, weak_king] > 1))
+    if piece_type == chess.PAWN:
+        legal &= (piece >= chess.A2) & (piece <= chess.H7)
+    strong_legal = legal & ~in_check
+    
+    # Strong side's moves, as (position, successor with the weak side to move)
+    sources, successors = [], []
+    targets = king_targets[strong_king]
+    target = np.maximum(targets, 0)
+    moves = ((targets >= 0) & strong_legal[:, None] & (target != piece[:, None])
+             & (distance[target, weak_king[:, None]] > 1))
+    sources.append(np.broadcast_to(index[:, None], moves.shape)[moves])
+    successors.append(((target << 12) | (weak_king << 6 | piece)[:, None])[moves])
+    
+    promoted = np.zeros(_HALF, bool)
+    if piece_type == chess.PAWN:
+        push = piece + 8
+        free = strong_legal & (push != strong_king) & (push != weak_king)
+        promoting = free & (push > chess.H7)
+        quiet = free & ~promoting
+        double = quiet & (piece <= chess.H2) & (push + 8 != strong_king) & (push + 8 != weak_king)
+        kings = strong_king << 12 | weak_king << 6
+        for moves, to_square in ((quiet, push), (double, push + 8)):
+            sources.append(index[moves])
+            successors.append((kings | to_square)[moves])
+        # Promoting hands over to the queen or rook table, weak side to move
+        for table in (promotions or {}).values():
+            promoted[promoting] |= table[_HALF + (kings | push)[promoting]]
+    else:
+        directions = 4 if piece_type == chess.ROOK else 8
+        piece_rays = rays[piece, :directions]
+        target = np.maximum(piece_rays, 0)
+        blocked = ((piece_rays < 0) | (target == strong_king[:, None, None])
+                   | (target == weak_king[:, None, None]))
+        moves = (np.cumsum(blocked, axis=2) == 0) & strong_legal[:, None, None]
+        sources.append(np.broadcast_to(index[:, None, None], moves.shape)[moves])
+        successors.append(((strong_king << 12 | weak_king << 6)[:, None, None] | target)[moves])
+    strong_sources = np.concatenate(sources)
+    strong_successors = np.concatenate(successors)
+    
+    # Weak king's moves; taking the piece leads to a bare-kings draw (index _HALF)
+    targets = king_targets[weak_king]
+    target = np.maximum(targets, 0)
+    attacked = ((attacks[:, None] >> target.astype(np.uint64)) & np.uint64(1)).astype(bool)
+    moves = ((targets >= 0) & legal[:, None] & (distance[target, strong_king[:, None]] > 1)
+             & ~attacked)
+    weak_sources = np.broadcast_to(index[:, None], moves.shape)[moves]
+    weak_successors = np.where(target == piece[:, None], _HALF,
+                               (strong_king << 12 | piece)[:, None] | target << 6)[moves]
+    weak_moves = moves.sum(axis=1)
+    mated = legal & in_check & (weak_moves == 0)
+    
+    strong_wins = np.zeros(_HALF + 1, bool)
+    weak_loses = mated
+    while True:
+        reached = np.bincount(strong_sources, weights=weak_loses[strong_successors],
+                              minlength=_HALF)
+        strong_wins[:_HALF] = promoted | (reached > 0)
+        lost = np.bincount(weak_sources, weights=strong_wins[weak_successors], minlength=_HALF)
+        next_loses = mated | ((weak_moves > 0) & (lost == weak_moves))
+        if np.array_equal(next_loses, weak_loses):
+            break
+        weak_loses = next_loses
+    return np.concatenate([strong_wins[:_HALF], weak_loses])
+
+
+def cache_directory() -> str:
+    """Default table directory in the user's cache, whatever the working directory"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ChessOnline', BITBASE_DIR)
+
+
+def _unpack(table) -> np.ndarray:
+    """Flags from a packed table"""
+    return np.unpackbits(np.frombuffer(table, np.uint8), bitorder='little').astype(bool)
+
+
+class Bitbases:
+    """
+    Memory-mapped endgame bitbases
+    
+    warm_up() maps every table on a background thread, generating and
+    saving any whose file is missing (about 2 s in all). Until a table
+    is mapped, probes of its ending return None, so a search never
+    waits for generation.
+    """
+    
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or cache_directory()
+        self._tables: Dict[chess.PieceType, mmap.mmap] = {}
+        self._lock = threading.Lock()
+        self._warm_up: Optional[threading.Thread] = None
+        self._warm_up_lock = threading.Lock()
+        self.generated = 0
+        self.probes = 0
+    
+    def path(self, piece_type: chess.PieceType) -> str:
+        """File a table is kept in"""
+        return os.path.join(self.directory, BITBASE_NAMES[piece_type] + ".bin")
+    
+    def warm_up(self) -> threading.Thread:
+        """Start loading every table in the background, once; returns the loader thread"""
+        if self._warm_up is None:
+            with self._warm_up_lock:
+                if self._warm_up is None:
+                    self._warm_up = threading.Thread(target=self._load_all, daemon=True)
+                    self._warm_up.start()
+        return self._warm_up
+    
+    def _load_all(self):
+        for piece_type in LOAD_ORDER:
+            try:
+                self.table(piece_type)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Endgame bitbases unavailable: {e}")
+                return
+    
+    def table(self, piece_type: chess.PieceType) -> mmap.mmap:
+        """Mapped table for an ending, generating its file if needed (blocks)"""
+        table = self._tables.get(piece_type)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(piece_type)
+                if table is None:
+                    table = self._load(piece_type)
+        return table
+    
+    def _load(self, piece_type: chess.PieceType) -> mmap.mmap:
+        """Map a table (the lock is held)"""
+        path = self.path(piece_type)
+        if not os.path.exists(path):
+            promotions = None
+            if piece_type == chess.PAWN:
+                promotions = {promoted: _unpack(self._tables.get(promoted)
+                                                or self._load(promoted))
+                              for promoted in (chess.QUEEN, chess.ROOK)}
+            packed = np.packbits(generate(piece_type, promotions), bitorder='little')
+            os.makedirs(self.directory, exist_ok=True)
+            # Written aside and renamed, so a reader never maps half a file
+            partial = f"{path}.{os.getpid()}.tmp"
+            with open(partial, 'wb') as out:
+                out.write(packed.tobytes())
+            os.replace(partial, path)
+            self.generated += 1
+        with open(path, 'rb') as table_file:
+            table = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(table) != BITBASE_BYTES:
+            table.close()
+            raise ValueError(f"{path} is not a bitbase")
+        self._tables[piece_type] = table
+        return table
+    
+    def probe(self, board: chess.Board) -> Optional[int]:
+        """
+        Result with best play from the side to move's perspective
+        
+        Returns:
+            1 for a win, 0 for a draw, -1 for a loss, or None for a
+            position no table covers or whose table is not loaded yet
+        """
+        extra = board.occupied & ~board.kings
+        if chess.popcount(extra) != 1 or board.castling_rights:
+            return None
+        if extra & board.pawns:
+            piece_type = chess.PAWN
+        elif extra & board.rooks:
+            piece_type = chess.ROOK
+        elif extra & board.queens:
+            piece_type = chess.QUEEN
+        else:
+            return None
+        table = self._tables.get(piece_type)
+        if table is None:
+            self.warm_up()
+            return None
+        self.probes += 1
+        strong = bool(extra & board.occupied_co[chess.WHITE])
+        # Black's pieces are stored mirrored onto white's side of the board
+        flip = 0 if strong else 56
+        index = ((board.turn != strong) << 18 | (board.king(strong) ^ flip) << 12
+                 | (board.king(not strong) ^ flip) << 6 | (chess.lsb(extra) ^ flip))
+        if not table[index >> 3] >> (index & 7) & 1:
+            return 0
+        return 1 if board.turn == strong else -1
+    
+    def close(self):
+        """Unmap the tables"""
+        with self._lock:
+            for table in self._tables.values():
+                table.close()
+            self._tables.clear()
+
+
+# Tables shared by every AI in the process
+_bitbases = None
+
+def get_bitbases() -> Bitbases:
+    """Get global bitbases instance"""
+    global _bitbases
+    if _bitbases is None:
+        _bitbases = Bitbases()
+    return _bitbases
@@ -5,23 +5,193 @@ AI opponent using Stockfish or simple minimax
 import chess
 import chess.engine
 import random
-from typing import Optional
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Optional
+import sys
 import os
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from common.zobrist import zobrist_key, push_with_key
+from client.ai.transposition import (TranspositionTable, DEFAULT_TT_ENTRIES, BOUND_EXACT,
+                                     BOUND_LOWER, BOUND_UPPER, encode_move, decode_move)
+from client.ai.move_ordering import MoveOrderer
+from client.ai.see import static_exchange
+from client.ai.evaluation import Evaluator, PIECE_VALUES, mop_up
+from client.ai.opening_book import OpeningBook
+from client.ai.bitbase import get_bitbases
+
+MATE_SCORE = 10000
+INFINITY = 1000000
+MATE_BOUND = MATE_SCORE - 1000  # Scores beyond this are mates in some number of plies
+KNOWN_WIN = 5000  # Endings the bitbases call won, plus progress toward the win
+MAX_SEARCH_DEPTH = 64
+DELTA_MARGIN = 200  # Slack for positional gains when delta pruning captures
+
+# Selective search
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2  # Plies the null move search is reduced by, one more from depth 7
+FUTILITY_MARGINS = (150, 350)  # By remaining depth: frontier (1) and pre-frontier (2) nodes
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3  # Moves searched at full depth first; reduced by two from twice this
+ASPIRATION_MIN_DEPTH = 3
+ASPIRATION_WINDOW = 50  # Half-width of the root window around the previous score
+
+# Iterative deepening limits per difficulty: (maximum depth, seconds per move)
+SEARCH_LIMITS = {
+    'medium': (2, 0.5),
+    'hard': (MAX_SEARCH_DEPTH, 2.0),
+}
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when its time or node budget runs out"""
+
+
+class SearchHandle:
+    """
+    A move search running on a background thread
+    
+    future resolves to the chosen move, or None if the search was
+    cancelled or there is no legal move.
+    """
+    
+    def __init__(self, on_progress: Optional[Callable[[dict], None]] = None,
+                 on_done: Optional[Callable[[Optional[chess.Move]], None]] = None,
+                 dispatch: Optional[Callable[[Callable[[], None]], None]] = None):
+        self.future: Future = Future()
+        self.cancelled = False
+        self.best_move: Optional[chess.Move] = None  # Deepest finished iteration's move
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._on_progress = on_progress
+        self._on_done = on_done
+        self._dispatch = dispatch
+    
+    def stop(self):
+        """Finish now with the best move found so far"""
+        self._stop.set()
+    
+    def cancel(self):
+        """Abandon the search, e.g. after a resignation or undo; on_done is not called"""
+        self.cancelled = True
+        self._stop.set()
+    
+    def done(self) -> bool:
+        """Whether the search has finished"""
+        return self.future.done()
+    
+    def result(self, timeout: Optional[float] = None) -> Optional[chess.Move]:
+        """Wait for the move; after timeout seconds, stop and take the best so far"""
+        try:
+            return self.future.result(timeout)
+        except FutureTimeout:
+            self.stop()
+            return self.future.result()
+    
+    def _deliver(self, callback, argument):
+        """Call back with a result, through dispatch if one was given"""
+        if callback is None or self.cancelled:
+            return
+        if self._dispatch is None:
+            callback(argument)
+        else:
+            self._dispatch(lambda: None if self.cancelled else callback(argument))
+    
+    def _progress(self, info: dict):
+        """Record and report a finished depth"""
+        self.best_move = info["move"]
+        self._deliver(self._on_progress, info)
+    
+    def _finish(self, move: Optional[chess.Move]):
+        """Resolve the future and report the move"""
+        with self._lock:
+            self.future.set_result(None if self.cancelled else move)
+            on_done = self._on_done
+        self._deliver(on_done, self.future.result())
+    
+    def _adopt(self, on_progress, on_done, dispatch):
+        """Take over a running search's callbacks, reporting at once if it already finished"""
+        with self._lock:
+            self._on_progress, self._on_done, self._dispatch = on_progress, on_done, dispatch
+            finished = self.future.done()
+        if finished and not self.future.exception():
+            self._deliver(on_done, self.future.result())
+
 
 class ChessAI:
     """Chess AI opponent"""
     
-    def __init__(self, difficulty: str = 'medium'):
+    def __init__(self, difficulty: str = 'medium', tt_entries: int = DEFAULT_TT_ENTRIES,
+                 time_limit: Optional[float] = None, node_limit: Optional[int] = None,
+                 move_ordering: bool = True, quiescence: bool = True,
+                 incremental_eval: bool = True, null_move: bool = True, lmr: bool = True,
+                 futility: bool = True, pvs: bool = True, aspiration: bool = True,
+                 book: Optional[str] = None, bitbases: bool = True):
         """
         Initialize AI
         
         Args:
             difficulty: 'easy', 'medium', 'hard', or 'stockfish'
+            tt_entries: Transposition table size (0 disables the table)
+            time_limit: Seconds per move, overriding the difficulty's budget
+            node_limit: Optional cap on nodes searched per move
+            move_ordering: Order moves by captures, killers and history
+                (otherwise only the table move goes first)
+            quiescence: Resolve captures at the horizon before evaluating
+            incremental_eval: Update the evaluation on each move (otherwise
+                every leaf scans the board and generates its moves)
+            null_move: Prune nodes where passing still fails high
+            lmr: Search late quiet moves shallower first (late move reductions)
+            futility: Skip quiet moves at frontier nodes far below alpha
+            pvs: Search moves after the first with a null window first
+                (principal variation search)
+            aspiration: Search the root in a narrow window around the
+                previous iteration's score
+            book: Path of a Polyglot opening book to play from first
+            bitbases: Score king and pawn, rook or queen against a lone
+                king from the endgame bitbases
         """
         self.difficulty = difficulty
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self._deadline = None
+        self._node_budget = None
+        self._stop: Optional[threading.Event] = None
+        self._search_handle: Optional[SearchHandle] = None
+        self._ponder_handle: Optional[SearchHandle] = None
+        self._ponder_key: Optional[int] = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
         self.stockfish_engine = None
         self.use_stockfish = False
+        # Kept across get_move calls, so later moves reuse earlier searches
+        self.tt = TranspositionTable(tt_entries) if tt_entries else None
+        self.orderer = MoveOrderer() if move_ordering else None
+        self.quiescence = quiescence
+        self.evaluator = Evaluator() if incremental_eval else None
+        self.null_move = null_move
+        self.lmr = lmr
+        self.futility = futility
+        self.pvs = pvs
+        self.aspiration = aspiration
+        self.book = OpeningBook(book) if book else None
+        self.bitbases = get_bitbases() if bitbases else None
+        if self.bitbases:
+            # Loaded ahead of any search; probes miss until then
+            self.bitbases.warm_up()
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_cutoffs = 0
+        self.futility_prunes = 0
+        self.reduction_researches = 0
+        self.researches = 0
+        self.last_search = {}
         
         # Try to initialize Stockfish if available
         if difficulty == 'stockfish':
@@ -51,18 +221,21 @@ class ChessAI:
             
             print("⚠️ Stockfish not found, falling back to minimax")
             self.difficulty = 'hard'
-            
+        
         except Exception as e:
             print(f"Stockfish initialization error: {e}")
             self.difficulty = 'hard'
     
-    def get_move(self, board: chess.Board) -> Optional[chess.Move]:
+    def get_move(self, board: chess.Board,
+                 on_progress: Optional[Callable[[dict], None]] = None) -> Optional[chess.Move]:
         """
         Get AI move for current board position
         
         Args:
             board: Current chess board state
-            
+            on_progress: Called after each finished search depth with
+                depth, score, move, nodes and time_s
+        
         Returns:
             Best move according to AI
         """
@@ -70,10 +243,161 @@ class ChessAI:
             return self._get_stockfish_move(board)
         elif self.difficulty == 'easy':
             return self._get_random_move(board)
-        elif self.difficulty == 'medium':
-            return self._get_minimax_move(board, depth=2)
-        else:  # hard
-            return self._get_minimax_move(board, depth=3)
+        else:  # medium or hard
+            max_depth, time_limit = SEARCH_LIMITS.get(self.difficulty, SEARCH_LIMITS['hard'])
+            if self.time_limit is not None:
+                time_limit = self.time_limit
+            pondered = self._end_ponder(board)
+            if pondered:
+                pondered._adopt(on_progress, None, None)
+                return pondered.result(timeout=time_limit)
+            book_move = self._get_book_move(board)
+            if book_move:
+                return book_move
+            return self._get_minimax_move(board, max_depth, time_limit, self.node_limit,
+                                          on_progress)
+    
+    def start_search(self, board: chess.Board,
+                     on_progress: Optional[Callable[[dict], None]] = None,
+                     on_done: Optional[Callable[[Optional[chess.Move]], None]] = None,
+                     dispatch: Optional[Callable[[Callable[[], None]], None]] = None
+                     ) -> SearchHandle:
+        """
+        Search for a move on a background thread, so the caller never blocks
+        
+        Any search still running is cancelled first, unless it is pondering
+        this very position: then that search carries on under this move's
+        time budget. Callbacks run on the search thread unless dispatch is
+        given, e.g. `lambda callback: root.after(0, callback)` to run them
+        on the Tk main loop; a cancelled search makes no further calls.
+        
+        Args:
+            board: Position to search (copied; the caller may keep playing on it)
+            on_progress: Called after each finished depth, as for get_move
+            on_done: Called with the chosen move
+            dispatch: Runs a callback on the thread that should handle it
+        
+        Returns:
+            Handle to stop, cancel or wait for the search
+        """
+        self._cancel(self._search_handle)
+        self._search_handle = None
+        pondered = self._end_ponder(board)
+        if pondered:
+            pondered._adopt(on_progress, on_done, dispatch)
+            if not pondered.done():
+                time_limit = SEARCH_LIMITS.get(self.difficulty, SEARCH_LIMITS['hard'])[1]
+                if self.time_limit is not None:
+                    time_limit = self.time_limit
+                timer = threading.Timer(time_limit, pondered.stop)
+                timer.daemon = True
+                timer.start()
+            self._search_handle = pondered
+            return pondered
+        
+        handle = SearchHandle(on_progress, on_done, dispatch)
+        self._start(board, self.get_move, handle)
+        self._search_handle = handle
+        return handle
+    
+    def ponder(self, board: chess.Board,
+               on_progress: Optional[Callable[[dict], None]] = None,
+               dispatch: Optional[Callable[[Callable[[], None]], None]] = None
+               ) -> Optional[chess.Move]:
+        """
+        Think on the opponent's time about the reply expected from them
+        
+        Call with the opponent to move, after playing the AI's move. The
+        expected reply is the table's best move for the position, and the
+        position after it is searched in the background with no time
+        limit. When the next move is asked for, that search carries on
+        under the move's normal budget if the opponent played the expected
+        reply; otherwise it is cancelled, leaving its table entries and
+        ordering data to the fresh search.
+        
+        Returns:
+            The expected reply, or None if there is nothing to ponder
+        """
+        self.cancel_search()
+        if self.use_stockfish or self.difficulty == 'easy' or not self.tt:
+            return None
+        expected = self.tt.best_move(zobrist_key(board))
+        if expected is None or not board.is_legal(expected):
+            return None
+        position = board.copy()
+        position.push(expected)
+        if position.is_game_over():
+            return None
+        max_depth = SEARCH_LIMITS.get(self.difficulty, SEARCH_LIMITS['hard'])[0]
+        handle = SearchHandle(on_progress, None, dispatch)
+        self._start(position, lambda board, progress: self._get_minimax_move(
+            board, max_depth, on_progress=progress), handle)
+        self._ponder_handle, self._ponder_key = handle, zobrist_key(position)
+        return expected
+    
+    def cancel_search(self):
+        """Cancel any background search or pondering, and wait for it to unwind"""
+        self._cancel(self._search_handle)
+        self._cancel(self._ponder_handle)
+        self._search_handle = self._ponder_handle = self._ponder_key = None
+    
+    def _start(self, board: chess.Board,
+               search: Callable[[chess.Board, Callable[[dict], None]], Optional[chess.Move]],
+               handle: SearchHandle):
+        """Run search(board, on_progress) on a new thread, reporting through handle"""
+        board = board.copy()
+        
+        def run():
+            self._stop = handle._stop
+            try:
+                move = search(board, handle._progress)
+            except Exception as e:
+                handle.future.set_exception(e)
+                return
+            finally:
+                self._stop = None
+            handle._finish(move)
+        
+        handle._thread = threading.Thread(target=run, daemon=True)
+        handle._thread.start()
+    
+    def _cancel(self, handle: Optional[SearchHandle]):
+        """Cancel a background search and wait for its thread"""
+        if handle is None:
+            return
+        handle.cancel()
+        if handle._thread and handle._thread is not threading.current_thread():
+            handle._thread.join()
+    
+    def _end_ponder(self, board: chess.Board) -> Optional[SearchHandle]:
+        """
+        Stop pondering before searching board
+        
+        Returns:
+            The ponder search if it is searching board (a ponder hit),
+            otherwise None after cancelling it
+        """
+        handle, key = self._ponder_handle, self._ponder_key
+        self._ponder_handle = self._ponder_key = None
+        if handle is None:
+            return None
+        if key == zobrist_key(board) and not handle.cancelled:
+            self.ponder_hits += 1
+            return handle
+        self.ponder_misses += 1
+        self._cancel(handle)
+        return None
+    
+    def _get_book_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """Weighted random move from the opening book, if the position is in it"""
+        if not self.book:
+            return None
+        started = time.perf_counter()
+        move = self.book.choose(board)
+        if move:
+            self.last_search = {"book": True, "depth": 0, "score": 0, "nodes": 0,
+                                "time_s": time.perf_counter() - started}
+        return move
     
     def _get_stockfish_move(self, board: chess.Board) -> Optional[chess.Move]:
         """Get move from Stockfish engine"""
@@ -81,7 +405,7 @@ class ChessAI:
             result = self.stockfish_engine.play(board, chess.engine.Limit(time=0.1))
             return result.move
         except:
-            return self._get_minimax_move(board, depth=2)
+            return self._get_minimax_move(board, 2, time_limit=0.1)
     
     def _get_random_move(self, board: chess.Board) -> Optional[chess.Move]:
         """Get random legal move"""
@@ -90,85 +414,432 @@ class ChessAI:
             return None
         return random.choice(legal_moves)
     
-    def _get_minimax_move(self, board: chess.Board, depth: int = 2) -> Optional[chess.Move]:
-        """Get move using minimax algorithm with alpha-beta pruning"""
-        best_move = None
-        best_value = float('-inf')
-        alpha = float('-inf')
-        beta = float('inf')
+    def new_game(self):
+        """Forget positions from the previous game"""
+        self.cancel_search()
+        if self.tt:
+            self.tt.clear()
+    
+    def _get_minimax_move(self, board: chess.Board, depth: int = 2,
+                          time_limit: Optional[float] = None,
+                          node_limit: Optional[int] = None,
+                          on_progress: Optional[Callable[[dict], None]] = None
+                          ) -> Optional[chess.Move]:
+        """
+        Get move by iterative deepening alpha-beta search
         
-        for move in board.legal_moves:
-            board.push(move)
-            value = self._minimax(board, depth - 1, alpha, beta, False)
-            board.pop()
-            
-            if value > best_value:
-                best_value = value
-                best_move = move
-            
-            alpha = max(alpha, best_value)
+        Searches depth 1, 2, ... up to depth until the time or node budget
+        runs out, and returns the best move of the deepest iteration that
+        finished. Depth 1 always finishes unless the search is stopped from
+        outside, in which case the first ordered move is played.
+        """
+        tt = self.tt
+        if tt:
+            tt.new_search()
+            tt.reset_stats()
+        if self.orderer:
+            self.orderer.new_search()
+        self.nodes = self.qnodes = self.cutoffs = self.first_move_cutoffs = 0
+        self.null_cutoffs = self.futility_prunes = self.reduction_researches = 0
+        self.researches = 0
+        started = time.perf_counter()
+        
+        # Search a copy so the caller's board keeps its move stack untouched
+        search_board = board.copy()
+        key = zobrist_key(search_board)
+        root_moves = list(search_board.legal_moves)
+        if self.orderer:
+            tt_move = tt.best_move(key) if tt else None
+            root_moves = self.orderer.order(search_board, root_moves, tt_move, 0)
+        best_move, best_score, completed = None, 0, 0
+        
+        self._deadline = self._node_budget = None
+        for iteration in range(1, max(depth, 1) + 1):
+            try:
+                best_score, root_moves = self._search_iteration(search_board, key, iteration,
+                                                                root_moves, best_score)
+            except SearchAborted:
+                break
+            finally:
+                # Unwind whatever the aborted iteration left on the board
+                while len(search_board.move_stack) > len(board.move_stack):
+                    search_board.pop()
+            best_move, completed = (root_moves[0] if root_moves else None), iteration
+            if on_progress:
+                on_progress({"depth": iteration, "score": best_score, "move": best_move,
+                             "nodes": self.nodes, "time_s": time.perf_counter() - started})
+            if not root_moves or abs(best_score) > MATE_BOUND:
+                break  # No moves, or a forced mate needs no deeper look
+            if iteration == 1:
+                # Budgets apply once there is a move to fall back on
+                if time_limit is not None:
+                    self._deadline = started + time_limit
+                if node_limit is not None:
+                    self._node_budget = node_limit
+            if self._deadline and time.perf_counter() >= self._deadline:
+                break
+        self._deadline = self._node_budget = None
+        if best_move is None and root_moves:
+            best_move = root_moves[0]  # Stopped before depth 1 finished
         
+        elapsed = time.perf_counter() - started
+        self.last_search = {
+            "depth": completed,
+            "score": best_score,
+            "nodes": self.nodes,
+            "qnodes": self.qnodes,
+            "time_s": elapsed,
+            "nps": self.nodes / elapsed if elapsed else 0.0,
+            "tt_hit_rate": tt.hit_rate if tt else 0.0,
+            "first_move_cutoff_rate": (self.first_move_cutoffs / self.cutoffs
+                                       if self.cutoffs else 0.0),
+            "null_cutoffs": self.null_cutoffs,
+            "futility_prunes": self.futility_prunes,
+            "reduction_researches": self.reduction_researches,
+            "aspiration_researches": self.researches,
+        }
         return best_move
     
-    def _minimax(self, board: chess.Board, depth: int, alpha: float, 
-                 beta: float, maximizing: bool) -> float:
-        """Minimax algorithm with alpha-beta pruning"""
-        if depth == 0 or board.is_game_over():
-            return self._evaluate_board(board)
-        
-        if maximizing:
-            max_eval = float('-inf')
-            for move in board.legal_moves:
-                board.push(move)
-                eval_score = self._minimax(board, depth - 1, alpha, beta, False)
-                board.pop()
-                max_eval = max(max_eval, eval_score)
-                alpha = max(alpha, eval_score)
-                if beta <= alpha:
-                    break
-            return max_eval
+    def _search_root(self, board: chess.Board, key: int, depth: int, moves: list,
+                     alpha: int = -INFINITY, beta: int = INFINITY):
+        """
+        Search every root move to depth within the window (alpha, beta)
+        
+        Moves are searched in the order given, which is the previous
+        iteration's ranking, and returned ranked by this iteration's
+        scores (moves that failed low keep their relative order). A score
+        outside the window is only a bound, and the caller re-searches.
+        
+        Returns:
+            (best score, moves best first)
+        """
+        self.nodes += 1
+        if self.evaluator:
+            self.evaluator.reset(board)
+        original_alpha = alpha
+        best_score = -INFINITY
+        scores = {}
+        for index, move in enumerate(moves):
+            child_key = self._push(board, move, key)
+            if index == 0 or not self.pvs:
+                score = -self._minimax(board, child_key, depth - 1, -beta, -alpha, 1)
+            else:
+                score = -self._minimax(board, child_key, depth - 1, -alpha - 1, -alpha, 1)
+                if alpha < score < beta:
+                    score = -self._minimax(board, child_key, depth - 1, -beta, -alpha, 1)
+            self._pop(board)
+            scores[move] = score
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break  # Fail high; the window is widened and searched again
+        ranked = sorted(moves, key=lambda move: -scores.get(move, -INFINITY))
+        if self.tt and ranked:
+            if best_score >= beta:
+                bound = BOUND_LOWER
+            elif best_score <= original_alpha:
+                bound = BOUND_UPPER
+            else:
+                bound = BOUND_EXACT
+            self.tt.store(key, depth, bound, _score_to_tt(best_score, 0), encode_move(ranked[0]))
+        return best_score, ranked
+    
+    def _search_iteration(self, board: chess.Board, key: int, depth: int, moves: list,
+                          previous_score: int):
+        """
+        Search the root to depth, inside an aspiration window when enabled
+        
+        The window is centered on the previous iteration's score; a result
+        outside it is searched again with that side of the window opened.
+        
+        Returns:
+            (best score, moves best first)
+        """
+        alpha, beta = -INFINITY, INFINITY
+        if (self.aspiration and depth >= ASPIRATION_MIN_DEPTH
+                and abs(previous_score) < MATE_BOUND):
+            alpha, beta = previous_score - ASPIRATION_WINDOW, previous_score + ASPIRATION_WINDOW
+        while True:
+            score, moves = self._search_root(board, key, depth, moves, alpha, beta)
+            if score <= alpha:
+                alpha = -INFINITY
+            elif score >= beta:
+                beta = INFINITY
+            else:
+                return score, moves
+            self.researches += 1
+    
+    def _minimax(self, board: chess.Board, key: int, depth: int, alpha: int,
+                 beta: int, ply: int, allow_null: bool = True) -> int:
+        """
+        Alpha-beta search in negamax form
+        
+        Outside the principal variation (null windows), a node may be cut
+        by a null move, frontier nodes skip quiet moves that cannot reach
+        alpha (futility pruning), and late quiet moves are searched
+        shallower first (late move reductions). With principal variation
+        search, moves after the first get a null window and are searched
+        again only if they beat alpha.
+        
+        Args:
+            key: Zobrist key of the position, updated incrementally
+            ply: Distance from the root, for mate scores
+            allow_null: Whether a null move may be tried (never twice in a row)
+        
+        Returns:
+            Score from the side to move's perspective
+        """
+        self.nodes += 1
+        if self._node_budget is not None and self.nodes > self._node_budget:
+            raise SearchAborted()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchAborted()
+        if self._stop is not None and self._stop.is_set():
+            raise SearchAborted()
+        tt = self.tt
+        tt_move = None
+        if tt:
+            entry = tt.probe(key)
+            if entry:
+                tt_depth, bound, score, code = entry
+                tt_move = decode_move(code)
+                if tt_depth >= depth:
+                    score = _score_from_tt(score, ply)
+                    if (bound == BOUND_EXACT or (bound == BOUND_LOWER and score >= beta)
+                            or (bound == BOUND_UPPER and score <= alpha)):
+                        return score
+        # A drawn ending needs no search; won ones are searched for the mate
+        if (self.bitbases and chess.popcount(board.occupied) == 3
+                and self.bitbases.probe(board) == 0):
+            return 0
+        
+        if depth <= 0:
+            if self.quiescence:
+                score = self._quiescence(board, alpha, beta, ply)
+                if score >= beta:
+                    bound = BOUND_LOWER
+                elif score <= alpha:
+                    bound = BOUND_UPPER
+                else:
+                    bound = BOUND_EXACT
+            elif board.is_check() and not any(board.generate_legal_moves()):
+                score, bound = -MATE_SCORE + ply, BOUND_EXACT
+            else:
+                score, bound = self._evaluate_board(board), BOUND_EXACT
+            if tt:
+                # Leaves reached by transposition skip the evaluation
+                tt.store(key, 0, bound, _score_to_tt(score, ply), 0)
+            return score
+        
+        moves = list(board.legal_moves)
+        if not moves:
+            return -MATE_SCORE + ply if board.is_check() else 0
+        if board.is_insufficient_material():
+            return 0
+        
+        in_check = board.is_check()
+        pv_node = beta - alpha > 1
+        static_eval = None
+        if not in_check and not pv_node and (self.null_move or self.futility):
+            static_eval = self._evaluate_board(board)
+        
+        # Null move: if passing still fails high, a real move surely would.
+        # Not in check, and not with only pawns left, where passing may be
+        # the only good move (zugzwang)
+        if (self.null_move and allow_null and static_eval is not None
+                and depth >= NULL_MOVE_MIN_DEPTH and static_eval >= beta
+                and abs(beta) < MATE_BOUND
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings)):
+            reduction = NULL_MOVE_REDUCTION + (depth >= 7)
+            child_key = self._push(board, chess.Move.null(), key)
+            score = -self._minimax(board, child_key, depth - 1 - reduction, -beta, -beta + 1,
+                                   ply + 1, allow_null=False)
+            self._pop(board)
+            if score >= beta:
+                self.null_cutoffs += 1
+                return beta if score > MATE_BOUND else score
+        
+        # Futility: at frontier nodes far below alpha, only tactical moves can help
+        futile = (self.futility and static_eval is not None and depth <= len(FUTILITY_MARGINS)
+                  and abs(alpha) < MATE_BOUND
+                  and static_eval + FUTILITY_MARGINS[depth - 1] <= alpha)
+        
+        if self.orderer:
+            moves = self.orderer.order(board, moves, tt_move, ply)
+        elif tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, None
+        for index, move in enumerate(moves):
+            quiet = not (move.promotion or board.is_capture(move))
+            reduction = 0
+            if quiet and index > 0 and not in_check and (
+                    futile or (self.lmr and index >= LMR_MIN_MOVES and depth >= LMR_MIN_DEPTH)):
+                if not board.gives_check(move):
+                    if futile:
+                        self.futility_prunes += 1
+                        best_score = max(best_score, static_eval + FUTILITY_MARGINS[depth - 1])
+                        continue
+                    reduction = 1 if index < LMR_MIN_MOVES * 2 else 2
+            
+            child_key = self._push(board, move, key)
+            if index == 0:
+                score = -self._minimax(board, child_key, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # Reduced and null-window searches only need to show the move fails low
+                window = -alpha - 1 if self.pvs else -beta
+                score = -self._minimax(board, child_key, depth - 1 - reduction, window, -alpha,
+                                       ply + 1)
+                if reduction and score > alpha:
+                    self.reduction_researches += 1
+                    score = -self._minimax(board, child_key, depth - 1, window, -alpha, ply + 1)
+                if self.pvs and alpha < score < beta:
+                    score = -self._minimax(board, child_key, depth - 1, -beta, -alpha, ply + 1)
+            self._pop(board)
+            if score > best_score:
+                best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        if index == 0:
+                            self.first_move_cutoffs += 1
+                        if self.orderer:
+                            self.orderer.record_cutoff(board, move, depth, ply)
+                        break
+        
+        if tt:
+            if best_score >= beta:
+                bound = BOUND_LOWER
+            elif best_score <= original_alpha:
+                bound = BOUND_UPPER
+            else:
+                bound = BOUND_EXACT
+            tt.store(key, depth, bound, _score_to_tt(best_score, ply), encode_move(best_move))
+        return best_score
+    
+    def _quiescence(self, board: chess.Board, alpha: int, beta: int, ply: int) -> int:
+        """
+        Search captures only, so the horizon never falls mid-exchange
+        
+        The side to move may stand pat on the static evaluation. Captures
+        that cannot lift alpha even winning the piece outright (delta
+        pruning), or that lose material on the square (static exchange
+        evaluation), are skipped without being searched. In check, every
+        evasion is searched instead.
+        
+        Returns:
+            Score from the side to move's perspective
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if self._node_budget is not None and self.nodes > self._node_budget:
+            raise SearchAborted()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchAborted()
+        if self._stop is not None and self._stop.is_set():
+            raise SearchAborted()
+        
+        if board.is_check():
+            moves = list(board.legal_moves)
+            if not moves:
+                return -MATE_SCORE + ply
+            best_score = -INFINITY
         else:
-            min_eval = float('inf')
-            for move in board.legal_moves:
-                board.push(move)
-                eval_score = self._minimax(board, depth - 1, alpha, beta, True)
-                board.pop()
-                min_eval = min(min_eval, eval_score)
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break
-            return min_eval
-    
-    def _evaluate_board(self, board: chess.Board) -> float:
+            stand_pat = self._evaluate_board(board)
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            best_score = stand_pat
+            
+            moves = []
+            for move in board.generate_legal_captures():
+                victim = board.piece_type_at(move.to_square) or chess.PAWN  # Or en passant
+                gain = PIECE_VALUES[victim]
+                if move.promotion:
+                    gain += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+                if stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue  # Delta pruning
+                if static_exchange(board, move, PIECE_VALUES) < 0:
+                    continue
+                moves.append(move)
+            moves.extend(move for move in board.generate_legal_moves(
+                board.pawns & board.occupied_co[board.turn], ~board.occupied)
+                if move.promotion == chess.QUEEN)
+            if self.orderer:
+                moves = self.orderer.order(board, moves, None, ply)
+        
+        for move in moves:
+            self._push(board, move)
+            score = -self._quiescence(board, -beta, -alpha, ply + 1)
+            self._pop(board)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+    
+    def _push(self, board: chess.Board, move: chess.Move,
+              key: Optional[int] = None) -> Optional[int]:
+        """Make a move, keeping the evaluation and (if given) the Zobrist key in step"""
+        if self.evaluator:
+            self.evaluator.push(board, move)
+        if key is None:
+            board.push(move)
+            return None
+        return push_with_key(board, move, key)
+    
+    def _pop(self, board: chess.Board):
+        """Unmake the last move made by _push"""
+        board.pop()
+        if self.evaluator:
+            self.evaluator.pop()
+    
+    def _evaluate_board(self, board: chess.Board) -> int:
         """
         Evaluate board position
         
+        With the incremental evaluator this is a lookup plus king and
+        mobility terms; mates and stalemates are left to the search, which
+        finds them when it generates moves. Endings the bitbases cover are
+        scored as known wins or draws.
+        
         Returns:
-            Score from white's perspective (positive = white advantage)
+            Score from the side to move's perspective
         """
+        if self.bitbases and chess.popcount(board.occupied) == 3:
+            result = self.bitbases.probe(board)
+            if result is not None:
+                if not result:
+                    return 0
+                score = KNOWN_WIN + mop_up(board, board.turn if result > 0 else not board.turn)
+                return score if result > 0 else -score
+        if self.evaluator:
+            return self.evaluator.evaluate(board)
+        return self._scan_evaluate(board)
+    
+    def _scan_evaluate(self, board: chess.Board) -> int:
+        """Evaluate by scanning every square and generating legal moves"""
         if board.is_checkmate():
-            return -10000 if board.turn else 10000
+            return -MATE_SCORE
         
         if board.is_stalemate() or board.is_insufficient_material():
             return 0
         
-        # Piece values
-        piece_values = {
-            chess.PAWN: 100,
-            chess.KNIGHT: 320,
-            chess.BISHOP: 330,
-            chess.ROOK: 500,
-            chess.QUEEN: 900,
-            chess.KING: 20000
-        }
-        
         score = 0
         
         # Material count
         for square in chess.SQUARES:
             piece = board.piece_at(square)
             if piece:
-                value = piece_values.get(piece.piece_type, 0)
+                value = PIECE_VALUES.get(piece.piece_type, 0)
                 score += value if piece.color == chess.WHITE else -value
         
         # Mobility (number of legal moves)
@@ -186,6 +857,9 @@ class ChessAI:
     
     def close(self):
         """Clean up resources"""
+        self.cancel_search()
+        if self.book:
+            self.book.close()
         if self.stockfish_engine:
             try:
                 self.stockfish_engine.quit()
@@ -193,18 +867,53 @@ class ChessAI:
                 pass
 
 
+def _score_to_tt(score: int, ply: int) -> int:
+    """Store mate scores relative to the node rather than the root"""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    """Convert a stored mate score back to distance from the root"""
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
 class AIOpponent:
     """Wrapper for AI opponent with personality"""
     
-    def __init__(self, name: str = "Computer", difficulty: str = 'medium'):
+    def __init__(self, name: str = "Computer", difficulty: str = 'medium',
+                 book: Optional[str] = None):
         self.name = name
-        self.ai = ChessAI(difficulty)
+        self.ai = ChessAI(difficulty, book=book)
         self.difficulty = difficulty
     
     def get_move(self, board: chess.Board) -> Optional[chess.Move]:
         """Get AI's move"""
         return self.ai.get_move(board)
     
+    def start_move(self, board: chess.Board,
+                   on_progress: Optional[Callable[[dict], None]] = None,
+                   on_done: Optional[Callable[[Optional[chess.Move]], None]] = None,
+                   dispatch: Optional[Callable[[Callable[[], None]], None]] = None
+                   ) -> SearchHandle:
+        """Get AI's move without blocking; see ChessAI.start_search"""
+        return self.ai.start_search(board, on_progress, on_done, dispatch)
+    
+    def cancel_move(self):
+        """Abandon the move being searched, e.g. after an undo or resignation"""
+        self.ai.cancel_search()
+    
+    def ponder(self, board: chess.Board) -> Optional[chess.Move]:
+        """Think during the opponent's turn; see ChessAI.ponder"""
+        return self.ai.ponder(board)
+    
     def get_personality_message(self, event: str) -> str:
         """Get personality-based message"""
         messages = {
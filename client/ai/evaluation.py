@@ -0,0 +1,245 @@
+"""
+Incremental evaluation for the AI search
+Material and piece-square scores are updated move by move as the search
+makes and unmakes moves; leaves add king placement by game phase and
+mobility from attack bitboards, so no leaf scans the board or generates
+moves
+"""
+
+from typing import List
+
+import chess
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 20000
+}
+
+# Piece-square bonuses from white's side, rank 8 first as on a diagram
+_PAWN_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+_KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+]
+_QUEEN_TABLE = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+]
+# The king hides in the middlegame and centralizes in the endgame
+_KING_MIDDLEGAME_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+_KING_ENDGAME_TABLE = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+# Game phase from the pieces left: 24 with all minor and major pieces, 0 with none
+PHASE_WEIGHTS = {chess.KNIGHT: 1, chess.BISHOP: 1, chess.ROOK: 2, chess.QUEEN: 4}
+MAX_PHASE = 24
+
+# Score per square attacked and not occupied by an own piece
+MOBILITY_WEIGHTS = {chess.KNIGHT: 4, chess.BISHOP: 5, chess.ROOK: 2, chess.QUEEN: 1}
+
+
+def _signed_table(table: List[int], value: int, color: chess.Color) -> List[int]:
+    """Material plus bonus by square, signed from white's side"""
+    if color == chess.WHITE:
+        return [value + table[square ^ 56] for square in chess.SQUARES]
+    return [-(value + table[square]) for square in chess.SQUARES]
+
+
+_TABLES = {
+    chess.PAWN: _PAWN_TABLE,
+    chess.KNIGHT: _KNIGHT_TABLE,
+    chess.BISHOP: _BISHOP_TABLE,
+    chess.ROOK: _ROOK_TABLE,
+    chess.QUEEN: _QUEEN_TABLE,
+}
+
+# Tables below are indexed by color, and chess.BLACK is False (0)
+_BY_COLOR = (chess.BLACK, chess.WHITE)
+
+# PIECE_SQUARE[color][piece_type][square]; kings are scored at the leaf
+PIECE_SQUARE = [
+    [[0] * 64] + [_signed_table(_TABLES[piece_type], PIECE_VALUES[piece_type], color)
+                  if piece_type in _TABLES else [0] * 64
+                  for piece_type in chess.PIECE_TYPES]
+    for color in _BY_COLOR
+]
+KING_MIDDLEGAME = [_signed_table(_KING_MIDDLEGAME_TABLE, 0, color) for color in _BY_COLOR]
+KING_ENDGAME = [_signed_table(_KING_ENDGAME_TABLE, 0, color) for color in _BY_COLOR]
+
+
+def material_and_squares(board: chess.Board) -> int:
+    """Material and piece-square score from scratch, from white's side"""
+    return sum(PIECE_SQUARE[piece.color][piece.piece_type][square]
+               for square, piece in board.piece_map().items())
+
+
+def _mobility(board: chess.Board, color: chess.Color) -> int:
+    """Weighted count of squares a side's pieces attack, not counting its own"""
+    occupied = board.occupied
+    mine = board.occupied_co[color]
+    targets = ~mine
+    score = 0
+    for square in chess.scan_forward(board.knights & mine):
+        score += (chess.popcount(chess.BB_KNIGHT_ATTACKS[square] & targets)
+                  * MOBILITY_WEIGHTS[chess.KNIGHT])
+    for piece_type, pieces in ((chess.BISHOP, board.bishops), (chess.ROOK, board.rooks),
+                               (chess.QUEEN, board.queens)):
+        weight = MOBILITY_WEIGHTS[piece_type]
+        for square in chess.scan_forward(pieces & mine):
+            attacks = 0
+            if piece_type != chess.ROOK:
+                attacks = chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+            if piece_type != chess.BISHOP:
+                attacks |= (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+                            | chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied])
+            score += chess.popcount(attacks & targets) * weight
+    return score
+
+
+def game_phase(board: chess.Board) -> int:
+    """MAX_PHASE with all pieces on the board, falling to 0 with only kings and pawns"""
+    phase = sum(weight * chess.popcount(board.pieces_mask(piece_type, chess.WHITE)
+                                        | board.pieces_mask(piece_type, chess.BLACK))
+                for piece_type, weight in PHASE_WEIGHTS.items())
+    return min(MAX_PHASE, phase)
+
+
+def mop_up(board: chess.Board, strong: chess.Color) -> int:
+    """
+    Progress in a won ending, for the winning side: the lone king driven
+    to the edge, the kings close together, a pawn advanced
+    """
+    weak_king = board.king(not strong)
+    strong_king = board.king(strong)
+    file, rank = chess.square_file(weak_king), chess.square_rank(weak_king)
+    score = 10 * (max(3 - file, file - 4) + max(3 - rank, rank - 4))
+    score += 4 * (14 - chess.square_manhattan_distance(strong_king, weak_king))
+    for square in chess.scan_forward(board.occupied_co[strong] & ~board.kings):
+        piece_type = board.piece_type_at(square)
+        score += PIECE_VALUES[piece_type]
+        if piece_type == chess.PAWN:
+            score += 20 * chess.square_rank(square if strong == chess.WHITE else square ^ 56)
+    return score
+
+
+class Evaluator:
+    """
+    Static evaluation kept in step with a board during search
+    
+    Call reset() with the root position, then push() before every
+    board.push() and pop() after every board.pop().
+    """
+    
+    def __init__(self):
+        self.scores: List[int] = [0]
+    
+    def reset(self, board: chess.Board):
+        """Start tracking a position"""
+        self.scores = [material_and_squares(board)]
+    
+    def push(self, board: chess.Board, move: chess.Move):
+        """Update for a move about to be pushed on board (a null move changes nothing)"""
+        delta = 0
+        if move:
+            color = board.turn
+            own = PIECE_SQUARE[color]
+            from_square, to_square = move.from_square, move.to_square
+            piece_type = board.piece_type_at(from_square)
+            if board.is_castling(move):
+                # The king is scored at the leaf; only the rook's squares change
+                rank = from_square & 56
+                if to_square > from_square:
+                    delta = own[chess.ROOK][rank + 5] - own[chess.ROOK][rank + 7]
+                else:
+                    delta = own[chess.ROOK][rank + 3] - own[chess.ROOK][rank]
+            else:
+                delta = own[move.promotion or piece_type][to_square] - own[piece_type][from_square]
+                captured = board.piece_type_at(to_square)
+                if captured:
+                    delta -= PIECE_SQUARE[not color][captured][to_square]
+                elif piece_type == chess.PAWN and to_square == board.ep_square:
+                    delta -= PIECE_SQUARE[not color][chess.PAWN][to_square ^ 8]
+        self.scores.append(self.scores[-1] + delta)
+    
+    def pop(self):
+        """Undo the last push"""
+        self.scores.pop()
+    
+    def evaluate(self, board: chess.Board) -> int:
+        """Score of the tracked position from the side to move's perspective"""
+        score = self.scores[-1]
+        
+        # King placement, blended from middlegame to endgame by the material left
+        phase = game_phase(board)
+        white_king = board.king(chess.WHITE)
+        black_king = board.king(chess.BLACK)
+        if white_king is not None and black_king is not None:
+            middlegame = (KING_MIDDLEGAME[chess.WHITE][white_king]
+                          + KING_MIDDLEGAME[chess.BLACK][black_king])
+            endgame = KING_ENDGAME[chess.WHITE][white_king] + KING_ENDGAME[chess.BLACK][black_king]
+            score += (middlegame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
+        
+        score += _mobility(board, chess.WHITE) - _mobility(board, chess.BLACK)
+        return score if board.turn == chess.WHITE else -score
@@ -0,0 +1,80 @@
+"""
+Move ordering for the AI search
+Alpha-beta prunes most when the best move comes first: the table move,
+then captures by MVV-LVA, then killer moves, then quiet moves by history
+"""
+
+from typing import List, Optional
+
+import chess
+
+MAX_PLY = 128
+
+# Ordering tiers; each tier's scores stay below the one above it
+ORDER_TT = 1 << 30
+ORDER_CAPTURE = 1 << 24
+ORDER_KILLER = 1 << 22
+HISTORY_MAX = ORDER_KILLER - 1  # History scores are halved before reaching killers
+
+
+class MoveOrderer:
+    """
+    Orders moves at each node and learns from beta cutoffs
+    
+    Killers are the last two quiet moves that caused a cutoff at a ply;
+    history scores count cutoffs by side, from- and to-square, weighted
+    by depth squared, and carry over between searches at half weight.
+    """
+    
+    def __init__(self):
+        self.killers: List[List[Optional[chess.Move]]] = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)
+    
+    def new_search(self):
+        """Reset killers and age history before a search"""
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        self.history = [value >> 1 for value in self.history]
+    
+    def order(self, board: chess.Board, moves: List[chess.Move],
+              tt_move: Optional[chess.Move], ply: int) -> List[chess.Move]:
+        """Sort moves most promising first"""
+        killer1, killer2 = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history
+        side = 0 if board.turn == chess.WHITE else 4096
+        piece_type_at = board.piece_type_at
+        occupied = board.occupied
+        scores = []
+        for move in moves:
+            if move == tt_move:
+                score = ORDER_TT
+            elif occupied & chess.BB_SQUARES[move.to_square] or move.promotion:
+                # Most valuable victim first, least valuable attacker breaking ties
+                victim = piece_type_at(move.to_square) or 0
+                score = (ORDER_CAPTURE + 10 * (victim + (move.promotion or 0))
+                         - piece_type_at(move.from_square))
+            elif move == killer1:
+                score = ORDER_KILLER + 1
+            elif move == killer2:
+                score = ORDER_KILLER
+            elif board.is_en_passant(move):
+                score = ORDER_CAPTURE + 10 * chess.PAWN - chess.PAWN
+            else:
+                score = history[side + (move.from_square << 6) + move.to_square]
+            scores.append(score)
+        order = sorted(range(len(moves)), key=scores.__getitem__, reverse=True)
+        return [moves[i] for i in order]
+    
+    def record_cutoff(self, board: chess.Board, move: chess.Move, depth: int, ply: int):
+        """Credit a move that failed high; only quiet moves are remembered"""
+        if move.promotion or board.is_capture(move):
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        index = (0 if board.turn == chess.WHITE else 4096) + (move.from_square << 6) + move.to_square
+        self.history[index] += depth * depth
+        if self.history[index] > HISTORY_MAX:
+            self.history = [value >> 1 for value in self.history]
@@ -0,0 +1,193 @@
+"""
+Polyglot opening book
+Reads .bin books through a memory map, finding a position's moves by
+binary search on its Zobrist key, so no part of the book is loaded into
+Python objects; books can be built from PGN collections
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import chess
+import chess.pgn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from common.zobrist import zobrist_key
+
+# Entry: key (8), move (2), weight (2), learn (4), big-endian, sorted by key
+ENTRY = struct.Struct(">QHHI")
+_KEY = struct.Struct(">Q")
+MAX_WEIGHT = 0xFFFF
+
+DEFAULT_BOOK_PLIES = 16  # Plies of each game recorded when building a book
+
+# Polyglot writes castling as the king taking its own rook
+_CASTLING_FROM_BOOK = {
+    (chess.E1, chess.H1): chess.G1, (chess.E1, chess.A1): chess.C1,
+    (chess.E8, chess.H8): chess.G8, (chess.E8, chess.A8): chess.C8,
+}
+_CASTLING_TO_BOOK = {(from_square, to_square): rook
+                     for (from_square, rook), to_square in _CASTLING_FROM_BOOK.items()}
+
+
+def decode_book_move(board: chess.Board, raw: int) -> chess.Move:
+    """Turn a Polyglot move into a move on board"""
+    to_square = raw & 0x3F
+    from_square = (raw >> 6) & 0x3F
+    promotion = (raw >> 12) & 0x7
+    if ((from_square, to_square) in _CASTLING_FROM_BOOK
+            and board.kings & chess.BB_SQUARES[from_square]):
+        to_square = _CASTLING_FROM_BOOK[from_square, to_square]
+    return chess.Move(from_square, to_square, promotion + 1 if promotion else None)
+
+
+def encode_book_move(board: chess.Board, move: chess.Move) -> int:
+    """Turn a move on board into a Polyglot move"""
+    to_square = move.to_square
+    if board.is_castling(move):
+        to_square = _CASTLING_TO_BOOK[move.from_square, move.to_square]
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+class OpeningBook:
+    """
+    Memory-mapped Polyglot book
+    
+    Probing costs a binary search over the mapped file; the operating
+    system pages in only the parts that are read.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        with open(path, 'rb') as book_file:
+            size = os.fstat(book_file.fileno()).st_size
+            if size:
+                self._map = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.entries = size // ENTRY.size
+        self.probes = 0
+        self.hits = 0
+    
+    def close(self):
+        """Unmap the book"""
+        if self._map:
+            self._map.close()
+            self._map = None
+    
+    def _first(self, key: int) -> int:
+        """Index of the first entry with a key not below key"""
+        low, high = 0, self.entries
+        book = self._map
+        while low < high:
+            middle = (low + high) // 2
+            if _KEY.unpack_from(book, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def moves(self, board: chess.Board) -> List[Tuple[chess.Move, int]]:
+        """Legal book moves for a position with their weights"""
+        self.probes += 1
+        if not self._map:
+            return []
+        key = zobrist_key(board)
+        stored = []
+        index = self._first(key)
+        while index < self.entries:
+            entry_key, raw, weight, _ = ENTRY.unpack_from(self._map, index * ENTRY.size)
+            if entry_key != key:
+                break
+            stored.append((raw, weight))
+            index += 1
+        if not stored:
+            return []
+        # Keys can collide, so moves are checked against the position
+        legal = set(board.generate_legal_moves())
+        found = [(move, weight) for move, weight in
+                 ((decode_book_move(board, raw), weight) for raw, weight in stored)
+                 if move in legal]
+        if found:
+            self.hits += 1
+        return found
+    
+    def choose(self, board: chess.Board,
+               rng: Optional[random.Random] = None) -> Optional[chess.Move]:
+        """Pick a book move at random in proportion to its weight, or None"""
+        candidates = [(move, weight) for move, weight in self.moves(board) if weight]
+        if not candidates:
+            return None
+        moves, weights = zip(*candidates)
+        return (rng or random).choices(moves, weights)[0]
+
+
+def build_book(pgn_paths: Iterable[str], out_path: str, plies: int = DEFAULT_BOOK_PLIES,
+               min_games: int = 1) -> int:
+    """
+    Build a Polyglot book from PGN files
+    
+    Each move in the first plies of a game scores 2 for the side that
+    played it if that side won, 1 for a draw and 0 for a loss, as
+    Polyglot's own builder does; moves that scored nothing or were
+    played in fewer than min_games games are left out.
+    
+    Returns:
+        Number of entries written
+    """
+    scores: Dict[Tuple[int, int], int] = defaultdict(int)
+    games: Dict[Tuple[int, int], int] = defaultdict(int)
+    for pgn_path in pgn_paths:
+        with open(pgn_path, encoding='utf-8', errors='replace') as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                result = game.headers.get("Result", "*")
+                if result not in ("1-0", "0-1", "1/2-1/2"):
+                    continue
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= plies:
+                        break
+                    entry = (zobrist_key(board), encode_book_move(board, move))
+                    if result == "1/2-1/2":
+                        scores[entry] += 1
+                    elif (result == "1-0") == (board.turn == chess.WHITE):
+                        scores[entry] += 2
+                    games[entry] += 1
+                    board.push(move)
+    
+    entries = [(key, raw, score) for (key, raw), score in scores.items()
+               if score and games[key, raw] >= min_games]
+    top = max((score for _, _, score in entries), default=0)
+    scale = MAX_WEIGHT / top if top > MAX_WEIGHT else 1
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+    with open(out_path, 'wb') as book:
+        for key, raw, score in entries:
+            book.write(ENTRY.pack(key, raw, max(1, int(score * scale)), 0))
+    return len(entries)
+
+
+def main():
+    """Build a book from PGN files"""
+    parser = argparse.ArgumentParser(description="Build a Polyglot opening book from PGN files")
+    parser.add_argument("pgn", nargs="+", help="PGN files to read")
+    parser.add_argument("-o", "--output", required=True, help="Book file to write")
+    parser.add_argument("--plies", type=int, default=DEFAULT_BOOK_PLIES)
+    parser.add_argument("--min-games", type=int, default=1)
+    args = parser.parse_args()
+    
+    count = build_book(args.pgn, args.output, args.plies, args.min_games)
+    print(f"📖 Wrote {count} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Static exchange evaluation
+Plays out every capture on one square, least valuable attacker first,
+to tell whether a capture wins or loses material without searching it
+"""
+
+from typing import Mapping
+
+import chess
+
+# Scan order for the least valuable attacker
+_ATTACKER_ORDER = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING)
+
+
+def _attackers(board: chess.Board, square: chess.Square, occupied: int) -> int:
+    """Pieces of both colors attacking square, seeing through removed pieces"""
+    rank_pieces = chess.BB_RANK_MASKS[square] & occupied
+    file_pieces = chess.BB_FILE_MASKS[square] & occupied
+    diag_pieces = chess.BB_DIAG_MASKS[square] & occupied
+    queens_and_rooks = board.queens | board.rooks
+    queens_and_bishops = board.queens | board.bishops
+    return occupied & (
+        (chess.BB_KING_ATTACKS[square] & board.kings)
+        | (chess.BB_KNIGHT_ATTACKS[square] & board.knights)
+        | (chess.BB_RANK_ATTACKS[square][rank_pieces] & queens_and_rooks)
+        | (chess.BB_FILE_ATTACKS[square][file_pieces] & queens_and_rooks)
+        | (chess.BB_DIAG_ATTACKS[square][diag_pieces] & queens_and_bishops)
+        | (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & board.pawns
+           & board.occupied_co[chess.BLACK])
+        | (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & board.pawns
+           & board.occupied_co[chess.WHITE]))
+
+
+def static_exchange(board: chess.Board, move: chess.Move, values: Mapping[int, int]) -> int:
+    """
+    Material the side to move gains by move if both sides keep recapturing
+    
+    Each side may stop recapturing when that is better for it. Pins are
+    ignored, and a king only recaptures when nothing attacks the square.
+    
+    Args:
+        values: Piece value by piece type
+    """
+    target = move.to_square
+    occupied = board.occupied ^ chess.BB_SQUARES[move.from_square]
+    if board.is_en_passant(move):
+        captured = values[chess.PAWN]
+        occupied ^= chess.BB_SQUARES[target ^ 8]  # Pawn beside the from-square
+    else:
+        captured_type = board.piece_type_at(target)
+        captured = values[captured_type] if captured_type else 0
+    piece_type = move.promotion or board.piece_type_at(move.from_square)
+    if move.promotion:
+        captured += values[move.promotion] - values[chess.PAWN]
+    
+    gains = [captured]
+    on_square = values[piece_type]  # Value of the piece that would be taken next
+    side = not board.turn
+    while True:
+        attackers = _attackers(board, target, occupied) & board.occupied_co[side]
+        if not attackers:
+            break
+        for piece_type in _ATTACKER_ORDER:
+            candidates = attackers & board.pieces_mask(piece_type, side)
+            if candidates:
+                break
+        if piece_type == chess.KING and (_attackers(board, target, occupied)
+                                         & board.occupied_co[not side]):
+            break  # The king may not recapture into check
+        gains.append(on_square - gains[-1])
+        if max(-gains[-2], gains[-1]) < 0:
+            break  # Neither side can improve by continuing
+        occupied ^= chess.BB_SQUARES[chess.lsb(candidates)]
+        on_square = values[piece_type]
+        side = not side
+    
+    # Either side may stand pat instead of recapturing
+    for index in range(len(gains) - 1, 0, -1):
+        gains[index - 1] = -max(-gains[index - 1], gains[index])
+    return gains[0]
@@ -0,0 +1,129 @@
+"""
+Transposition table for the AI search
+Fixed-size table in two preallocated 64-bit arrays (keys and packed
+entries), so storing a position allocates nothing
+"""
+
+from array import array
+from typing import Optional, Tuple
+
+import chess
+
+DEFAULT_TT_ENTRIES = 1 << 18  # 4 MiB: two 8-byte words per entry
+
+# Bound types
+BOUND_EXACT = 1
+BOUND_LOWER = 2  # Score is at least this (fail high)
+BOUND_UPPER = 3  # Score is at most this (fail low)
+
+# Packed entry: move (16) | depth (8) | bound (2) | generation (6) | score + offset (32)
+_DEPTH_SHIFT = 16
+_BOUND_SHIFT = 24
+_GENERATION_SHIFT = 26
+_SCORE_SHIFT = 32
+_SCORE_OFFSET = 1 << 31
+_GENERATIONS = 64
+
+
+def encode_move(move: Optional[chess.Move]) -> int:
+    """Pack a move into 16 bits: from (6) | to (6) | promotion (3)"""
+    if not move:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code: int) -> Optional[chess.Move]:
+    """Unpack a move from encode_move, or None for no move"""
+    if not code:
+        return None
+    return chess.Move(code & 0x3F, (code >> 6) & 0x3F, (code >> 12) or None)
+
+
+class TranspositionTable:
+    """
+    Zobrist-keyed table of search results
+    
+    Entries live in buckets of two slots: the first keeps the deepest
+    result (results from earlier searches age out), the second always
+    takes the newest, so shallow results near the leaves still get stored.
+    """
+    
+    def __init__(self, entries: int = DEFAULT_TT_ENTRIES):
+        # Round down to a power of two so a mask picks the bucket
+        size = 1 << max(1, entries.bit_length() - 1)
+        self.size = size
+        self.mask = (size // 2 - 1) << 1  # Even slot of a bucket
+        self.keys = array('Q', bytes(8 * size))
+        self.data = array('Q', bytes(8 * size))
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+    
+    def new_search(self):
+        """Start a new search; older entries become replaceable"""
+        self.generation = (self.generation + 1) % _GENERATIONS
+    
+    def clear(self):
+        """Forget every entry, e.g. for a new game"""
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.reset_stats()
+    
+    def reset_stats(self):
+        """Zero the probe, hit and store counters"""
+        self.probes = self.hits = self.stores = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of probes that found their position"""
+        return self.hits / self.probes if self.probes else 0.0
+    
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Look up a position
+        
+        Returns:
+            (depth, bound, score, packed move) or None if not stored
+        """
+        self.probes += 1
+        slot = key & self.mask
+        keys = self.keys
+        if keys[slot] != key:
+            slot += 1
+            if keys[slot] != key:
+                return None
+        self.hits += 1
+        entry = self.data[slot]
+        return ((entry >> _DEPTH_SHIFT) & 0xFF, (entry >> _BOUND_SHIFT) & 0x3,
+                (entry >> _SCORE_SHIFT) - _SCORE_OFFSET, entry & 0xFFFF)
+    
+    def store(self, key: int, depth: int, bound: int, score: int, move: int):
+        """Record a search result; move is packed by encode_move (0 for none)"""
+        self.stores += 1
+        slot = key & self.mask
+        keys, data = self.keys, self.data
+        current = data[slot]
+        # Depth-preferred slot: same position, an old search, or no deeper result
+        if (keys[slot] != key and current
+                and (current >> _GENERATION_SHIFT) & 0x3F == self.generation
+                and (current >> _DEPTH_SHIFT) & 0xFF > depth):
+            slot += 1
+        elif not move and keys[slot] == key:
+            move = current & 0xFFFF  # Keep the known best move
+        keys[slot] = key
+        data[slot] = (move | (min(depth, 0xFF) << _DEPTH_SHIFT) | (bound << _BOUND_SHIFT)
+                      | (self.generation << _GENERATION_SHIFT)
+                      | ((score + _SCORE_OFFSET) << _SCORE_SHIFT))
+    
+    def best_move(self, key: int) -> Optional[chess.Move]:
+        """Best move stored for a position, without counting a probe"""
+        slot = key & self.mask
+        for slot in (slot, slot + 1):
+            if self.keys[slot] == key:
+                return decode_move(self.data[slot] & 0xFFFF)
+        return None
+    
+    def usage(self) -> float:
+        """Fraction of slots holding an entry"""
+        return sum(1 for entry in self.data if entry) / self.size
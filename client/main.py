@@ -340,6 +340,7 @@ class ChessClient:
         
         elif msg_type == MSG_MOVE_UPDATE:
             self.update_board(data.get("board_state"))
+            self.network.trace_rendered(data)
             self.current_turn = data.get("current_turn")
             self.update_turn_display()
         
@@ -1059,6 +1059,7 @@ class ChessClientEnhanced:
             # Update last move highlight
             if from_sq and to_sq:
                 self.board_ui.set_last_move(from_sq, to_sq)
+            self.network.trace_rendered(data)
             
             # Update captured pieces display
             # captured_by_white = pieces white captured (black pieces lost)
@@ -1186,7 +1187,8 @@ class ChessClientEnhanced:
             END_RESIGN: "resign",
             END_TIMEOUT: "timeout",
             END_STALEMATE: "stalemate",
-            END_DRAW: "draw_agreement"
+            END_DRAW: "draw_agreement",
+            END_FORFEIT: "forfeit"
         }.get(reason, reason)
         
         # Update status bar
@@ -1195,7 +1197,8 @@ class ChessClientEnhanced:
             "resign": "Resignation",
             "timeout": "Time Out",
             "stalemate": "Stalemate",
-            "draw_agreement": "Draw Agreement"
+            "draw_agreement": "Draw Agreement",
+            "forfeit": "Forfeit"
         }
         
         self.status_label.config(
@@ -10,19 +10,25 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from common.constants import *
-from common.protocol import send_message, receive_message
+from common.protocol import send_message, MessageReader
+from common.tracing import (TraceAggregator, new_trace, get_trace, stamp,
+                            STAGE_CLIENT_RECEIVE, STAGE_RENDERED)
 
 
 class NetworkHandler:
     """Handles network communication with server"""
     
-    def __init__(self, host=SERVER_HOST, port=SERVER_PORT):
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, trace_moves=None):
         self.host = host
         self.port = port
         self.socket = None
         self.connected = False
         self.running = False
         self.message_callback = None
+        # Optional per-stage move latency tracing
+        if trace_moves is None:
+            trace_moves = bool(os.environ.get(TRACE_MOVES_ENV))
+        self.traces = TraceAggregator() if trace_moves else None
         
     def connect(self) -> bool:
         """Connect to server"""
@@ -50,10 +56,14 @@ class NetworkHandler:
                 self.socket.close()
             except:
                 pass
+        if self.traces and self.traces.traces:
+            print("\n".join(self.traces.report()))
     
     def send(self, msg_type: str, data: dict = None):
         """Send message to server"""
         if self.connected and self.socket:
+            if self.traces and msg_type == MSG_MOVE:
+                data = dict(data or {}, trace=new_trace())
             try:
                 send_message(self.socket, msg_type, data)
             except Exception as e:
@@ -62,20 +72,31 @@ class NetworkHandler:
     
     def _receive_loop(self):
         """Receive messages from server"""
+        reader = MessageReader(self.socket, BUFFER_SIZE)
         while self.running and self.connected:
             try:
-                message = receive_message(self.socket, BUFFER_SIZE)
-                if message and self.message_callback:
-                    self.message_callback(message)
-                elif not message:
+                messages = reader.read()
+                if messages is None:
                     self.connected = False
                     break
+                for message in messages:
+                    if self.traces and message.get("type") == MSG_MOVE_UPDATE:
+                        stamp(get_trace(message.get("data")), STAGE_CLIENT_RECEIVE)
+                    if self.message_callback:
+                        self.message_callback(message)
             except Exception as e:
                 if self.running:
                     print(f"Receive error: {e}")
                 self.connected = False
                 break
     
+    def trace_rendered(self, data: dict):
+        """Finish the trace of a MOVE_UPDATE once the board has been redrawn"""
+        trace = get_trace(data) if self.traces else None
+        if trace:
+            stamp(trace, STAGE_RENDERED)
+            self.traces.record(trace)
+    
     def set_message_callback(self, callback):
         """Set callback for received messages"""
         self.message_callback = callback
@@ -6,11 +6,39 @@ Constants and configuration for Chess Game
 SERVER_HOST = '0.0.0.0'  # Listen on all network interfaces (LAN + localhost)
 SERVER_PORT = 5555
 BUFFER_SIZE = 4096
+MAX_MESSAGE_SIZE = 65536  # Unfinished message a peer may leave buffered before being dropped
 MAX_CONNECTIONS = 10
+METRICS_HOST = '127.0.0.1'  # Metrics endpoint is local only
+METRICS_PORT = 9555
+ADMIN_TOKEN_ENV = 'CHESS_ADMIN_TOKEN'  # Admin commands are disabled unless set
+PROFILE_DIR = 'profiles'  # Where admin diagnostics are written
+BITBASE_DIR = 'bitbases'  # Endgame tables the AI generates, under the user cache
+TRACE_MOVES_ENV = 'CHESS_TRACE_MOVES'  # Set to trace move latency from the client
 
 # Game Configuration
 BOARD_SIZE = 8
 DEFAULT_TIME_CONTROL = 600  # 10 minutes per player
+IDLE_PACK_SECONDS = 300  # Pack games untouched for 5 minutes
+IDLE_SWEEP_INTERVAL = 60  # Seconds between idle room sweeps
+POSITION_CACHE_SIZE = 100000  # Positions shared across all games
+SIMUL_MAX_BOARDS = 50  # Most boards one simul host can play
+SIMUL_FLUSH_INTERVAL = 0.1  # Seconds between coalesced updates to a simul host
+
+# Player Store
+PLAYER_DB_PATH = 'players.db'
+DEFAULT_RATING = 1200
+DEFAULT_RD = 350  # Glicko-2 rating deviation of a new player
+DEFAULT_VOLATILITY = 0.06
+GLICKO_TAU = 0.5  # Limits how fast volatility changes
+RATING_PERIOD_SECONDS = 3600  # Games are rated together once per period
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_MIN_GAMES = 1  # Players appear once they have played
+LEADERBOARD_MAX_RADIUS = 25  # Largest "players around me" request
+LEADERBOARD_CACHED_PAGES = 64  # Pages kept, least recently read dropped first
+TOURNAMENT_DEFAULT_ROUNDS = 5
+TOURNAMENT_MAX_ROUNDS = 15
+PLAYER_FLUSH_INTERVAL = 2.0  # Seconds between write-behind flushes
+PLAYER_FLUSH_BATCH = 500  # Flush early once this many players changed
 
 # Message Types
 MSG_LOGIN = "LOGIN"
@@ -27,6 +55,14 @@ MSG_DECLINE_DRAW = "DECLINE_DRAW"
 MSG_CHAT = "CHAT"
 MSG_UNDO = "UNDO"
 MSG_REDO = "REDO"
+MSG_ADMIN = "ADMIN"
+MSG_LEADERBOARD = "LEADERBOARD"  # Request and reply
+MSG_CREATE_TOURNAMENT = "CREATE_TOURNAMENT"
+MSG_JOIN_TOURNAMENT = "JOIN_TOURNAMENT"
+MSG_START_TOURNAMENT = "START_TOURNAMENT"
+MSG_TOURNAMENT_STANDINGS = "TOURNAMENT_STANDINGS"
+MSG_CREATE_SIMUL = "CREATE_SIMUL"
+MSG_JOIN_SIMUL = "JOIN_SIMUL"
 
 # Response Types
 MSG_LOGIN_SUCCESS = "LOGIN_SUCCESS"
@@ -39,6 +75,10 @@ MSG_GAME_OVER = "GAME_OVER"
 MSG_TURN_UPDATE = "TURN_UPDATE"
 MSG_CHAT_MESSAGE = "CHAT_MESSAGE"
 MSG_ERROR = "ERROR"
+MSG_ADMIN_RESULT = "ADMIN_RESULT"
+MSG_TOURNAMENT_UPDATE = "TOURNAMENT_UPDATE"
+MSG_SIMUL_INFO = "SIMUL_INFO"
+MSG_SIMUL_UPDATE = "SIMUL_UPDATE"  # Batched board updates for a simul host
 
 # Game Status
 STATUS_WAITING = "waiting"
@@ -60,3 +100,4 @@ END_RESIGN = "resign"
 END_TIMEOUT = "timeout"
 END_STALEMATE = "stalemate"
 END_DRAW = "draw_agreement"
+END_FORFEIT = "forfeit"
@@ -2,9 +2,16 @@
 Message protocol for client-server communication
 """
 
+import codecs
 import json
+import re
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+
+from common.constants import MAX_MESSAGE_SIZE
+
+# Characters that matter when finding where a JSON object ends
+_STRUCTURE = re.compile(r'[{}"\\]')
 
 
 def create_message(msg_type: str, data: Dict[str, Any] = None) -> str:
@@ -39,10 +46,79 @@ def parse_message(message: str) -> Dict[str, Any]:
     try:
         return json.loads(message)
     except json.JSONDecodeError:
-        return {
-            "type": "ERROR",
-            "data": {"error": "Invalid message format"}
-        }
+        return invalid_message()
+
+
+def invalid_message() -> Dict[str, Any]:
+    """Stand-in for a message that could not be parsed"""
+    return {
+        "type": "ERROR",
+        "data": {"error": "Invalid message format"}
+    }
+
+
+def _object_end(buffer: str, start: int) -> int:
+    """Index just past the object opening at buffer[start], or -1 if the buffer ends first"""
+    depth = 0
+    in_string = False
+    escaped = -1
+    for match in _STRUCTURE.finditer(buffer, start):
+        index = match.start()
+        if index == escaped:
+            continue
+        char = buffer[index]
+        if char == '\\':
+            escaped = index + 1
+        elif char == '"':
+            in_string = not in_string
+        elif not in_string:
+            depth += 1 if char == '{' else -1
+            if not depth:
+                return index + 1
+    return -1
+
+
+def decode_messages(buffer: str) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Split a buffer that may hold several concatenated JSON messages
+    
+    Messages are not length-prefixed, so one recv can return more than one
+    message (or part of one) when the peer sends in quick succession.
+    Input that can never become a message (malformed JSON, or JSON that
+    is not an object) is replaced by an invalid_message() and skipped, up
+    to the end of the bad object or the next '{', so the stream recovers.
+    
+    Args:
+        buffer: Received text, possibly ending in a partial message
+    
+    Returns:
+        (complete messages, unparsed remainder)
+    """
+    decoder = json.JSONDecoder()
+    messages = []
+    pos = 0
+    end = len(buffer)
+    while True:
+        while pos < end and buffer[pos].isspace():
+            pos += 1
+        if pos >= end:
+            break
+        try:
+            message, next_pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # An object still open at the end of the buffer is only incomplete
+            if buffer[pos] == '{':
+                next_pos = _object_end(buffer, pos)
+                if next_pos < 0:
+                    break
+            else:
+                next_pos = buffer.find('{', pos + 1)
+                if next_pos < 0:
+                    next_pos = end
+            message = None
+        messages.append(message if isinstance(message, dict) else invalid_message())
+        pos = next_pos
+    return messages, buffer[pos:]
 
 
 def send_message(socket, msg_type: str, data: Dict[str, Any] = None):
@@ -79,3 +155,35 @@ def receive_message(socket, buffer_size: int = 4096) -> Dict[str, Any]:
             "type": "ERROR",
             "data": {"error": str(e)}
         }
+
+
+class MessageReader:
+    """Reads whole messages from a socket however they are split across recv calls"""
+    
+    def __init__(self, socket, buffer_size: int = 4096, max_size: int = MAX_MESSAGE_SIZE):
+        self.socket = socket
+        self.buffer_size = buffer_size
+        self.max_size = max_size
+        self.buffer = ""
+        self.overflowed = False
+        # Multi-byte characters can be split across reads too; invalid bytes
+        # become U+FFFD so the message fails to parse instead of the connection
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    
+    def read(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Receive once and return the messages completed by that data
+        
+        Returns:
+            List of parsed messages (may be empty), or None if the peer
+            closed or left more than max_size characters of an unfinished
+            message (overflowed is then set)
+        """
+        data = self.socket.recv(self.buffer_size)
+        if not data:
+            return None
+        messages, self.buffer = decode_messages(self.buffer + self._decoder.decode(data))
+        if len(self.buffer) > self.max_size:
+            self.overflowed = True
+            return None
+        return messages
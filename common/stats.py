@@ -0,0 +1,29 @@
+"""
+Small statistics helpers shared by the benchmarks and move tracing
+"""
+
+from typing import Dict, Sequence
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Get a percentile (nearest rank) from a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples: Sequence[float], scale: float = 1.0) -> Dict[str, float]:
+    """Get count, mean and p50/p90/p99/max of samples, multiplied by scale"""
+    if not samples:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * scale
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) * scale,
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": ordered[-1] * scale,
+    }
@@ -0,0 +1,118 @@
+"""
+Move tracing - Per-stage latency of a move from click to redraw
+A MOVE can carry a trace; each hop appends a timestamped stage and both
+client and server aggregate the gaps between consecutive stages
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from common.stats import summarize
+
+# Stages in the order a traced move passes through them
+STAGE_CLIENT_SEND = "client_send"
+STAGE_SERVER_RECEIVE = "server_receive"
+STAGE_VALIDATED = "validated"
+STAGE_ENCODED = "encoded"
+STAGE_SENT = "sent_"  # Followed by the recipient's color
+STAGE_CLIENT_RECEIVE = "client_receive"
+STAGE_RENDERED = "rendered"
+
+TRACE_SAMPLES = 10000  # Samples kept per segment
+MAX_TRACE_STAGES = 8  # Longer traces are not ours and are ignored
+
+# Stage names a trace may carry; anything else came from a confused or hostile client
+TRACE_STAGES = frozenset((
+    STAGE_CLIENT_SEND, STAGE_SERVER_RECEIVE, STAGE_VALIDATED, STAGE_ENCODED,
+    STAGE_SENT + "white", STAGE_SENT + "black", STAGE_CLIENT_RECEIVE, STAGE_RENDERED,
+))
+
+_trace_ids = itertools.count(1)
+
+
+def new_trace(stage: str = STAGE_CLIENT_SEND) -> Dict[str, Any]:
+    """Start a trace with its first stage stamped now"""
+    return {
+        "id": f"{os.getpid()}-{next(_trace_ids)}",
+        "stages": [[stage, time.time()]],
+    }
+
+
+def get_trace(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Get the trace carried by a message payload, if it is well formed"""
+    trace = data.get("trace") if isinstance(data, dict) else None
+    if (isinstance(trace, dict) and isinstance(trace.get("stages"), list)
+            and len(trace["stages"]) <= MAX_TRACE_STAGES):
+        return trace
+    return None
+
+
+def stamp(trace: Optional[Dict[str, Any]], stage: str):
+    """
+    Append a stage to a trace
+    
+    Timestamps are wall clock so they compare across processes; gaps
+    between client and server stages include any clock offset between
+    the two machines.
+    """
+    if trace is not None:
+        trace["stages"].append([stage, time.time()])
+
+
+def copy_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a trace so later stages can be added to one side only"""
+    return {"id": trace.get("id"), "stages": [list(entry) for entry in trace["stages"]]}
+
+
+class TraceAggregator:
+    """Collects per-segment latencies from finished traces"""
+    
+    def __init__(self, max_samples: int = TRACE_SAMPLES):
+        self.max_samples = max_samples
+        self.segments: Dict[str, deque] = {}
+        self.traces = 0
+        self._lock = threading.Lock()
+    
+    def record(self, trace: Dict[str, Any]):
+        """
+        Add the gap between each pair of consecutive stages
+        
+        Traces with too many stages are dropped and pairs naming an
+        unknown stage are skipped, so segments stay a small fixed set.
+        """
+        stages = trace.get("stages", [])
+        if not isinstance(stages, list) or len(stages) > MAX_TRACE_STAGES:
+            return
+        with self._lock:
+            self.traces += 1
+            for entry, following in zip(stages, stages[1:]):
+                try:
+                    (previous, started), (stage, ended) = entry, following
+                    elapsed = float(ended) - float(started)
+                    if previous not in TRACE_STAGES or stage not in TRACE_STAGES:
+                        continue
+                except (TypeError, ValueError):
+                    continue
+                name = f"{previous}→{stage}"
+                samples = self.segments.get(name)
+                if samples is None:
+                    samples = self.segments[name] = deque(maxlen=self.max_samples)
+                samples.append(elapsed)
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Get count, mean and p50/p90/p99/max in milliseconds per segment"""
+        with self._lock:
+            segments = {name: list(samples) for name, samples in self.segments.items()}
+        return {name: summarize(samples, 1e3) for name, samples in segments.items()}
+    
+    def report(self) -> List[str]:
+        """Human-readable per-segment breakdown"""
+        lines = [f"Move traces: {self.traces}"]
+        for name, entry in self.summary().items():
+            lines.append(f"   {name:32s} p50 {entry['p50']:8.2f} ms  p99 {entry['p99']:8.2f} ms  "
+                         f"max {entry['max']:8.2f} ms  ({entry['count']})")
+        return lines
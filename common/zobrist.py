@@ -0,0 +1,80 @@
+"""
+Zobrist position keys
+Uses the Polyglot random array, so keys match Polyglot opening books,
+and updates keys incrementally when moves are pushed
+"""
+
+import chess
+import chess.polyglot
+
+RANDOM_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_hasher = chess.polyglot.ZobristHasher(RANDOM_ARRAY)
+TURN_KEY = RANDOM_ARRAY[780]
+
+
+def zobrist_key(board: chess.Board) -> int:
+    """Compute the 64-bit key of a position from scratch"""
+    return _hasher(board)
+
+
+def piece_key(piece: chess.Piece, square: chess.Square) -> int:
+    """Get the random value for a piece standing on a square"""
+    return RANDOM_ARRAY[64 * ((piece.piece_type - 1) * 2 + piece.color) + square]
+
+
+def squares_key(board: chess.Board, squares) -> int:
+    """XOR together the random values of the pieces on some squares"""
+    key = 0
+    white = board.occupied_co[chess.WHITE]
+    for square in squares:
+        piece_type = board.piece_type_at(square)
+        if piece_type:
+            color = 1 if white & chess.BB_SQUARES[square] else 0
+            key ^= RANDOM_ARRAY[64 * ((piece_type - 1) * 2 + color) + square]
+    return key
+
+
+def state_key(board: chess.Board) -> int:
+    """Get the castling, en passant and side-to-move part of a key"""
+    return (_hasher.hash_castling(board) ^ _hasher.hash_ep_square(board) ^
+            _hasher.hash_turn(board))
+
+
+def touched_squares(board: chess.Board, move: chess.Move):
+    """Get the squares whose contents change when a move is pushed"""
+    if board.is_castling(move):
+        # King and rook both move along the back rank
+        rank = chess.square_rank(move.from_square)
+        return [chess.square(file, rank) for file in range(8)]
+    if board.is_en_passant(move):
+        captured = chess.square(chess.square_file(move.to_square),
+                                chess.square_rank(move.from_square))
+        return [move.from_square, move.to_square, captured]
+    return [move.from_square, move.to_square]
+
+
+def push_with_key(board: chess.Board, move: chess.Move, key: int) -> int:
+    """
+    Push a move and update its position key incrementally
+    
+    Args:
+        board: Board to push the move on
+        move: Move to push (may be a null move)
+        key: Key of the position before the move
+        
+    Returns:
+        Key of the position after the move
+    """
+    squares = touched_squares(board, move)
+    # Raw castling rights change whenever the effective rights do
+    rights = board.castling_rights
+    castling = _hasher.hash_castling(board) if rights else 0
+    key ^= _hasher.hash_ep_square(board) ^ TURN_KEY ^ squares_key(board, squares)
+    board.push(move)
+    key ^= squares_key(board, squares)
+    if board.castling_rights != rights:
+        key ^= castling ^ _hasher.hash_castling(board)
+    return key ^ _hasher.hash_ep_square(board)
+
+
+STARTING_KEY = zobrist_key(chess.Board())
@@ -4,31 +4,238 @@ Handles game logic, move validation, and game state
 """
 
 import chess
-from typing import Optional, List, Tuple
+from array import array
+from typing import Iterable, Optional, List, Tuple, Union
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.zobrist import STARTING_KEY, zobrist_key, push_with_key
+from position_cache import PositionInfo, get_position_cache
+
+
+PROMOTION_PIECES = {
+    'q': chess.QUEEN,
+    'r': chess.ROOK,
+    'b': chess.BISHOP,
+    'n': chess.KNIGHT
+}
+
+# Slots that are dropped while an engine is packed and rebuilt on next access
+PACKED_FIELDS = (
+    'board', 'move_history', 'captured_by_white', 'captured_by_black',
+    'undo_stack', 'redo_stack', 'position_keys'
+)
+
+
+def encode_move(move: chess.Move) -> int:
+    """Pack a move into 16 bits: from (6) | to (6) | promotion (3)"""
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code: int) -> chess.Move:
+    """Unpack a 16-bit move produced by encode_move"""
+    return chess.Move(code & 0x3F, (code >> 6) & 0x3F, (code >> 12) or None)
+
+
+class MoveRecord:
+    """Undo/redo entry: the move and the piece it captured (FEN symbol)"""
+    
+    __slots__ = ('move', 'captured_piece')
+    
+    def __init__(self, move: chess.Move, captured_piece: Optional[str]):
+        self.move = move
+        self.captured_piece = captured_piece
+
+
+class PackedGame:
+    """Compact form of an idle game: uint16 moves plus a position key"""
+    
+    __slots__ = ('root_fen', 'moves', 'redo', 'key')
+    
+    def __init__(self, root_fen: Optional[str], moves: array, redo: array, key: int):
+        self.root_fen = root_fen  # None for the standard starting position
+        self.moves = moves        # Played moves, oldest first
+        self.redo = redo          # Undone moves in replay order
+        self.key = key            # Zobrist key of the current position
 
 
 class ChessEngine:
     """Chess game engine with full rule implementation"""
     
+    __slots__ = PACKED_FIELDS + ('_packed',)
+    
     def __init__(self):
         """Initialize chess board with starting position"""
+        self._packed: Optional[PackedGame] = None
         self.board = chess.Board()
         self.move_history = []
         self.captured_by_white = []  # Pieces captured by white
         self.captured_by_black = []  # Pieces captured by black
-        self.undo_stack = []  # Stack of (move, captured_piece, white_caps, black_caps)
-        self.redo_stack = []  # Stack for redo operations
+        self.undo_stack: List[MoveRecord] = []
+        self.redo_stack: List[MoveRecord] = []
+        self.position_keys = array('Q', [STARTING_KEY])  # One per ply, current last
+    
+    def __getattr__(self, name):
+        # Only reached when a slot is unset, i.e. while the engine is packed
+        if name in PACKED_FIELDS and self._packed is not None:
+            self.unpack()
+            return getattr(self, name)
+        raise AttributeError(name)
         
     def reset(self):
         """Reset board to starting position"""
-        self.board.reset()
+        self._packed = None
+        self.board = chess.Board()
         self.move_history = []
         self.captured_by_white = []
         self.captured_by_black = []
         self.undo_stack = []
         self.redo_stack = []
+        self.position_keys = array('Q', [STARTING_KEY])
         
-    def make_move(self, from_square: str, to_square: str, promotion: str = None) -> bool:
+    def is_packed(self) -> bool:
+        """Check if the engine is currently held in packed form"""
+        return self._packed is not None
+    
+    def pack(self) -> bool:
+        """
+        Drop the board and history objects, keeping only a packed copy
+        
+        The full state is rebuilt lazily the next time any of the board,
+        history or capture attributes is accessed.
+        
+        Returns:
+            True if the engine was packed, False if it already was
+        """
+        if self._packed is not None:
+            return False
+        
+        board = self.board
+        root_fen = board.root().fen()
+        self._packed = PackedGame(
+            None if root_fen == chess.STARTING_FEN else root_fen,
+            array('H', map(encode_move, board.move_stack)),
+            array('H', [encode_move(record.move) for record in reversed(self.redo_stack)]),
+            self._key()
+        )
+        for name in PACKED_FIELDS:
+            delattr(self, name)
+        return True
+    
+    def unpack(self) -> bool:
+        """
+        Rebuild the board, history, captures and undo/redo stacks
+        
+        Returns:
+            True if the engine was unpacked, False if it was not packed
+        """
+        packed = self._packed
+        if packed is None:
+            return False
+        
+        self._packed = None
+        self.board = chess.Board(packed.root_fen or chess.STARTING_FEN)
+        self.move_history = []
+        self.captured_by_white = []
+        self.captured_by_black = []
+        self.undo_stack = []
+        self.redo_stack = []
+        self.position_keys = array('Q', [zobrist_key(self.board)])
+        
+        # Replay undone moves too, then step back so the redo stack is rebuilt
+        self.apply_moves(packed.moves, trusted=True)
+        self.apply_moves(packed.redo, trusted=True)
+        for _ in packed.redo:
+            self.undo_move()
+        return True
+    
+    def position_key(self) -> int:
+        """Get the Zobrist key of the current position without unpacking"""
+        if self._packed is not None:
+            return self._packed.key
+        return self._key()
+    
+    def _key(self) -> int:
+        """Key of the current position, computed now if a bulk replay left it unknown"""
+        key = self.position_keys[-1]
+        if not key:
+            key = self.position_keys[-1] = zobrist_key(self.board)
+        return key
+    
+    def _fill_keys(self, start: int):
+        """Compute the keys a bulk replay left unknown (0), from index start on"""
+        keys = self.position_keys
+        first = next((i for i in range(start, len(keys)) if not keys[i]), None)
+        if first is None:
+            return
+        # Step a copy back to the first unknown position, then forward again
+        plies = len(keys) - 1 - first
+        board = self.board.copy(stack=plies)
+        moves = [board.pop() for _ in range(plies)]
+        key = keys[first] = keys[first] or zobrist_key(board)
+        for index, move in enumerate(reversed(moves), first + 1):
+            key = keys[index] = push_with_key(board, move, key)
+    
+    def _is_legal(self, move: chess.Move) -> bool:
+        """Check legality, using shared state only if already cached"""
+        info = get_position_cache().get(self._key())
+        if info is not None:
+            if encode_move(move) in info.legal_moves:
+                return True
+            # The cache lists castling as e1g1; king-takes-rook (e1h1) is legal too
+            return self.board.is_castling(move) and self.board.is_legal(move)
+        return self.board.is_legal(move)
+    
+    def _position(self) -> PositionInfo:
+        """Get shared derived state of the current position"""
+        return get_position_cache().lookup(self._key(), self.board)
+    
+    def repetition_count(self) -> int:
+        """Count occurrences of the current position, including this one"""
+        keys = self.position_keys
+        # Only positions since the last capture or pawn move can repeat
+        start = max(0, len(keys) - 1 - self.board.halfmove_clock)
+        self._fill_keys(start)
+        key = keys[-1]
+        return sum(1 for i in range(len(keys) - 1, start - 1, -2) if keys[i] == key)
+    
+    def is_repetition(self, count: int = 3) -> bool:
+        """Check if the current position occurred at least count times"""
+        return self.repetition_count() >= count
+    
+    def _push(self, move: chess.Move, keyed: bool = True) -> Optional[str]:
+        """
+        Push a legal move, recording its capture for undo
+        
+        Unkeyed pushes leave the new position's key unknown (0) until it
+        is needed, which bulk replays rely on.
+        """
+        board = self.board
+        captured_piece = None
+        # En passant leaves the destination square empty, and castling
+        # written as king-takes-rook lands on the mover's own rook
+        piece_at_dest = board.piece_at(move.to_square)
+        if piece_at_dest and piece_at_dest.color != board.turn:
+            # Convert to FEN notation
+            captured_piece = piece_at_dest.symbol()
+            # self.board.turn is the player making THIS move
+            if board.turn == chess.WHITE:
+                self.captured_by_white.append(captured_piece)
+            else:
+                self.captured_by_black.append(captured_piece)
+        
+        self.undo_stack.append(MoveRecord(move, captured_piece))
+        if keyed:
+            self.position_keys.append(push_with_key(board, move, self._key()))
+        else:
+            board.push(move)
+            self.position_keys.append(0)
+        self.move_history.append(move)
+        return captured_piece
+    
+    
+    def make_move(self, from_square: str, to_square: str,
+                  promotion: str = None) -> Tuple[bool, Optional[str]]:
         """
         Make a move on the board
         
@@ -38,7 +245,7 @@ class ChessEngine:
             promotion: Promotion piece ('q', 'r', 'b', 'n') if pawn promotion
             
         Returns:
-            True if move is valid and made, False otherwise
+            (True, captured_piece) if move is valid and made, (False, None) otherwise
         """
         try:
             # Convert square notation to chess.Square
@@ -47,60 +254,82 @@ class ChessEngine:
             
             # Create move
             if promotion:
-                promotion_piece = {
-                    'q': chess.QUEEN,
-                    'r': chess.ROOK,
-                    'b': chess.BISHOP,
-                    'n': chess.KNIGHT
-                }.get(promotion.lower())
-                move = chess.Move(from_sq, to_sq, promotion=promotion_piece)
+                move = chess.Move(from_sq, to_sq,
+                                  promotion=PROMOTION_PIECES.get(promotion.lower()))
             else:
                 move = chess.Move(from_sq, to_sq)
             
             # Check if move is legal
-            if move in self.board.legal_moves:
-                # Check if this is a capture
-                captured_piece = None
-                if self.board.is_capture(move):
-                    # Get the piece at destination
-                    piece_at_dest = self.board.piece_at(to_sq)
-                    if piece_at_dest:
-                        # Convert to FEN notation
-                        captured_piece = piece_at_dest.symbol()
-                        # Add to appropriate capture list BEFORE pushing move
-                        # self.board.turn is the player making THIS move
-                        if self.board.turn == chess.WHITE:
-                            # White is capturing a black piece
-                            self.captured_by_white.append(captured_piece)
-                        else:
-                            # Black is capturing a white piece
-                            self.captured_by_black.append(captured_piece)
-                
-                # Save state for undo (before pushing move)
-                self.undo_stack.append((
-                    move,
-                    captured_piece,
-                    self.captured_by_white.copy(),
-                    self.captured_by_black.copy()
-                ))
+            if self._is_legal(move):
+                captured_piece = self._push(move)
                 # Clear redo stack when new move is made
                 self.redo_stack = []
-                
-                self.board.push(move)
-                self.move_history.append(move)
                 return True, captured_piece
             return False, None
             
         except (ValueError, chess.InvalidMoveError):
             return False, None
     
+    def apply_moves(self, moves: Iterable[Union[str, int]], with_san: bool = False,
+                    trusted: bool = False) -> Tuple[int, List[str]]:
+        """
+        Validate and apply a sequence of moves in one pass
+        
+        Stops at the first illegal or malformed move, keeping the moves
+        applied before it. Used to rebuild games on resync, replay and import.
+        Position keys are not computed as the moves are pushed, only when
+        something first needs them (a lookup, undo or a repetition check).
+        
+        Args:
+            moves: UCI strings (e.g. 'e2e4', 'e7e8q') or packed moves from encode_move
+            with_san: Also return SAN of the applied moves
+            trusted: Skip legality checks, for histories the server stored
+                itself (an illegal move would corrupt the game)
+        
+        Returns:
+            (number of moves applied, SAN of applied moves if with_san else [])
+        """
+        board = self.board
+        sans = []
+        applied = 0
+        for item in moves:
+            try:
+                move = decode_move(item) if isinstance(item, int) else chess.Move.from_uci(item)
+            except (ValueError, chess.InvalidMoveError):
+                break
+            if not trusted and not board.is_legal(move):
+                break
+            if with_san:
+                sans.append(board.san(move))
+            self._push(move, keyed=False)
+            applied += 1
+        
+        if applied:
+            self.redo_stack = []
+        return applied, sans
+    
+    @classmethod
+    def from_moves(cls, moves: Iterable[Union[str, int]], fen: str = None,
+                   trusted: bool = False) -> Tuple["ChessEngine", int]:
+        """
+        Build an engine by replaying moves from a start position
+        
+        Returns:
+            (engine, number of moves applied)
+        """
+        engine = cls()
+        if fen:
+            if not engine.set_board_state(fen):
+                return engine, 0
+        applied, _ = engine.apply_moves(moves, trusted=trusted)
+        return engine, applied
+    
     def is_valid_move(self, from_square: str, to_square: str) -> bool:
         """Check if a move is legal"""
         try:
             from_sq = chess.parse_square(from_square)
             to_sq = chess.parse_square(to_square)
-            move = chess.Move(from_sq, to_sq)
-            return move in self.board.legal_moves
+            return self._is_legal(chess.Move(from_sq, to_sq))
         except ValueError:
             return False
     
@@ -109,24 +338,18 @@ class ChessEngine:
         if not self.undo_stack:
             return False
         
-        # Pop last move and state
-        move, captured_piece, white_caps, black_caps = self.undo_stack.pop()
-        
-        # Save to redo stack
-        self.redo_stack.append((
-            move,
-            captured_piece,
-            self.captured_by_white.copy(),
-            self.captured_by_black.copy()
-        ))
+        record = self.undo_stack.pop()
+        self.redo_stack.append(record)
         
-        # Undo the move
+        # Undo the move; the side to move is now the one that captured
         self.board.pop()
+        self.position_keys.pop()
         self.move_history.pop()
-        
-        # Restore capture lists
-        self.captured_by_white = white_caps
-        self.captured_by_black = black_caps
+        if record.captured_piece:
+            if self.board.turn == chess.WHITE:
+                self.captured_by_white.pop()
+            else:
+                self.captured_by_black.pop()
         
         return True
     
@@ -135,24 +358,17 @@ class ChessEngine:
         if not self.redo_stack:
             return False
         
-        # Pop from redo stack
-        move, captured_piece, white_caps, black_caps = self.redo_stack.pop()
-        
-        # Save current state to undo stack
-        self.undo_stack.append((
-            move,
-            captured_piece,
-            self.captured_by_white.copy(),
-            self.captured_by_black.copy()
-        ))
+        record = self.redo_stack.pop()
+        self.undo_stack.append(record)
         
-        # Redo the move
-        self.board.push(move)
-        self.move_history.append(move)
-        
-        # Restore capture lists from redo
-        self.captured_by_white = white_caps
-        self.captured_by_black = black_caps
+        # Redo the move and restore its capture
+        if record.captured_piece:
+            if self.board.turn == chess.WHITE:
+                self.captured_by_white.append(record.captured_piece)
+            else:
+                self.captured_by_black.append(record.captured_piece)
+        self.position_keys.append(push_with_key(self.board, record.move, self._key()))
+        self.move_history.append(record.move)
         
         return True
     
@@ -168,11 +384,7 @@ class ChessEngine:
         """Get all legal moves for a piece at given square"""
         try:
             sq = chess.parse_square(square)
-            moves = []
-            for move in self.board.legal_moves:
-                if move.from_square == sq:
-                    moves.append(chess.square_name(move.to_square))
-            return moves
+            return list(self._position().moves_from.get(sq, ()))
         except ValueError:
             return []
     
@@ -198,27 +410,36 @@ class ChessEngine:
     
     def is_check(self) -> bool:
         """Check if current player is in check"""
-        return self.board.is_check()
+        return self._position().is_check
     
     def is_checkmate(self) -> bool:
         """Check if current player is in checkmate"""
-        return self.board.is_checkmate()
+        return self._position().is_checkmate
     
     def is_stalemate(self) -> bool:
         """Check if game is in stalemate"""
-        return self.board.is_stalemate()
+        return self._position().is_stalemate
+    
+    def is_automatic_draw(self) -> bool:
+        """Check for the 75-move rule or fivefold repetition"""
+        return self.board.is_seventyfive_moves() or self.repetition_count() >= 5
     
     def is_game_over(self) -> bool:
         """Check if game is over"""
-        return self.board.is_game_over()
+        info = self._position()
+        return (info.is_checkmate or info.is_stalemate or
+                info.insufficient_material or self.is_automatic_draw())
     
     def get_game_result(self) -> Optional[str]:
         """Get game result"""
-        if self.board.is_checkmate():
+        info = self._position()
+        if info.is_checkmate:
             return "black_win" if self.board.turn == chess.WHITE else "white_win"
-        elif self.board.is_stalemate():
+        elif info.is_stalemate:
+            return "draw"
+        elif info.insufficient_material:
             return "draw"
-        elif self.board.is_insufficient_material():
+        elif self.is_automatic_draw():
             return "draw"
         return None
     
@@ -234,20 +455,14 @@ class ChessEngine:
         """Set board from FEN string"""
         try:
             self.board.set_fen(fen)
+            self.position_keys = array('Q', [zobrist_key(self.board)])
             return True
         except ValueError:
             return False
     
     def get_move_history(self) -> List[str]:
         """Get move history in SAN notation"""
-        return [self.board.san(move) for move in self.move_history]
-    
-    def undo_move(self) -> bool:
-        """Undo last move"""
-        try:
-            self.board.pop()
-            if self.move_history:
-                self.move_history.pop()
-            return True
-        except IndexError:
-            return False
+        # SAN depends on the position before each move, so replay from the root
+        board = self.board.root()
+        sans = [board.san_and_push(move) for move in self.board.move_stack]
+        return sans[len(sans) - len(self.move_history):]
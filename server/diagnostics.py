@@ -0,0 +1,343 @@
+"""
+Live diagnostics - Sampling profiler and allocation snapshots
+Driven by authenticated ADMIN messages so a running server can be
+inspected without restarting it
+"""
+
+import argparse
+import collections
+import itertools
+import json
+import math
+import os
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Source file -> subsystem used to group allocations
+SUBSYSTEMS = (
+    ('game_manager.py', 'rooms'),
+    ('tournament.py', 'rooms'),
+    ('chess_engine.py', 'engines'),
+    ('zobrist.py', 'engines'),
+    ('position_cache.py', 'position_cache'),
+    ('simul.py', 'queues'),  # Coalesced simul host updates
+    ('player_store.py', 'queues'),  # Write-behind rows
+    ('ratings.py', 'ratings'),
+    ('leaderboard.py', 'ratings'),
+    ('protocol.py', 'network'),
+    ('main.py', 'network'),
+    ('traffic_capture.py', 'capture'),
+    ('metrics.py', 'metrics'),
+)
+
+# Python frames that mean a thread is blocked waiting, not working
+IDLE_FRAMES = frozenset((
+    ('protocol.py', 'read'),
+    ('socket.py', 'accept'),
+    ('threading.py', 'wait'),
+    ('selectors.py', 'select'),
+    ('socketserver.py', 'serve_forever'),
+    ('main.py', 'sweep_idle_rooms'),
+))
+
+TRACEMALLOC_FRAMES = 25
+TOP_ALLOCATIONS = 25
+
+# Sampling interval bounds in seconds; shorter would starve the server threads
+DEFAULT_INTERVAL = 0.005
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 1.0
+
+
+def _frame_key(frame) -> Tuple[str, str]:
+    path = frame.f_code.co_filename
+    filename = os.path.basename(path)
+    if filename == '__init__.py':
+        # Keep the package name so chess/__init__.py is recognisable
+        filename = os.path.join(os.path.basename(os.path.dirname(path)), filename)
+    return filename, frame.f_code.co_name
+
+
+def sampling_interval(value) -> Optional[float]:
+    """Interval clamped to MIN_INTERVAL..MAX_INTERVAL, or None unless a positive number"""
+    if isinstance(value, bool):
+        return None
+    try:
+        interval = float(value)
+    except (TypeError, ValueError):
+        return None
+    # NaN fails the comparison
+    if not 0 < interval < math.inf:
+        return None
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval"""
+    
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks: Dict[Tuple[str, ...], int] = collections.Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.started = 0.0
+        self.stopped = 0.0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._running
+    
+    def start(self):
+        """Start sampling in a background thread"""
+        self._running = True
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop sampling and wait for the sampler to exit"""
+        self._running = False
+        if self._thread:
+            self._thread.join()
+        self.stopped = time.time()
+    
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while self._running:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if _frame_key(frame) in IDLE_FRAMES:
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    filename, function = _frame_key(frame)
+                    stack.append(f"{filename}:{function}")
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+    
+    def write(self, prefix: str) -> dict:
+        """
+        Write results next to prefix
+        
+        Writes <prefix>.collapsed (one "a;b;c count" line per stack, the
+        input format of flame graph tools) and <prefix>.txt (top functions).
+        """
+        with open(prefix + '.collapsed', 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        
+        busy = max(1, self.samples)
+        lines = [
+            f"Sampling profile {datetime.fromtimestamp(self.started).isoformat()} "
+            f"({self.stopped - self.started:.1f}s, every {self.interval * 1e3:.1f}ms)",
+            f"{self.samples} busy samples, {self.idle_samples} idle samples",
+            "",
+            f"{'self %':>8s} {'total %':>8s}  function",
+        ]
+        for function, count in own.most_common(TOP_ALLOCATIONS):
+            lines.append(f"{count / busy:8.1%} {total[function] / busy:8.1%}  {function}")
+        with open(prefix + '.txt', 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        
+        return {
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "top": [[function, count] for function, count in own.most_common(10)],
+            "files": [prefix + '.collapsed', prefix + '.txt'],
+        }
+
+
+def _subsystem(traceback) -> str:
+    """Attribute an allocation to the innermost frame in a known subsystem"""
+    for frame in reversed(traceback):
+        filename = os.path.basename(frame.filename)
+        for suffix, name in SUBSYSTEMS:
+            if filename == suffix:
+                return name
+    return 'other'
+
+
+def write_allocation_snapshot(prefix: str) -> dict:
+    """
+    Take a tracemalloc snapshot and write it grouped by subsystem
+    
+    Writes <prefix>.json and <prefix>.txt. Tracing starts on the first
+    call, so that call reports only what was allocated since.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    
+    groups = collections.defaultdict(lambda: [0, 0])
+    sites = []
+    for stat in snapshot.statistics('traceback'):
+        name = _subsystem(stat.traceback)
+        groups[name][0] += stat.size
+        groups[name][1] += stat.count
+        sites.append((stat.size, stat.count, name, stat.traceback))
+    sites.sort(key=lambda site: site[0], reverse=True)
+    
+    current, peak = tracemalloc.get_traced_memory()
+    report = {
+        "taken": datetime.now().isoformat(),
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "subsystems": {
+            name: {"bytes": size, "blocks": count}
+            for name, (size, count) in sorted(groups.items(), key=lambda g: -g[1][0])
+        },
+        "top": [
+            {
+                "bytes": size,
+                "blocks": count,
+                "subsystem": name,
+                "site": f"{traceback[-1].filename}:{traceback[-1].lineno}" if len(traceback) else "?",
+            }
+            for size, count, name, traceback in sites[:TOP_ALLOCATIONS]
+        ],
+    }
+    with open(prefix + '.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    lines = [f"Allocation snapshot {report['taken']}: {current / 1e6:.1f} MB traced, "
+             f"{peak / 1e6:.1f} MB peak", ""]
+    for name, entry in report["subsystems"].items():
+        lines.append(f"{entry['bytes'] / 1e3:12.1f} KB {entry['blocks']:9d} blocks  {name}")
+    lines.append("")
+    for entry in report["top"]:
+        lines.append(f"{entry['bytes'] / 1e3:12.1f} KB {entry['blocks']:9d} blocks  "
+                     f"[{entry['subsystem']}] {entry['site']}")
+    with open(prefix + '.txt', 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    
+    return {
+        "traced_bytes": current,
+        "subsystems": report["subsystems"],
+        "files": [prefix + '.json', prefix + '.txt'],
+    }
+
+
+class Diagnostics:
+    """Runs admin diagnostics commands and writes results to a directory"""
+    
+    COMMANDS = ("status", "profile_start", "profile_stop", "snapshot", "snapshot_stop")
+    
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.profiler: Optional[SamplingProfiler] = None
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+    
+    def _prefix(self, kind: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Milliseconds and a sequence number keep back-to-back results apart
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        return os.path.join(self.output_dir, f"{kind}_{stamp}_{next(self._sequence)}")
+    
+    def run(self, command: str, options: dict = None) -> dict:
+        """
+        Run one diagnostics command
+        
+        Returns:
+            Result dictionary; contains "error" if the command failed
+        """
+        options = {} if options is None else options
+        if not isinstance(options, dict):
+            return {"error": "Options must be an object"}
+        with self._lock:
+            if command == "status":
+                return {
+                    "profiling": bool(self.profiler and self.profiler.running),
+                    "tracing_allocations": tracemalloc.is_tracing(),
+                    "output_dir": os.path.abspath(self.output_dir),
+                }
+            
+            if command == "profile_start":
+                if self.profiler and self.profiler.running:
+                    return {"error": "Profiler already running"}
+                interval = sampling_interval(options.get("interval", DEFAULT_INTERVAL))
+                if interval is None:
+                    return {"error": "Interval must be a positive number of seconds"}
+                self.profiler = SamplingProfiler(interval)
+                self.profiler.start()
+                return {"profiling": True, "interval": self.profiler.interval}
+            
+            try:
+                if command == "profile_stop":
+                    if not (self.profiler and self.profiler.running):
+                        return {"error": "Profiler not running"}
+                    self.profiler.stop()
+                    return self.profiler.write(self._prefix("profile"))
+                
+                if command == "snapshot":
+                    return write_allocation_snapshot(self._prefix("allocations"))
+            except OSError as e:
+                return {"error": f"Could not write results: {e}"}
+            
+            if command == "snapshot_stop":
+                tracemalloc.stop()
+                return {"tracing_allocations": False}
+            
+            return {"error": f"Unknown command: {command}"}
+
+
+def main():
+    """Send one admin command to a running server and print the result"""
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.constants import (SERVER_PORT, BUFFER_SIZE, ADMIN_TOKEN_ENV,
+                                  MSG_ADMIN, MSG_LOGOUT)
+    from common.protocol import create_message, MessageReader
+    
+    parser = argparse.ArgumentParser(description="Send an admin diagnostics command")
+    parser.add_argument("command", choices=Diagnostics.COMMANDS)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Sampling interval in seconds for profile_start")
+    args = parser.parse_args()
+    
+    token = os.environ.get(ADMIN_TOKEN_ENV)
+    if not token:
+        parser.error(f"set {ADMIN_TOKEN_ENV} to the server's admin token")
+    
+    with socket.create_connection((args.host, args.port)) as sock:
+        sock.sendall(create_message(MSG_ADMIN, {
+            "token": token,
+            "command": args.command,
+            "options": {"interval": args.interval},
+        }).encode('utf-8'))
+        reader = MessageReader(sock, BUFFER_SIZE)
+        messages = []
+        while not messages:
+            messages = reader.read()
+            if messages is None:
+                parser.error("server closed the connection")
+        sock.sendall(create_message(MSG_LOGOUT).encode('utf-8'))
+    for message in messages:
+        print(json.dumps(message, indent=2))
+
+
+if __name__ == "__main__":
+    main()
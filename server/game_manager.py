@@ -3,6 +3,8 @@ Game Manager - Handles rooms and game sessions
 """
 
 import uuid
+import threading
+import time
 from typing import Dict, Optional, List
 from chess_engine import ChessEngine
 import sys
@@ -14,13 +16,15 @@ from common.constants import *
 class Player:
     """Represents a player in the game"""
     
+    __slots__ = ('username', 'socket', 'address', 'room_id', 'color', 'rating')
+    
     def __init__(self, username: str, socket, address):
         self.username = username
         self.socket = socket
         self.address = address
         self.room_id: Optional[str] = None
         self.color: Optional[str] = None
-        self.rating = 1200  # Default rating
+        self.rating = DEFAULT_RATING
         
     def __repr__(self):
         return f"Player({self.username})"
@@ -29,6 +33,9 @@ class Player:
 class Room:
     """Represents a game room"""
     
+    __slots__ = ('room_id', 'name', 'creator', 'players', 'status', 'game',
+                 'white_player', 'black_player', 'last_activity', 'lock')
+    
     def __init__(self, room_id: str, name: str, creator: Player):
         self.room_id = room_id
         self.name = name
@@ -38,6 +45,25 @@ class Room:
         self.game: Optional[ChessEngine] = None
         self.white_player: Optional[Player] = None
         self.black_player: Optional[Player] = None
+        self.last_activity = time.monotonic()
+        # Held by handlers while they use the game, so the sweeper never
+        # packs it under them
+        self.lock = threading.RLock()
+    
+    def touch(self):
+        """Mark room as active now"""
+        with self.lock:
+            self.last_activity = time.monotonic()
+    
+    def pack_if_idle(self, idle_seconds: float, now: float = None) -> bool:
+        """Pack the game to its compact form if untouched for idle_seconds"""
+        with self.lock:
+            if self.game is None or self.game.is_packed():
+                return False
+            now = time.monotonic() if now is None else now
+            if now - self.last_activity < idle_seconds:
+                return False
+            return self.game.pack()
         
     def add_player(self, player: Player) -> bool:
         """Add player to room"""
@@ -106,7 +132,10 @@ class GameManager:
     
     def get_room(self, room_id: str) -> Optional[Room]:
         """Get room by ID"""
-        return self.rooms.get(room_id)
+        room = self.rooms.get(room_id)
+        if room:
+            room.touch()
+        return room
     
     def join_room(self, room_id: str, player: Player) -> bool:
         """Join an existing room"""
@@ -133,6 +162,19 @@ class GameManager:
             if room.status == STATUS_WAITING
         ]
     
+    def pack_idle_rooms(self, idle_seconds: float = IDLE_PACK_SECONDS) -> int:
+        """
+        Pack games in rooms that have been idle for at least idle_seconds
+        
+        Returns:
+            Number of rooms packed
+        """
+        now = time.monotonic()
+        return sum(
+            1 for room in list(self.rooms.values())
+            if room.pack_if_idle(idle_seconds, now)
+        )
+    
     def add_player(self, player: Player):
         """Add player to manager"""
         self.players[player.username] = player
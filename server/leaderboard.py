@@ -0,0 +1,256 @@
+"""
+Leaderboard - Player ranking kept up to date as ratings change
+An order-statistic treap answers top-K, rank and neighbourhood queries in
+O(log n); pages are cached and dropped only where rankings moved
+"""
+
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.constants import (LEADERBOARD_PAGE_SIZE, LEADERBOARD_MIN_GAMES,
+                              LEADERBOARD_CACHED_PAGES)
+
+# Highest rating first, ties broken by username
+Key = Tuple[float, str]
+
+
+class _Node:
+    """Treap node with the size of its subtree"""
+    
+    __slots__ = ('key', 'priority', 'left', 'right', 'size')
+    
+    def __init__(self, key: Key, priority: float):
+        self.key = key
+        self.priority = priority
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        self.size = 1
+
+
+def _size(node: Optional[_Node]) -> int:
+    return node.size if node else 0
+
+
+def _split(node: Optional[_Node], key: Key) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split into keys < key and keys >= key"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        node.size = 1 + _size(node.left) + _size(node.right)
+        return node, right
+    left, node.left = _split(node.left, key)
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """Join two treaps where every key in left < every key in right"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.size = 1 + _size(left.left) + _size(left.right)
+        return left
+    right.left = _merge(left, right.left)
+    right.size = 1 + _size(right.left) + _size(right.right)
+    return right
+
+
+def _remove(node: Optional[_Node], key: Key) -> Optional[_Node]:
+    """Remove key from the subtree, fixing sizes on the way back up"""
+    if node is None:
+        return None
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _remove(node.left, key)
+    else:
+        node.right = _remove(node.right, key)
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+class OrderStatisticTree:
+    """Sorted set of keys with O(log n) insert, remove, rank and select"""
+    
+    def __init__(self, seed: int = None):
+        self.root: Optional[_Node] = None
+        self._random = random.Random(seed)
+    
+    def __len__(self) -> int:
+        return _size(self.root)
+    
+    def insert(self, key: Key):
+        """Add a key (keys must be unique)"""
+        left, right = _split(self.root, key)
+        self.root = _merge(_merge(left, _Node(key, self._random.random())), right)
+    
+    def remove(self, key: Key):
+        """Remove a key if present"""
+        self.root = _remove(self.root, key)
+    
+    def rank(self, key: Key) -> int:
+        """Number of keys ordered before key"""
+        node, rank = self.root, 0
+        while node is not None:
+            if key <= node.key:
+                node = node.left
+            else:
+                rank += _size(node.left) + 1
+                node = node.right
+        return rank
+    
+    def select(self, index: int) -> Key:
+        """Key at 0-based position index"""
+        node = self.root
+        while node is not None:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node.key
+            else:
+                index -= left + 1
+                node = node.right
+        raise IndexError("index out of range")
+    
+    def slice(self, start: int, count: int) -> List[Key]:
+        """Up to count keys starting at position start"""
+        keys = []
+        # In-order walk that skips subtrees before start
+        stack, node, index = [], self.root, start
+        while node is not None:
+            left = _size(node.left)
+            if index < left:
+                stack.append(node)
+                node = node.left
+            elif index == left:
+                stack.append(node)
+                break
+            else:
+                index -= left + 1
+                node = node.right
+        while stack and len(keys) < count:
+            node = stack.pop()
+            keys.append(node.key)
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
+        return keys
+
+
+class Leaderboard:
+    """
+    Ranked players, updated incrementally as ratings change
+    
+    Pages of LEADERBOARD_PAGE_SIZE entries are cached; an update drops
+    only the pages between a player's old and new rank. At most
+    max_pages are kept, the least recently read going first.
+    """
+    
+    def __init__(self, page_size: int = LEADERBOARD_PAGE_SIZE,
+                 max_pages: int = LEADERBOARD_CACHED_PAGES):
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.tree = OrderStatisticTree()
+        self.keys: Dict[str, Key] = {}
+        self._pages: "OrderedDict[int, List[dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_store(cls, store, min_games: int = LEADERBOARD_MIN_GAMES) -> "Leaderboard":
+        """Build from every stored player with at least min_games games"""
+        leaderboard = cls()
+        for record in list(store.records.values()):
+            if record.games >= min_games:
+                leaderboard.update(record.username, record.rating)
+        return leaderboard
+    
+    def __len__(self) -> int:
+        return len(self.tree)
+    
+    def update(self, username: str, rating: float):
+        """Add a player or move them to their new rating"""
+        key = (-rating, username)
+        with self._lock:
+            old = self.keys.get(username)
+            if old == key:
+                return
+            if old is None:
+                # Everyone from the new rank down shifts by one
+                first, last = self.tree.rank(key), len(self.tree)
+            else:
+                first = self.tree.rank(old)
+                self.tree.remove(old)
+                last = first
+            self.tree.insert(key)
+            self.keys[username] = key
+            new_rank = self.tree.rank(key)
+            self._invalidate(min(first, new_rank), max(last, new_rank))
+    
+    def remove(self, username: str):
+        """Take a player off the leaderboard"""
+        with self._lock:
+            key = self.keys.pop(username, None)
+            if key is not None:
+                first = self.tree.rank(key)
+                self.tree.remove(key)
+                self._invalidate(first, len(self.tree))
+    
+    def _invalidate(self, first: int, last: int):
+        """Drop cached pages holding ranks first..last (0-based)"""
+        if not self._pages:
+            return
+        first_page, last_page = first // self.page_size, last // self.page_size
+        if last_page - first_page < len(self._pages):
+            for page in range(first_page, last_page + 1):
+                self._pages.pop(page, None)
+        else:
+            for page in [page for page in self._pages if first_page <= page <= last_page]:
+                del self._pages[page]
+    
+    def _entries(self, start: int, count: int) -> List[dict]:
+        return [{"rank": start + i + 1, "username": username, "rating": round(-negative)}
+                for i, (negative, username) in enumerate(self.tree.slice(start, count))]
+    
+    def page(self, page: int) -> List[dict]:
+        """Entries on a 0-based page, from the cache when unchanged; empty past the end"""
+        with self._lock:
+            entries = self._pages.get(page)
+            if entries is not None:
+                self._pages.move_to_end(page)
+                return entries
+            if not 0 <= page * self.page_size < len(self.tree):
+                return []
+            entries = self._pages[page] = self._entries(page * self.page_size, self.page_size)
+            if len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+            return entries
+    
+    def top(self, k: int) -> List[dict]:
+        """The k highest-rated players"""
+        with self._lock:
+            return self._entries(0, k)
+    
+    def rank(self, username: str) -> Optional[int]:
+        """1-based rank of a player, or None if not ranked"""
+        with self._lock:
+            key = self.keys.get(username)
+            return self.tree.rank(key) + 1 if key is not None else None
+    
+    def around(self, username: str, radius: int) -> List[dict]:
+        """Up to radius players either side of a player, and the player"""
+        with self._lock:
+            key = self.keys.get(username)
+            if key is None:
+                return []
+            start = max(0, self.tree.rank(key) - radius)
+            return self._entries(start, 2 * radius + 1)
@@ -3,27 +3,61 @@ Chess Server - Main server application
 Handles socket connections and client requests
 """
 
+import argparse
+import hmac
+import itertools
 import socket
 import threading
+import time
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from common.constants import *
-from common.protocol import create_message, parse_message, send_message, receive_message
+from common.protocol import create_message, parse_message, MessageReader
+from common.tracing import (TraceAggregator, get_trace, stamp, copy_trace,
+                            STAGE_SERVER_RECEIVE, STAGE_VALIDATED, STAGE_ENCODED, STAGE_SENT)
 from game_manager import GameManager, Player
+from position_cache import get_position_cache
+from traffic_capture import TrafficRecorder
+from metrics import ServerMetrics, start_metrics_server, escape_label
+from diagnostics import Diagnostics
+from player_store import PlayerStore
+from ratings import RatingEngine
+from leaderboard import Leaderboard
+from tournament import TournamentManager, TOURNAMENT_REGISTERING, TOURNAMENT_FINISHED
+from simul import SimulManager
 
 
 class ChessServer:
     """Main Chess Server class"""
     
-    def __init__(self, host=SERVER_HOST, port=SERVER_PORT):
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, capture_path=None,
+                 metrics_port=None, admin_token=None, profile_dir=PROFILE_DIR,
+                 player_db=None):
         self.host = host
         self.port = port
         self.server_socket = None
         self.game_manager = GameManager()
+        self.tournaments = TournamentManager(self.game_manager)
+        self.simuls = SimulManager(self.game_manager, self.send_encoded)
         self.running = False
+        self.connection_ids = itertools.count(1)
+        # Optional capture of inbound traffic for replay
+        self.recorder = TrafficRecorder(capture_path) if capture_path else None
+        # Optional runtime metrics served over local HTTP
+        self.metrics_port = metrics_port
+        self.metrics = ServerMetrics() if metrics_port else None
+        # Live profiling for admins; off unless a token is configured
+        self.admin_token = admin_token
+        self.diagnostics = Diagnostics(profile_dir) if admin_token else None
+        # Per-stage latency of moves that clients sent with a trace
+        self.traces = TraceAggregator()
+        # Ratings and stats that outlive a connection
+        self.player_store = PlayerStore(player_db) if player_db else None
+        self.ratings = RatingEngine(self.player_store) if self.player_store else None
+        self.leaderboard = Leaderboard.from_store(self.player_store) if self.player_store else None
         
     def start(self):
         """Start the chess server"""
@@ -37,6 +71,23 @@ class ChessServer:
             self.running = True
             print(f"♟️  Chess Server started on {self.host}:{self.port}")
             print(f"📡 Waiting for connections...")
+            if self.recorder:
+                print(f"🎥 Capturing traffic to {self.recorder.path}")
+            if self.metrics:
+                self.metrics.add_collector(self.collect_metrics)
+                start_metrics_server(self.metrics, METRICS_HOST, self.metrics_port)
+                print(f"📈 Metrics on http://{METRICS_HOST}:{self.metrics_port}/metrics")
+            if self.player_store:
+                print(f"💾 {len(self.player_store.records)} registered players in {self.player_store.path}")
+            if self.diagnostics:
+                print(f"🩺 Admin diagnostics enabled, writing to {self.diagnostics.output_dir}")
+            
+            # Pack idle games in the background
+            threading.Thread(target=self.sweep_idle_rooms, daemon=True).start()
+            if self.ratings:
+                threading.Thread(target=self.rate_periodically, daemon=True).start()
+            threading.Thread(target=self.simuls.flush_periodically,
+                             args=(lambda: self.running,), daemon=True).start()
             
             # Accept connections
             while self.running:
@@ -61,56 +112,91 @@ class ChessServer:
         finally:
             self.shutdown()
     
+    def sweep_idle_rooms(self):
+        """Periodically pack games in idle rooms to their compact form"""
+        while self.running:
+            time.sleep(IDLE_SWEEP_INTERVAL)
+            packed = self.game_manager.pack_idle_rooms(IDLE_PACK_SECONDS)
+            if packed:
+                print(f"📦 Packed {packed} idle game(s)")
+            
+            cache = get_position_cache().stats()
+            if cache["hits"] or cache["misses"]:
+                print(f"♻️  Position cache: {cache['hit_rate']:.1%} hit rate, "
+                      f"{cache['size']} positions")
+    
+    def rate_periodically(self):
+        """Close a Glicko-2 rating period every RATING_PERIOD_SECONDS"""
+        while self.running:
+            time.sleep(RATING_PERIOD_SECONDS)
+            if self.running:
+                self.run_rating_period()
+    
+    def run_rating_period(self):
+        """Rate the games finished this period and update online players"""
+        games = self.ratings.pending
+        started = time.perf_counter()
+        rated = self.ratings.run_period()
+        for username, rating in rated.items():
+            self.leaderboard.update(username, rating)
+        for player in list(self.game_manager.players.values()):
+            record = self.player_store.get(player.username)
+            if record:
+                player.rating = record.rating
+        print(f"📊 Rated {games} game(s) for {len(rated)} player(s) "
+              f"in {time.perf_counter() - started:.2f}s")
+    
     def handle_client(self, client_socket, address):
         """Handle individual client connection"""
         player = None
+        conn_id = next(self.connection_ids)
+        recorder = self.recorder
+        
+        reader = MessageReader(client_socket, BUFFER_SIZE)
+        connected = True
+        metrics = self.metrics
+        if metrics:
+            metrics.connection_opened()
         
         try:
-            while self.running:
-                # Receive message from client
-                message = receive_message(client_socket, BUFFER_SIZE)
+            while self.running and connected:
+                # Receive messages from client; one recv may hold several
+                messages = reader.read()
                 
-                if not message:
+                if messages is None:
+                    if reader.overflowed:
+                        print(f"⛔ Dropping {address}: message over {MAX_MESSAGE_SIZE} bytes")
                     break
                 
-                msg_type = message.get("type")
-                data = message.get("data", {})
-                
-                print(f"📨 Received {msg_type} from {address}")
+                for message in messages:
+                    msg_type = message.get("type")
+                    if msg_type == MSG_ERROR:
+                        # Input that could not be parsed was skipped; tell the client
+                        self.send(client_socket, MSG_ERROR, message.get("data"))
+                        continue
+                    received_at = recorder.now() if recorder else 0.0
+                    if msg_type == MSG_MOVE:
+                        stamp(get_trace(message.get("data")), STAGE_SERVER_RECEIVE)
+                    print(f"📨 Received {msg_type} from {address}")
                 
-                # Handle different message types
-                if msg_type == MSG_LOGIN:
-                    player = self.handle_login(client_socket, data, address)
-                    
-                elif msg_type == MSG_CREATE_ROOM:
-                    self.handle_create_room(client_socket, player, data)
-                    
-                elif msg_type == MSG_LIST_ROOMS:
-                    self.handle_list_rooms(client_socket)
-                    
-                elif msg_type == MSG_JOIN_ROOM:
-                    self.handle_join_room(client_socket, player, data)
-                    
-                elif msg_type == MSG_MOVE:
-                    self.handle_move(client_socket, player, data)
+                    if msg_type == MSG_LOGOUT:
+                        connected = False
+                        break
                 
-                elif msg_type == "GET_LEGAL_MOVES":
-                    self.handle_get_legal_moves(client_socket, player, data)
-                    
-                elif msg_type == MSG_CHAT:
-                    self.handle_chat(player, data)
-                    
-                elif msg_type == MSG_UNDO:
-                    self.handle_undo(client_socket, player)
-                    
-                elif msg_type == MSG_REDO:
-                    self.handle_redo(client_socket, player)
+                    if recorder and msg_type != MSG_ADMIN:
+                        # Record first, so a message whose handler fails is still captured
+                        recorder.record(received_at, conn_id, msg_type, message.get("data", {}))
                     
-                elif msg_type == MSG_RESIGN:
-                    self.handle_resign(player)
+                    started = time.perf_counter()
+                    player = self.dispatch(client_socket, address, player, message)
+                    if metrics:
+                        metrics.message_handled(msg_type, time.perf_counter() - started)
                     
-                elif msg_type == MSG_LOGOUT:
-                    break
+                    if recorder and msg_type != MSG_ADMIN:
+                        # Ids are random, so note which one the message created
+                        created_id = self.created_id(player, msg_type)
+                        if created_id:
+                            recorder.record_created(conn_id, msg_type, created_id)
                     
         except Exception as e:
             print(f"❌ Error handling client {address}: {e}")
@@ -118,33 +204,196 @@ class ChessServer:
             # Cleanup
             if player:
                 print(f"👋 {player.username} disconnected")
-                self.game_manager.remove_player(player.username)
+                self.end_simul(player)
+                self.leave_game(player, disconnect=True)
+            if recorder:
+                recorder.record(recorder.now(), conn_id, None)
+            if metrics:
+                metrics.connection_closed()
             client_socket.close()
     
+    def created_id(self, player, msg_type):
+        """Id of the room, simul board, simul or tournament a message just made"""
+        if not player:
+            return None
+        if msg_type in (MSG_CREATE_ROOM, MSG_JOIN_SIMUL):
+            return player.room_id
+        if msg_type == MSG_CREATE_SIMUL:
+            simul = self.simuls.hosts.get(player.username)
+            return simul.simul_id if simul else None
+        if msg_type == MSG_CREATE_TOURNAMENT:
+            created = [tournament for tournament in self.tournaments.tournaments.values()
+                       if tournament.creator == player.username]
+            return created[-1].tournament_id if created else None
+        return None
+    
+    def send(self, client_socket, msg_type, data=None):
+        """Send a message to one client, counting it in metrics"""
+        self.send_encoded(client_socket, msg_type, create_message(msg_type, data).encode('utf-8'))
+    
+    def send_encoded(self, client_socket, msg_type, message):
+        """Send an already encoded message, e.g. one shared by a broadcast"""
+        metrics = self.metrics
+        if metrics:
+            metrics.send_started()
+            try:
+                client_socket.sendall(message)
+            finally:
+                metrics.send_finished(msg_type, len(message))
+        else:
+            client_socket.sendall(message)
+    
+    def collect_metrics(self):
+        """Exposition lines for players, rooms and the position cache"""
+        rooms = list(self.game_manager.rooms.values())
+        by_status = {STATUS_WAITING: 0, STATUS_PLAYING: 0, STATUS_FINISHED: 0}
+        packed = 0
+        for room in rooms:
+            by_status[room.status] = by_status.get(room.status, 0) + 1
+            if room.game and room.game.is_packed():
+                packed += 1
+        cache = get_position_cache().stats()
+        
+        lines = [
+            "# HELP chess_players Logged-in players",
+            "# TYPE chess_players gauge",
+            f"chess_players {len(self.game_manager.players)}",
+            "# HELP chess_rooms Rooms by status",
+            "# TYPE chess_rooms gauge",
+        ]
+        lines += [f'chess_rooms{{status="{status}"}} {count}' for status, count in by_status.items()]
+        lines += [
+            "# HELP chess_rooms_packed Rooms whose game is held in packed form",
+            "# TYPE chess_rooms_packed gauge",
+            f"chess_rooms_packed {packed}",
+            "# HELP chess_position_cache_size Positions in the shared cache",
+            "# TYPE chess_position_cache_size gauge",
+            f"chess_position_cache_size {cache['size']}",
+            "# HELP chess_position_cache_lookups_total Position cache lookups by result",
+            "# TYPE chess_position_cache_lookups_total counter",
+            f'chess_position_cache_lookups_total{{result="hit"}} {cache["hits"]}',
+            f'chess_position_cache_lookups_total{{result="miss"}} {cache["misses"]}',
+            "# HELP chess_position_cache_evictions_total Positions evicted from the cache",
+            "# TYPE chess_position_cache_evictions_total counter",
+            f"chess_position_cache_evictions_total {cache['evictions']}",
+            "# HELP chess_position_cache_hit_ratio Position cache hits over lookups",
+            "# TYPE chess_position_cache_hit_ratio gauge",
+            f"chess_position_cache_hit_ratio {cache['hit_rate']:.4f}",
+            "# HELP chess_move_trace_seconds Gap between consecutive stages of traced moves",
+            "# TYPE chess_move_trace_seconds summary",
+        ]
+        for segment, entry in self.traces.summary().items():
+            segment = escape_label(segment)
+            for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+                lines.append(f'chess_move_trace_seconds{{segment="{segment}",'
+                             f'quantile="{quantile}"}} {entry[key] / 1e3:.6f}')
+            lines.append(f'chess_move_trace_seconds_count{{segment="{segment}"}} {entry["count"]}')
+        return lines
+    
+    def dispatch(self, client_socket, address, player, message):
+        """
+        Route one message to its handler
+        
+        Args:
+            client_socket: Socket the message came from
+            address: Client address
+            player: Player logged in on this connection (or None)
+            message: Parsed message
+        
+        Returns:
+            Player logged in on this connection after handling the message
+        """
+        msg_type = message.get("type")
+        data = message.get("data", {})
+        
+        # Handle different message types
+        if msg_type == MSG_LOGIN:
+            player = self.handle_login(client_socket, data, address)
+        
+        elif msg_type == MSG_CREATE_ROOM:
+            self.handle_create_room(client_socket, player, data)
+        
+        elif msg_type == MSG_LIST_ROOMS:
+            self.handle_list_rooms(client_socket)
+        
+        elif msg_type == MSG_JOIN_ROOM:
+            self.handle_join_room(client_socket, player, data)
+        
+        elif msg_type == MSG_MOVE:
+            self.handle_move(client_socket, player, data)
+        
+        elif msg_type == "GET_LEGAL_MOVES":
+            self.handle_get_legal_moves(client_socket, player, data)
+        
+        elif msg_type == MSG_CHAT:
+            self.handle_chat(player, data)
+        
+        elif msg_type == MSG_UNDO:
+            self.handle_undo(client_socket, player, data)
+        
+        elif msg_type == MSG_REDO:
+            self.handle_redo(client_socket, player, data)
+        
+        elif msg_type == MSG_RESIGN:
+            self.handle_resign(player, data)
+        
+        elif msg_type == MSG_CREATE_SIMUL:
+            self.handle_create_simul(client_socket, player, data)
+        
+        elif msg_type == MSG_JOIN_SIMUL:
+            self.handle_join_simul(client_socket, player, data)
+        
+        elif msg_type == MSG_CREATE_TOURNAMENT:
+            self.handle_create_tournament(client_socket, player, data)
+        
+        elif msg_type == MSG_JOIN_TOURNAMENT:
+            self.handle_join_tournament(client_socket, player, data)
+        
+        elif msg_type == MSG_START_TOURNAMENT:
+            self.handle_start_tournament(client_socket, player, data)
+        
+        elif msg_type == MSG_TOURNAMENT_STANDINGS:
+            tournament = self.tournaments.get(data.get("tournament_id"))
+            if tournament:
+                self.send(client_socket, MSG_TOURNAMENT_UPDATE, tournament.to_dict())
+            else:
+                self.send(client_socket, MSG_ERROR, {"error": "Tournament not found"})
+        
+        elif msg_type == MSG_LEADERBOARD:
+            self.handle_leaderboard(client_socket, player, data)
+        
+        elif msg_type == MSG_ADMIN:
+            self.handle_admin(client_socket, address, data)
+        
+        return player
+    
     def handle_login(self, client_socket, data, address):
         """Handle login request"""
         username = data.get("username", "")
         
         if not username:
-            send_message(client_socket, MSG_LOGIN_FAILED, 
+            self.send(client_socket, MSG_LOGIN_FAILED, 
                         {"error": "Username required"})
             return None
         
         # Check if username already exists
         if self.game_manager.get_player(username):
-            send_message(client_socket, MSG_LOGIN_FAILED,
+            self.send(client_socket, MSG_LOGIN_FAILED,
                         {"error": "Username already taken"})
             return None
         
         # Create player
         player = Player(username, client_socket, address)
         self.game_manager.add_player(player)
+        login_data = {"username": username}
+        if self.player_store:
+            record = self.player_store.login(username)
+            player.rating = record.rating
+            login_data.update(record.to_dict())
+        login_data["rating"] = round(player.rating)
         
         # Send success
-        send_message(client_socket, MSG_LOGIN_SUCCESS, {
-            "username": username,
-            "rating": player.rating
-        })
+        self.send(client_socket, MSG_LOGIN_SUCCESS, login_data)
         
         print(f"✅ {username} logged in")
         return player
@@ -152,13 +401,13 @@ class ChessServer:
     def handle_create_room(self, client_socket, player, data):
         """Handle create room request"""
         if not player:
-            send_message(client_socket, MSG_ERROR, {"error": "Not logged in"})
+            self.send(client_socket, MSG_ERROR, {"error": "Not logged in"})
             return
         
         room_name = data.get("room_name", f"{player.username}'s room")
         room = self.game_manager.create_room(room_name, player)
         
-        send_message(client_socket, MSG_ROOM_JOINED, {
+        self.send(client_socket, MSG_ROOM_JOINED, {
             "room_id": room.room_id,
             "room_name": room.name,
             "status": room.status
@@ -169,28 +418,28 @@ class ChessServer:
     def handle_list_rooms(self, client_socket):
         """Handle list rooms request"""
         rooms = self.game_manager.get_available_rooms()
-        send_message(client_socket, MSG_ROOM_LIST, {"rooms": rooms})
+        self.send(client_socket, MSG_ROOM_LIST, {"rooms": rooms})
     
     def handle_join_room(self, client_socket, player, data):
         """Handle join room request"""
         if not player:
-            send_message(client_socket, MSG_ERROR, {"error": "Not logged in"})
+            self.send(client_socket, MSG_ERROR, {"error": "Not logged in"})
             return
         
         room_id = data.get("room_id")
         room = self.game_manager.get_room(room_id)
         
         if not room:
-            send_message(client_socket, MSG_ERROR, {"error": "Room not found"})
+            self.send(client_socket, MSG_ERROR, {"error": "Room not found"})
             return
         
         if room.is_full():
-            send_message(client_socket, MSG_ERROR, {"error": "Room is full"})
+            self.send(client_socket, MSG_ERROR, {"error": "Room is full"})
             return
         
         # Join room
         if self.game_manager.join_room(room_id, player):
-            send_message(client_socket, MSG_ROOM_JOINED, {
+            self.send(client_socket, MSG_ROOM_JOINED, {
                 "room_id": room.room_id,
                 "room_name": room.name
             })
@@ -204,81 +453,129 @@ class ChessServer:
     
     def broadcast_game_start(self, room):
         """Broadcast game start to both players"""
-        game_data = {
-            "game_id": room.room_id,
-            "white_player": room.white_player.username,
-            "black_player": room.black_player.username,
-            "board_state": room.game.get_board_state(),
-            "can_undo": room.game.can_undo(),
-            "can_redo": room.game.can_redo()
-        }
+        with room.lock:
+            game_data = {
+                "game_id": room.room_id,
+                "white_player": room.white_player.username,
+                "black_player": room.black_player.username,
+                "board_state": room.game.get_board_state(),
+                "can_undo": room.game.can_undo(),
+                "can_redo": room.game.can_redo()
+            }
         
         # Send to white player
-        send_message(room.white_player.socket, MSG_GAME_START, {
+        self.send_to_seat(room, room.white_player, MSG_GAME_START, {
             **game_data,
             "your_color": COLOR_WHITE
         })
         
         # Send to black player
-        send_message(room.black_player.socket, MSG_GAME_START, {
+        self.send_to_seat(room, room.black_player, MSG_GAME_START, {
             **game_data,
             "your_color": COLOR_BLACK
         })
         
         print(f"🎮 Game started in room {room.room_id}")
     
+    def player_room(self, player, data):
+        """
+        Find the room a game message is for
+        
+        Simul hosts address a board by room_id; everyone else plays in
+        their one room.
+        
+        Returns:
+            (room, the player's color in it), or (None, None)
+        """
+        if not player:
+            return None, None
+        room_id = data.get("room_id") if data else None
+        if room_id:
+            room = self.simuls.host_room(player, room_id)
+            if room:
+                room.touch()
+                return room, COLOR_WHITE if room.white_player is player else COLOR_BLACK
+        if not player.room_id:
+            return None, None
+        return self.game_manager.get_room(player.room_id), player.color
+    
+    def send_to_seat(self, room, recipient, msg_type, data, message=None):
+        """
+        Send a room update to one of its players
+        
+        A simul host gets it on their coalesced stream instead; message
+        is the already encoded form of data, if there is one.
+        
+        Returns:
+            True if sent now, False if queued for a simul host
+        """
+        if self.simuls.queue(room, recipient, msg_type, data):
+            return False
+        if message is None:
+            self.send(recipient.socket, msg_type, data)
+        else:
+            self.send_encoded(recipient.socket, msg_type, message)
+        return True
+    
     def handle_get_legal_moves(self, client_socket, player, data):
         """Handle get legal moves request"""
-        if not player or not player.room_id:
-            send_message(client_socket, MSG_ERROR, {"error": "Not in a game"})
-            return
-        
-        room = self.game_manager.get_room(player.room_id)
-        if not room or not room.game:
-            send_message(client_socket, MSG_ERROR, {"error": "Game not found"})
+        room, color = self.player_room(player, data)
+        if not room:
+            self.send(client_socket, MSG_ERROR, {"error": "Not in a game"})
             return
         
-        square = data.get("square")
-        if square:
-            # Check if piece belongs to current player
-            piece_color = room.game.get_piece_color(square)
-            if piece_color == player.color:
-                legal_moves = room.game.get_legal_moves(square)
-                send_message(client_socket, "LEGAL_MOVES", {
-                    "square": square,
-                    "moves": legal_moves
-                })
-            else:
-                send_message(client_socket, "LEGAL_MOVES", {
-                    "square": square,
-                    "moves": []
-                })
+        with room.lock:
+            if not room.game:
+                self.send(client_socket, MSG_ERROR, {"error": "Game not found"})
+                return
+        
+            square = data.get("square")
+            if square:
+                # Check if piece belongs to current player
+                piece_color = room.game.get_piece_color(square)
+                if piece_color == color:
+                    legal_moves = room.game.get_legal_moves(square)
+                    self.send(client_socket, "LEGAL_MOVES", {
+                        "square": square,
+                        "moves": legal_moves
+                    })
+                else:
+                    self.send(client_socket, "LEGAL_MOVES", {
+                        "square": square,
+                        "moves": []
+                    })
     
     def handle_move(self, client_socket, player, data):
         """Handle move request"""
-        if not player or not player.room_id:
-            send_message(client_socket, MSG_ERROR, {"error": "Not in a game"})
-            return
-        
-        room = self.game_manager.get_room(player.room_id)
-        if not room or not room.game:
-            send_message(client_socket, MSG_ERROR, {"error": "Game not found"})
-            return
-        
-        # Check if it's player's turn
-        current_turn = room.game.get_current_turn()
-        if player.color != current_turn:
-            send_message(client_socket, MSG_ERROR, {"error": "Not your turn"})
+        room, color = self.player_room(player, data)
+        if not room:
+            self.send(client_socket, MSG_ERROR, {"error": "Not in a game"})
             return
         
-        # Make move
-        from_square = data.get("from")
-        to_square = data.get("to")
-        promotion = data.get("promotion")
-        
-        move_result = room.game.make_move(from_square, to_square, promotion)
-        if move_result[0]:  # Move was successful
+        with room.lock:
+            if not room.game:
+                self.send(client_socket, MSG_ERROR, {"error": "Game not found"})
+                return
+        
+            # Check if it's player's turn
+            current_turn = room.game.get_current_turn()
+            if color != current_turn:
+                self.send(client_socket, MSG_ERROR, {"error": "Not your turn"})
+                return
+        
+            # Make move
+            from_square = data.get("from")
+            to_square = data.get("to")
+            promotion = data.get("promotion")
+        
+            trace = get_trace(data)
+            move_result = room.game.make_move(from_square, to_square, promotion)
+            if not move_result[0]:
+                # Send more detailed error
+                self.send(client_socket, MSG_ERROR, {"error": "Invalid move"})
+                return
             captured_piece = move_result[1] if len(move_result) > 1 else None
+            stamp(trace, STAGE_VALIDATED)
             
             # Broadcast move to both players
             move_data = {
@@ -293,24 +590,30 @@ class ChessServer:
                 "can_undo": room.game.can_undo(),
                 "can_redo": room.game.can_redo()
             }
+            if trace:
+                move_data["trace"] = trace
             
-            send_message(room.white_player.socket, MSG_MOVE_UPDATE, move_data)
-            send_message(room.black_player.socket, MSG_MOVE_UPDATE, move_data)
+            # Both players get the same update, so encode it once
+            message = create_message(MSG_MOVE_UPDATE, move_data).encode('utf-8')
+            if trace:
+                # Stages after encoding are recorded on the server only
+                trace = copy_trace(trace)
+                stamp(trace, STAGE_ENCODED)
+            for recipient, recipient_color in ((room.white_player, COLOR_WHITE),
+                                               (room.black_player, COLOR_BLACK)):
+                if self.send_to_seat(room, recipient, MSG_MOVE_UPDATE, move_data, message):
+                    stamp(trace, STAGE_SENT + recipient_color)
+            result = room.game.get_game_result() if room.game.is_game_over() else None
+        if trace:
+            self.traces.record(trace)
             
-            # Check game over
-            if room.game.is_game_over():
-                result = room.game.get_game_result()
-                self.broadcast_game_over(room, result)
-        else:
-            # Send more detailed error
-            send_message(client_socket, MSG_ERROR, {"error": "Invalid move"})
+        # Check game over; the next tournament round may start other rooms
+        if result:
+            self.broadcast_game_over(room, result)
     
     def handle_chat(self, player, data):
         """Handle chat message"""
-        if not player or not player.room_id:
-            return
-        
-        room = self.game_manager.get_room(player.room_id)
+        room, color = self.player_room(player, data)
         if not room:
             return
         
@@ -322,87 +625,303 @@ class ChessServer:
         
         # Broadcast to both players
         for p in room.players:
-            send_message(p.socket, MSG_CHAT_MESSAGE, chat_data)
+            self.send_to_seat(room, p, MSG_CHAT_MESSAGE, chat_data)
     
-    def handle_undo(self, client_socket, player):
+    def handle_undo(self, client_socket, player, data):
         """Handle undo move request"""
-        if not player or not player.room_id:
-            send_message(client_socket, MSG_ERROR, {"error": "Not in a game"})
+        room, color = self.player_room(player, data)
+        if not room:
+            self.send(client_socket, MSG_ERROR, {"error": "Not in a game"})
             return
         
-        room = self.game_manager.get_room(player.room_id)
-        if not room or not room.game:
-            send_message(client_socket, MSG_ERROR, {"error": "Game not found"})
+        with room.lock:
+            if not room.game:
+                self.send(client_socket, MSG_ERROR, {"error": "Game not found"})
+                return
+            
+            # Perform undo
+            if room.game.undo_move():
+                # Broadcast updated state to both players
+                move_data = {
+                    "board_state": room.game.get_board_state(),
+                    "current_turn": room.game.get_current_turn(),
+                    "captured_by_white": room.game.captured_by_white,
+                    "captured_by_black": room.game.captured_by_black,
+                    "can_undo": room.game.can_undo(),
+                    "can_redo": room.game.can_redo()
+                }
+                self.send_to_seat(room, room.white_player, MSG_MOVE_UPDATE, move_data)
+                self.send_to_seat(room, room.black_player, MSG_MOVE_UPDATE, move_data)
+            else:
+                self.send(client_socket, MSG_ERROR, {"error": "Cannot undo"})
+    
+    def handle_redo(self, client_socket, player, data):
+        """Handle redo move request"""
+        room, color = self.player_room(player, data)
+        if not room:
+            self.send(client_socket, MSG_ERROR, {"error": "Not in a game"})
             return
         
-        # Perform undo
-        if room.game.undo_move():
-            # Broadcast updated state to both players
-            move_data = {
-                "board_state": room.game.get_board_state(),
-                "current_turn": room.game.get_current_turn(),
-                "captured_by_white": room.game.captured_by_white,
-                "captured_by_black": room.game.captured_by_black,
-                "can_undo": room.game.can_undo(),
-                "can_redo": room.game.can_redo()
-            }
-            send_message(room.white_player.socket, MSG_MOVE_UPDATE, move_data)
-            send_message(room.black_player.socket, MSG_MOVE_UPDATE, move_data)
-        else:
-            send_message(client_socket, MSG_ERROR, {"error": "Cannot undo"})
+        with room.lock:
+            if not room.game:
+                self.send(client_socket, MSG_ERROR, {"error": "Game not found"})
+                return
     
-    def handle_redo(self, client_socket, player):
-        """Handle redo move request"""
-        if not player or not player.room_id:
-            send_message(client_socket, MSG_ERROR, {"error": "Not in a game"})
+            # Perform redo
+            if room.game.redo_move():
+                # Broadcast updated state to both players
+                move_data = {
+                    "board_state": room.game.get_board_state(),
+                    "current_turn": room.game.get_current_turn(),
+                    "captured_by_white": room.game.captured_by_white,
+                    "captured_by_black": room.game.captured_by_black,
+                    "can_undo": room.game.can_undo(),
+                    "can_redo": room.game.can_redo()
+                }
+                self.send_to_seat(room, room.white_player, MSG_MOVE_UPDATE, move_data)
+                self.send_to_seat(room, room.black_player, MSG_MOVE_UPDATE, move_data)
+            else:
+                self.send(client_socket, MSG_ERROR, {"error": "Cannot redo"})
+        
+    def handle_resign(self, player, data):
+        """Handle resign request"""
+        room, color = self.player_room(player, data)
+        if not room:
             return
         
-        room = self.game_manager.get_room(player.room_id)
-        if not room or not room.game:
-            send_message(client_socket, MSG_ERROR, {"error": "Game not found"})
+        # Determine winner
+        winner = COLOR_BLACK if color == COLOR_WHITE else COLOR_WHITE
+        self.broadcast_game_over(room, f"{winner}_win", END_RESIGN)
+    
+    def handle_create_simul(self, client_socket, player, data):
+        """Handle create simul request; the creator hosts every board"""
+        if not player:
+            self.send(client_socket, MSG_ERROR, {"error": "Not logged in"})
             return
         
-        # Perform redo
-        if room.game.redo_move():
-            # Broadcast updated state to both players
-            move_data = {
-                "board_state": room.game.get_board_state(),
-                "current_turn": room.game.get_current_turn(),
-                "captured_by_white": room.game.captured_by_white,
-                "captured_by_black": room.game.captured_by_black,
-                "can_undo": room.game.can_undo(),
-                "can_redo": room.game.can_redo()
-            }
-            send_message(room.white_player.socket, MSG_MOVE_UPDATE, move_data)
-            send_message(room.black_player.socket, MSG_MOVE_UPDATE, move_data)
-        else:
-            send_message(client_socket, MSG_ERROR, {"error": "Cannot redo"})
+        try:
+            boards = int(data.get("boards", SIMUL_MAX_BOARDS))
+        except (TypeError, ValueError):
+            boards = 0
+        if not 1 <= boards <= SIMUL_MAX_BOARDS:
+            self.send(client_socket, MSG_ERROR,
+                      {"error": f"Boards must be between 1 and {SIMUL_MAX_BOARDS}"})
+            return
+        
+        name = data.get("name") or f"{player.username}'s simul"
+        simul = self.simuls.create(player, name, boards)
+        if not simul:
+            self.send(client_socket, MSG_ERROR, {"error": "Already hosting a simul"})
+            return
+        self.send(client_socket, MSG_SIMUL_INFO, simul.to_dict())
+        print(f"🎪 {player.username} opened simul {simul.simul_id} for {boards} boards")
     
-    def handle_resign(self, player):
-        """Handle resign request"""
-        if not player or not player.room_id:
+    def handle_join_simul(self, client_socket, player, data):
+        """Handle join simul request: a new board against the host starts at once"""
+        if not player:
+            self.send(client_socket, MSG_ERROR, {"error": "Not logged in"})
+            return
+        
+        simul = self.simuls.get(data.get("simul_id"))
+        if not simul:
+            self.send(client_socket, MSG_ERROR, {"error": "Simul not found"})
+            return
+        if simul.host is player:
+            self.send(client_socket, MSG_ERROR, {"error": "Cannot join your own simul"})
             return
         
-        room = self.game_manager.get_room(player.room_id)
+        # Leave any previous room first, as when joining a room
+        if player.room_id:
+            self.leave_game(player)
+        room = self.simuls.add_board(simul, player)
         if not room:
+            self.send(client_socket, MSG_ERROR, {"error": "Simul is full"})
+            return
+        self.send(client_socket, MSG_ROOM_JOINED, {
+            "room_id": room.room_id,
+            "room_name": room.name,
+            "simul_id": simul.simul_id
+        })
+        self.broadcast_game_start(room)
+        print(f"🎪 {player.username} joined simul {simul.simul_id} on board {room.room_id}")
+    
+    def leave_game(self, player, disconnect=False):
+        """
+        Take a player out of their room, and off the server on disconnect
+        
+        A tournament game or simul board still in progress is lost by
+        forfeit through the usual game-over path; otherwise a round could
+        never finish and a host would keep an abandoned board. The player
+        is out of the room first so the next round does not seat them in
+        the middle of leaving.
+        """
+        room = self.game_manager.rooms.get(player.room_id) if player.room_id else None
+        if disconnect:
+            self.game_manager.remove_player(player.username)
+        else:
+            self.game_manager.leave_room(player)
+        
+        if (room and room.status == STATUS_PLAYING
+                and player in (room.white_player, room.black_player)
+                and (self.tournaments.is_round_game(room) or self.simuls.is_board(room))):
+            winner = COLOR_BLACK if player is room.white_player else COLOR_WHITE
+            print(f"🏳️ {player.username} forfeits their game in room {room.room_id}")
+            self.broadcast_game_over(room, f"{winner}_win", END_FORFEIT)
+    
+    def end_simul(self, host):
+        """Close a departing host's simul; unfinished boards go to the opponents"""
+        for room in self.simuls.close(host):
+            room.players.remove(host)  # Their own room_id is another room's
+            self.broadcast_game_over(room, RESULT_BLACK_WIN, END_RESIGN)
+    
+    def handle_create_tournament(self, client_socket, player, data):
+        """Handle create tournament request; the creator is registered too"""
+        if not player:
+            self.send(client_socket, MSG_ERROR, {"error": "Not logged in"})
             return
         
-        # Determine winner
-        winner = COLOR_BLACK if player.color == COLOR_WHITE else COLOR_WHITE
-        self.broadcast_game_over(room, f"{winner}_win", END_RESIGN)
+        try:
+            rounds = int(data.get("rounds", TOURNAMENT_DEFAULT_ROUNDS))
+        except (TypeError, ValueError):
+            rounds = 0
+        if not 1 <= rounds <= TOURNAMENT_MAX_ROUNDS:
+            self.send(client_socket, MSG_ERROR,
+                      {"error": f"Rounds must be between 1 and {TOURNAMENT_MAX_ROUNDS}"})
+            return
+        
+        name = data.get("name") or f"{player.username}'s tournament"
+        tournament = self.tournaments.create(name, rounds, player)
+        tournament.register(player)
+        self.send(client_socket, MSG_TOURNAMENT_UPDATE, tournament.to_dict())
+        print(f"🏆 {player.username} created tournament {tournament.tournament_id}")
+    
+    def handle_join_tournament(self, client_socket, player, data):
+        """Handle join tournament request"""
+        if not player:
+            self.send(client_socket, MSG_ERROR, {"error": "Not logged in"})
+            return
+        
+        tournament = self.tournaments.get(data.get("tournament_id"))
+        if not tournament:
+            self.send(client_socket, MSG_ERROR, {"error": "Tournament not found"})
+            return
+        if not tournament.register(player):
+            self.send(client_socket, MSG_ERROR, {"error": "Registration closed"})
+            return
+        self.send(client_socket, MSG_TOURNAMENT_UPDATE, tournament.to_dict())
+    
+    def handle_start_tournament(self, client_socket, player, data):
+        """Handle start tournament request from its creator"""
+        tournament = self.tournaments.get(data.get("tournament_id"))
+        if not tournament:
+            self.send(client_socket, MSG_ERROR, {"error": "Tournament not found"})
+            return
+        if not player or player.username != tournament.creator:
+            self.send(client_socket, MSG_ERROR, {"error": "Only the creator can start it"})
+            return
+        if tournament.status != TOURNAMENT_REGISTERING or len(tournament.standings) < 2:
+            self.send(client_socket, MSG_ERROR, {"error": "Tournament cannot start"})
+            return
+        
+        print(f"🏆 Tournament {tournament.tournament_id} started with "
+              f"{len(tournament.standings)} players")
+        self.start_tournament_round(tournament)
+    
+    def start_tournament_round(self, tournament):
+        """Launch the next round's rooms together and announce the standings"""
+        while tournament.status != TOURNAMENT_FINISHED:
+            rooms = self.tournaments.start_round(tournament)
+            for room in rooms:
+                self.broadcast_game_start(room)
+            self.broadcast_tournament(tournament)
+            if rooms:
+                break
+    
+    def broadcast_tournament(self, tournament):
+        """Send standings to every registered player who is online"""
+        message = create_message(MSG_TOURNAMENT_UPDATE, tournament.to_dict()).encode('utf-8')
+        for username in tournament.standings:
+            player = self.game_manager.get_player(username)
+            if player:
+                self.send_encoded(player.socket, MSG_TOURNAMENT_UPDATE, message)
+    
+    def handle_leaderboard(self, client_socket, player, data):
+        """Handle leaderboard request: a page, or the players around you"""
+        leaderboard = self.leaderboard
+        if not leaderboard:
+            self.send(client_socket, MSG_ERROR, {"error": "Leaderboard unavailable"})
+            return
+        
+        try:
+            page = int(data.get("page", 0))
+            radius = min(LEADERBOARD_MAX_RADIUS, max(0, int(data.get("around", 0))))
+            if page < 0:
+                raise ValueError(page)
+        except (AttributeError, TypeError, ValueError, OverflowError):
+            self.send(client_socket, MSG_ERROR, {"error": "Invalid leaderboard request"})
+            return
+        
+        reply = {"total": len(leaderboard), "page_size": leaderboard.page_size}
+        if radius and player:
+            reply["entries"] = leaderboard.around(player.username, radius)
+        else:
+            reply["page"] = page
+            reply["entries"] = leaderboard.page(page)
+        if player:
+            reply["your_rank"] = leaderboard.rank(player.username)
+        self.send(client_socket, MSG_LEADERBOARD, reply)
+    
+    def handle_admin(self, client_socket, address, data):
+        """Handle admin diagnostics command (profiling, allocation snapshots)"""
+        token = str(data.get("token", "")) if isinstance(data, dict) else ""
+        # Compare bytes: compare_digest rejects non-ASCII str
+        if not self.diagnostics or not hmac.compare_digest(token.encode('utf-8'),
+                                                           self.admin_token.encode('utf-8')):
+            print(f"⛔ Rejected admin command from {address}")
+            self.send(client_socket, MSG_ERROR, {"error": "Not authorized"})
+            return
+        
+        command = data.get("command", "status")
+        result = self.diagnostics.run(command, data.get("options"))
+        print(f"🩺 Admin {command} from {address}")
+        reply_type = MSG_ERROR if "error" in result else MSG_ADMIN_RESULT
+        self.send(client_socket, reply_type, {"command": command, **result})
     
     def broadcast_game_over(self, room, result, reason=END_CHECKMATE):
-        """Broadcast game over to both players"""
+        """
+        Broadcast game over to both players
+        
+        Only the first result for a room counts: a mate racing a resign
+        or a forfeit is announced, stored and rated once.
+        """
+        with room.lock:
+            if room.status == STATUS_FINISHED:
+                return
+            room.status = STATUS_FINISHED
+        
         game_over_data = {
             "result": result,
             "reason": reason
         }
         
         for player in room.players:
-            send_message(player.socket, MSG_GAME_OVER, game_over_data)
+            self.send_to_seat(room, player, MSG_GAME_OVER, game_over_data)
         
-        room.status = STATUS_FINISHED
+        if self.player_store and room.white_player and room.black_player:
+            self.player_store.record_game(room.white_player.username,
+                                          room.black_player.username, result)
+            self.ratings.record(room.white_player.username,
+                                room.black_player.username, result)
         print(f"🏁 Game over in room {room.room_id}: {result}")
+        
+        tournament = self.tournaments.on_game_over(room, result)
+        if tournament:
+            # Round complete: next round, or final standings
+            if tournament.status == TOURNAMENT_FINISHED:
+                self.broadcast_tournament(tournament)
+                print(f"🏆 Tournament {tournament.tournament_id} finished")
+            else:
+                self.start_tournament_round(tournament)
     
     def shutdown(self):
         """Shutdown server"""
@@ -410,11 +929,40 @@ class ChessServer:
         self.running = False
         if self.server_socket:
             self.server_socket.close()
+        if self.recorder:
+            self.recorder.close()
+            print(f"🎥 Captured {self.recorder.messages} messages")
+            self.recorder = None
+        if self.traces.traces:
+            print("\n".join(self.traces.report()))
+        if self.player_store:
+            if self.ratings.pending:
+                # Close the period early rather than lose its results
+                self.run_rating_period()
+            if self.player_store.close():
+                print(f"💾 Saved players ({self.player_store.rows_written} rows written)")
+            self.player_store = None
 
 
 def main():
     """Main entry point"""
-    server = ChessServer()
+    parser = argparse.ArgumentParser(description="Chess Online server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--capture", metavar="FILE",
+                        help="Record inbound traffic to FILE (.gz to compress)")
+    parser.add_argument("--metrics-port", type=int, nargs='?', const=METRICS_PORT,
+                        help=f"Serve metrics on {METRICS_HOST} (default port {METRICS_PORT})")
+    parser.add_argument("--player-db", default=PLAYER_DB_PATH,
+                        help="sqlite file for ratings and stats (empty string to disable)")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR,
+                        help="Directory for admin profiles and allocation snapshots")
+    args = parser.parse_args()
+    
+    # Read from the environment so the token stays out of the process list
+    admin_token = os.environ.get(ADMIN_TOKEN_ENV) or None
+    server = ChessServer(args.host, args.port, args.capture, args.metrics_port,
+                         admin_token, args.profile_dir, args.player_db or None)
     try:
         server.start()
     except KeyboardInterrupt:
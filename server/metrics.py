@@ -0,0 +1,180 @@
+"""
+Server metrics - Runtime statistics in the Prometheus text format
+Served over a local HTTP endpoint from a background thread
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import constants
+from common.constants import METRICS_HOST, METRICS_PORT
+
+# Handler latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Message types reported by name; anything else is counted as "other"
+KNOWN_TYPES = frozenset(
+    value for name, value in vars(constants).items() if name.startswith('MSG_')
+) | {"GET_LEGAL_MOVES", "LEGAL_MOVES"}
+
+
+def _label(msg_type) -> str:
+    """Keep label values bounded whatever clients send"""
+    return msg_type if isinstance(msg_type, str) and msg_type in KNOWN_TYPES else "other"
+
+
+def escape_label(value) -> str:
+    """Quote-safe label value for the text format"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Cumulative latency histogram"""
+    
+    __slots__ = ('counts', 'total', 'count')
+    
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class ServerMetrics:
+    """Thread-safe counters, gauges and histograms for ChessServer"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.connections = 0
+        self.connections_total = 0
+        self.sends_in_flight = 0
+        self.received: Dict[str, int] = {}
+        self.sent: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.handlers: Dict[str, Histogram] = {}
+        self.collectors: List[Callable[[], List[str]]] = []
+    
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+            self.connections_total += 1
+    
+    def connection_closed(self):
+        with self._lock:
+            self.connections -= 1
+    
+    def message_handled(self, msg_type: str, elapsed: float):
+        """Count an inbound message and record its handler latency"""
+        label = _label(msg_type)
+        with self._lock:
+            self.received[label] = self.received.get(label, 0) + 1
+            histogram = self.handlers.get(label)
+            if histogram is None:
+                histogram = self.handlers[label] = Histogram()
+            histogram.observe(elapsed)
+    
+    def send_started(self):
+        with self._lock:
+            self.sends_in_flight += 1
+    
+    def send_finished(self, msg_type: str, size: int):
+        label = _label(msg_type)
+        with self._lock:
+            self.sends_in_flight -= 1
+            self.sent[label] = self.sent.get(label, 0) + 1
+            self.bytes_sent += size
+    
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Register a function returning extra exposition lines at scrape time"""
+        self.collectors.append(collector)
+    
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                "# HELP chess_uptime_seconds Seconds since the server started",
+                "# TYPE chess_uptime_seconds gauge",
+                f"chess_uptime_seconds {time.time() - self.started:.3f}",
+                "# HELP chess_connections Open client connections",
+                "# TYPE chess_connections gauge",
+                f"chess_connections {self.connections}",
+                "# HELP chess_connections_total Client connections accepted",
+                "# TYPE chess_connections_total counter",
+                f"chess_connections_total {self.connections_total}",
+                "# HELP chess_outbound_sends_in_flight Sends blocked writing to a client socket",
+                "# TYPE chess_outbound_sends_in_flight gauge",
+                f"chess_outbound_sends_in_flight {self.sends_in_flight}",
+                "# HELP chess_outbound_bytes_total Bytes sent to clients",
+                "# TYPE chess_outbound_bytes_total counter",
+                f"chess_outbound_bytes_total {self.bytes_sent}",
+                "# HELP chess_messages_received_total Inbound messages by type",
+                "# TYPE chess_messages_received_total counter",
+            ]
+            for label, value in sorted(self.received.items()):
+                lines.append(f'chess_messages_received_total{{type="{label}"}} {value}')
+            lines += [
+                "# HELP chess_messages_sent_total Outbound messages by type",
+                "# TYPE chess_messages_sent_total counter",
+            ]
+            for label, value in sorted(self.sent.items()):
+                lines.append(f'chess_messages_sent_total{{type="{label}"}} {value}')
+            lines += [
+                "# HELP chess_handler_seconds Handler latency by message type",
+                "# TYPE chess_handler_seconds histogram",
+            ]
+            for label, histogram in sorted(self.handlers.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'chess_handler_seconds_bucket{{type="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'chess_handler_seconds_bucket{{type="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'chess_handler_seconds_sum{{type="{label}"}} {histogram.total:.6f}')
+                lines.append(f'chess_handler_seconds_count{{type="{label}"}} {histogram.count}')
+            collectors = list(self.collectors)
+        
+        # Collectors take their own locks, so call them outside ours
+        for collector in collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics"""
+    
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Keep scrapes out of the server log
+        pass
+
+
+def start_metrics_server(metrics: ServerMetrics, host: str = METRICS_HOST,
+                         port: int = METRICS_PORT) -> ThreadingHTTPServer:
+    """Serve metrics over HTTP from a daemon thread"""
+    httpd = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    httpd.daemon_threads = True
+    httpd.metrics = metrics
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
@@ -0,0 +1,303 @@
+"""
+Player store - Ratings and game statistics in a local sqlite database
+All players are held in memory so logins never wait on disk; changes are
+written behind in batches by a single writer thread
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.constants import (DEFAULT_RATING, DEFAULT_RD, DEFAULT_VOLATILITY,
+                              PLAYER_FLUSH_INTERVAL, PLAYER_FLUSH_BATCH,
+                              RESULT_WHITE_WIN, RESULT_BLACK_WIN, RESULT_DRAW)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    username TEXT PRIMARY KEY,
+    rating REAL NOT NULL,
+    rd REAL NOT NULL DEFAULT 350,
+    volatility REAL NOT NULL DEFAULT 0.06,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    last_seen REAL NOT NULL
+)
+"""
+
+# Backoff between attempts at a batch the database refused
+WRITE_RETRY_DELAY = 0.1
+WRITE_RETRY_MAX_DELAY = 5.0
+CLOSE_WRITE_ATTEMPTS = 5  # Attempts at a failing batch once the store is closing
+
+UPSERT = """
+INSERT INTO players (username, rating, rd, volatility, games, wins, losses, draws, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(username) DO UPDATE SET
+    rating = excluded.rating,
+    rd = excluded.rd,
+    volatility = excluded.volatility,
+    games = excluded.games,
+    wins = excluded.wins,
+    losses = excluded.losses,
+    draws = excluded.draws,
+    last_seen = excluded.last_seen
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(SCHEMA)
+    # Databases from before Glicko-2 ratings lack the deviation columns
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(players)")}
+    for column, default in (("rd", DEFAULT_RD), ("volatility", DEFAULT_VOLATILITY)):
+        if column not in columns:
+            connection.execute(
+                f"ALTER TABLE players ADD COLUMN {column} REAL NOT NULL DEFAULT {default}")
+    return connection
+
+
+class PlayerRecord:
+    """Persistent state of one registered player"""
+    
+    __slots__ = ('username', 'rating', 'rd', 'volatility', 'games', 'wins', 'losses',
+                 'draws', 'last_seen')
+    
+    def __init__(self, username: str, rating: float = DEFAULT_RATING, rd: float = DEFAULT_RD,
+                 volatility: float = DEFAULT_VOLATILITY, games: int = 0, wins: int = 0,
+                 losses: int = 0, draws: int = 0, last_seen: float = 0.0):
+        self.username = username
+        self.rating = rating
+        self.rd = rd
+        self.volatility = volatility
+        self.games = games
+        self.wins = wins
+        self.losses = losses
+        self.draws = draws
+        self.last_seen = last_seen
+    
+    def row(self) -> tuple:
+        """Column values in UPSERT order"""
+        return (self.username, self.rating, self.rd, self.volatility, self.games,
+                self.wins, self.losses, self.draws, self.last_seen)
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary"""
+        return {
+            "rating": round(self.rating),
+            "rd": round(self.rd),
+            "games": self.games,
+            "wins": self.wins,
+            "losses": self.losses,
+            "draws": self.draws,
+        }
+    
+    def __repr__(self):
+        return f"PlayerRecord({self.username}, {self.rating:.0f})"
+
+
+class PlayerStore:
+    """
+    In-memory player table with write-behind persistence
+    
+    Every record is loaded at startup, so lookups are dictionary reads.
+    Changed records are marked dirty and a writer thread upserts them in
+    one transaction every flush_interval seconds, or sooner once
+    batch_size records are waiting. The writer thread owns the only
+    connection that writes to the database.
+    """
+    
+    def __init__(self, path: str, flush_interval: float = PLAYER_FLUSH_INTERVAL,
+                 batch_size: int = PLAYER_FLUSH_BATCH):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.records: Dict[str, PlayerRecord] = {}
+        self.flushes = 0
+        self.rows_written = 0
+        self._batches_taken = 0
+        self._batches_written = 0
+        self._dirty: Dict[str, PlayerRecord] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._flushed = threading.Condition(self._lock)
+        self._running = True
+        
+        connection = _connect(path)
+        try:
+            for row in connection.execute(
+                    "SELECT username, rating, rd, volatility, games, wins, losses, draws, "
+                    "last_seen FROM players"):
+                self.records[row[0]] = PlayerRecord(*row)
+        finally:
+            connection.close()
+        
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+    
+    def get(self, username: str) -> Optional[PlayerRecord]:
+        """Get a registered player, or None"""
+        return self.records.get(username)
+    
+    def login(self, username: str) -> PlayerRecord:
+        """Get a player's record, registering them on first login"""
+        with self._lock:
+            record = self.records.get(username)
+            if record is None:
+                record = self.records[username] = PlayerRecord(username)
+            record.last_seen = time.time()
+            self._mark_dirty(record)
+            return record
+    
+    def record_game(self, white: str, black: str, result: str):
+        """
+        Count a finished game for both players
+        
+        Args:
+            white: White player's username
+            black: Black player's username
+            result: RESULT_WHITE_WIN, RESULT_BLACK_WIN or RESULT_DRAW
+        """
+        with self._lock:
+            for username, won, lost in ((white, RESULT_WHITE_WIN, RESULT_BLACK_WIN),
+                                        (black, RESULT_BLACK_WIN, RESULT_WHITE_WIN)):
+                record = self.records.get(username)
+                if record is None:
+                    record = self.records[username] = PlayerRecord(username)
+                record.games += 1
+                if result == won:
+                    record.wins += 1
+                elif result == lost:
+                    record.losses += 1
+                elif result == RESULT_DRAW:
+                    record.draws += 1
+                self._mark_dirty(record)
+    
+    def snapshot_ratings(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """Get usernames with their ratings, deviations and volatilities"""
+        with self._lock:
+            records = list(self.records.values())
+        count = len(records)
+        return (
+            [record.username for record in records],
+            np.fromiter((record.rating for record in records), np.float64, count),
+            np.fromiter((record.rd for record in records), np.float64, count),
+            np.fromiter((record.volatility for record in records), np.float64, count),
+        )
+    
+    def apply_ratings(self, names: List[str], ratings: np.ndarray, rds: np.ndarray,
+                      volatilities: np.ndarray):
+        """Store the result of a rating period, in snapshot_ratings order"""
+        rows = zip(names, ratings.tolist(), rds.tolist(), volatilities.tolist())
+        with self._lock:
+            for username, rating, rd, volatility in rows:
+                record = self.records[username]
+                if (record.rating, record.rd, record.volatility) != (rating, rd, volatility):
+                    record.rating, record.rd, record.volatility = rating, rd, volatility
+                    self._dirty[username] = record
+            if len(self._dirty) >= self.batch_size:
+                self._wake.notify()
+    
+    def _mark_dirty(self, record: PlayerRecord):
+        self._dirty[record.username] = record
+        if len(self._dirty) >= self.batch_size:
+            self._wake.notify()
+    
+    def _take_batch(self) -> List[tuple]:
+        """Snapshot dirty rows; caller holds the lock"""
+        rows = [record.row() for record in self._dirty.values()]
+        if rows:
+            self._dirty.clear()
+            self._batches_taken += 1
+        return rows
+    
+    def _requeue(self, rows: List[tuple]):
+        """Mark the players of a failed batch dirty again; caller holds the lock"""
+        for row in rows:
+            # Anyone changed since the snapshot is already queued with newer values
+            if row[0] not in self._dirty:
+                self._dirty[row[0]] = self.records[row[0]]
+    
+    def _write_loop(self):
+        connection = _connect(self.path)
+        failures = 0
+        try:
+            while True:
+                with self._lock:
+                    if self._running and not failures and len(self._dirty) < self.batch_size:
+                        self._wake.wait(self.flush_interval)
+                    rows = self._take_batch()
+                    batch = self._batches_taken
+                    running = self._running
+                written = not rows or self._write(connection, rows)
+                with self._lock:
+                    if written:
+                        failures = 0
+                        self._batches_written = batch
+                    else:
+                        failures += 1
+                        self._requeue(rows)
+                    self._flushed.notify_all()
+                if written:
+                    if not running:
+                        break
+                elif not running and failures >= CLOSE_WRITE_ATTEMPTS:
+                    print(f"❌ Player store closed with {len(rows)} players unsaved")
+                    break
+                else:
+                    time.sleep(min(WRITE_RETRY_DELAY * 2 ** (failures - 1), WRITE_RETRY_MAX_DELAY))
+        finally:
+            connection.close()
+    
+    def _write(self, connection: sqlite3.Connection, rows: Iterable[tuple]) -> bool:
+        try:
+            with connection:
+                cursor = connection.executemany(UPSERT, rows)
+        except sqlite3.Error as e:
+            print(f"❌ Player store write failed: {e}")
+            return False
+        self.flushes += 1
+        self.rows_written += cursor.rowcount
+        return True
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything changed so far has been written
+        
+        Args:
+            timeout: Seconds to wait at most, or None to wait until written
+        
+        Returns:
+            True if written; False on timeout or if the writer gave up
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            # Pending rows become the next batch; a batch may also be in flight.
+            # A failed batch is queued again and only counts once it is written.
+            target = self._batches_taken + (1 if self._dirty else 0)
+            self._wake.notify()
+            while self._batches_written < target and self._writer.is_alive():
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                self._flushed.wait(0.1)
+            return self._batches_written >= target
+    
+    def close(self) -> bool:
+        """
+        Write pending changes and stop the writer thread
+        
+        Returns:
+            False if some changes could not be written
+        """
+        with self._lock:
+            self._running = False
+            self._wake.notify()
+        self._writer.join()
+        return not self._dirty
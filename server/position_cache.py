@@ -0,0 +1,120 @@
+"""
+Process-wide position cache
+Shares legal moves and derived state between games by Zobrist key
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import chess
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.constants import POSITION_CACHE_SIZE
+
+
+class PositionInfo:
+    """Derived state of a position, independent of move counters"""
+    
+    __slots__ = ('legal_moves', 'moves_from', 'is_check', 'is_checkmate',
+                 'is_stalemate', 'insufficient_material')
+    
+    def __init__(self, board: chess.Board):
+        moves_from: Dict[int, list] = {}
+        legal_moves = set()
+        for move in board.legal_moves:
+            legal_moves.add(move.from_square | (move.to_square << 6) |
+                            ((move.promotion or 0) << 12))
+            targets = moves_from.setdefault(move.from_square, [])
+            name = chess.square_name(move.to_square)
+            # Promotions share a destination square
+            if name not in targets:
+                targets.append(name)
+        
+        self.legal_moves = frozenset(legal_moves)  # Encoded as in encode_move
+        self.moves_from: Dict[int, Tuple[str, ...]] = {
+            square: tuple(targets) for square, targets in moves_from.items()
+        }
+        self.is_check = board.is_check()
+        self.is_checkmate = self.is_check and not legal_moves
+        self.is_stalemate = not self.is_check and not legal_moves
+        self.insufficient_material = board.is_insufficient_material()
+
+
+class PositionCache:
+    """Bounded LRU cache of PositionInfo keyed by Zobrist key"""
+    
+    def __init__(self, max_size: int = POSITION_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, PositionInfo]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def lookup(self, key: int, board: chess.Board) -> PositionInfo:
+        """
+        Get derived state for a position, computing it on a miss
+        
+        Args:
+            key: Zobrist key of the position
+            board: Board holding the position (used only on a miss)
+        """
+        with self._lock:
+            info = self._entries.get(key)
+            if info is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return info
+            self.misses += 1
+        
+        # Compute outside the lock; a racing duplicate is harmless
+        info = PositionInfo(board)
+        with self._lock:
+            self._entries[key] = info
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return info
+    
+    def get(self, key: int) -> Optional[PositionInfo]:
+        """
+        Peek at cached state without computing it
+        
+        Not counted in hits or misses: callers peek before a lookup(), and
+        counting both would count one position twice.
+        """
+        with self._lock:
+            return self._entries.get(key)
+    
+    def clear(self):
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def stats(self) -> dict:
+        """Get cache size and hit rate counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Global position cache instance
+_position_cache = None
+
+def get_position_cache() -> PositionCache:
+    """Get global position cache instance"""
+    global _position_cache
+    if _position_cache is None:
+        _position_cache = PositionCache()
+    return _position_cache
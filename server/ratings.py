@@ -0,0 +1,162 @@
+"""
+Rating engine - Glicko-2 ratings updated in batched rating periods
+Results are collected as games end; each period rates every player at
+once with NumPy instead of one player at a time
+"""
+
+import threading
+from typing import Dict, List, Tuple
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.constants import DEFAULT_RD, GLICKO_TAU, RESULT_WHITE_WIN, RESULT_BLACK_WIN
+
+GLICKO_CENTER = 1500.0  # Rating that maps to 0 on the Glicko-2 scale
+GLICKO_SCALE = 173.7178  # Glicko to Glicko-2 scale factor
+CONVERGENCE = 1e-6  # Volatility iteration tolerance
+MAX_ITERATIONS = 100
+
+# Score for white by result; black scores 1 - this
+WHITE_SCORE = {RESULT_WHITE_WIN: 1.0, RESULT_BLACK_WIN: 0.0}
+
+
+def rate_period(ratings: np.ndarray, rds: np.ndarray, volatilities: np.ndarray,
+                white: np.ndarray, black: np.ndarray, white_scores: np.ndarray,
+                tau: float = GLICKO_TAU) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Rate one period for all players (Glickman, "Example of the Glicko-2 system")
+    
+    Args:
+        ratings, rds, volatilities: Per-player state before the period
+        white, black: Player index of each side, one entry per game
+        white_scores: White's score per game (1, 0.5 or 0)
+        tau: System constant limiting volatility change
+    
+    Returns:
+        (ratings, rds, volatilities) after the period. Players without
+        games keep their rating and their deviation grows.
+    """
+    n = len(ratings)
+    mu = (ratings - GLICKO_CENTER) / GLICKO_SCALE
+    phi = rds / GLICKO_SCALE
+    sigma = volatilities
+    
+    # Each game is two observations, one from each player's side
+    player = np.concatenate((white, black))
+    opponent = np.concatenate((black, white))
+    score = np.concatenate((white_scores, 1.0 - white_scores))
+    
+    g = 1.0 / np.sqrt(1.0 + 3.0 * phi[opponent] ** 2 / np.pi ** 2)
+    expected = 1.0 / (1.0 + np.exp(-g * (mu[player] - mu[opponent])))
+    information = np.bincount(player, g * g * expected * (1.0 - expected), minlength=n)
+    improvement = np.bincount(player, g * (score - expected), minlength=n)
+    
+    rated = information > 0
+    v = np.zeros(n)
+    v[rated] = 1.0 / information[rated]
+    delta = v * improvement
+    
+    new_sigma = sigma.copy()
+    if rated.any():
+        new_sigma[rated] = _volatility(delta[rated], phi[rated], v[rated], sigma[rated], tau)
+    
+    phi_star = np.sqrt(phi ** 2 + new_sigma ** 2)
+    new_phi = phi_star.copy()
+    new_phi[rated] = 1.0 / np.sqrt(1.0 / phi_star[rated] ** 2 + information[rated])
+    new_mu = mu + new_phi ** 2 * improvement
+    
+    new_rds = np.minimum(new_phi * GLICKO_SCALE, DEFAULT_RD)
+    return new_mu * GLICKO_SCALE + GLICKO_CENTER, new_rds, new_sigma
+
+
+def _volatility(delta: np.ndarray, phi: np.ndarray, v: np.ndarray, sigma: np.ndarray,
+                tau: float) -> np.ndarray:
+    """New volatility by the Illinois algorithm, all players in lockstep"""
+    a = np.log(sigma ** 2)
+    delta2, phi2 = delta ** 2, phi ** 2
+    
+    def f(x, d2=delta2, p2=phi2, vv=v, aa=a):
+        ex = np.exp(x)
+        return ex * (d2 - p2 - vv - ex) / (2.0 * (p2 + vv + ex) ** 2) - (x - aa) / tau ** 2
+    
+    # Bracket the root between A = a and B
+    big_a = a.copy()
+    big_b = np.empty_like(a)
+    large = delta2 > phi2 + v
+    big_b[large] = np.log(delta2[large] - phi2[large] - v[large])
+    small = np.flatnonzero(~large)
+    k = np.ones(len(small))
+    while len(small):
+        below = f(a[small] - k * tau, delta2[small], phi2[small], v[small], a[small]) < 0
+        if not below.any():
+            break
+        k[below] += 1
+    big_b[small] = a[small] - k * tau
+    
+    f_a, f_b = f(big_a), f(big_b)
+    for _ in range(MAX_ITERATIONS):
+        active = np.abs(big_b - big_a) > CONVERGENCE
+        if not active.any():
+            break
+        big_c = big_a + (big_a - big_b) * f_a / (f_b - f_a)
+        f_c = f(big_c)
+        # Where the root lies between B and C, A takes B; otherwise halve f(A)
+        swap = f_c * f_b <= 0
+        big_a = np.where(active, np.where(swap, big_b, big_a), big_a)
+        f_a = np.where(active, np.where(swap, f_b, f_a / 2.0), f_a)
+        big_b = np.where(active, big_c, big_b)
+        f_b = np.where(active, f_c, f_b)
+    return np.exp(big_a / 2.0)
+
+
+class RatingEngine:
+    """
+    Collects results and rates them a period at a time
+    
+    Player state lives in the PlayerStore; a period reads a snapshot of
+    every player, rates them in one vectorized pass and writes the new
+    ratings back, to be persisted by the store's writer.
+    """
+    
+    def __init__(self, store, tau: float = GLICKO_TAU):
+        self.store = store
+        self.tau = tau
+        self.periods = 0
+        self._games: List[Tuple[str, str, float]] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def pending(self) -> int:
+        """Games waiting for the next period"""
+        return len(self._games)
+    
+    def record(self, white: str, black: str, result: str):
+        """Add a finished game to the current period"""
+        with self._lock:
+            self._games.append((white, black, WHITE_SCORE.get(result, 0.5)))
+    
+    def run_period(self) -> Dict[str, float]:
+        """
+        Close the current period and rate it
+        
+        Returns:
+            New rating by username for players who played this period
+        """
+        with self._lock:
+            games, self._games = self._games, []
+        
+        names, ratings, rds, volatilities = self.store.snapshot_ratings()
+        index = {name: i for i, name in enumerate(names)}
+        games = [game for game in games if game[0] in index and game[1] in index]
+        white = np.fromiter((index[game[0]] for game in games), dtype=np.int64, count=len(games))
+        black = np.fromiter((index[game[1]] for game in games), dtype=np.int64, count=len(games))
+        scores = np.fromiter((game[2] for game in games), dtype=np.float64, count=len(games))
+        
+        ratings, rds, volatilities = rate_period(ratings, rds, volatilities,
+                                                 white, black, scores, self.tau)
+        self.store.apply_ratings(names, ratings, rds, volatilities)
+        self.periods += 1
+        
+        played = np.union1d(white, black)
+        return {names[i]: float(ratings[i]) for i in played}
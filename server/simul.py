@@ -0,0 +1,188 @@
+"""
+Simultaneous exhibitions - One host seated at many boards
+The host plays white in a room per opponent; updates bound for the host
+are queued per board and flushed as one coalesced SIMUL_UPDATE stream
+"""
+
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.constants import *
+from common.protocol import create_message
+from game_manager import GameManager, Player, Room
+
+# Only the latest of these per board matters to the host
+COALESCED_TYPES = frozenset((MSG_MOVE_UPDATE,))
+
+
+class Simul:
+    """One host's exhibition: its boards and the updates waiting for the host"""
+    
+    def __init__(self, simul_id: str, name: str, host: Player, max_boards: int):
+        self.simul_id = simul_id
+        self.name = name
+        self.host = host
+        self.max_boards = max_boards
+        self.boards: Dict[str, Room] = {}  # room_id -> room
+        self.open = True
+        # Queued host updates in arrival order; coalesced entries are
+        # replaced in place so each board keeps its position in the stream
+        self._queue: List[dict] = []
+        self._slots: Dict[tuple, int] = {}  # (room_id, type) -> queue index
+        self.queued = 0
+        self.sent = 0
+    
+    def queue(self, room_id: str, msg_type: str, data: dict):
+        """Queue an update for the host"""
+        entry = {"room_id": room_id, "type": msg_type, "data": data}
+        self.queued += 1
+        if msg_type in COALESCED_TYPES:
+            slot = self._slots.get((room_id, msg_type))
+            if slot is not None:
+                self._queue[slot] = entry
+                return
+            self._slots[(room_id, msg_type)] = len(self._queue)
+        self._queue.append(entry)
+    
+    def drain(self) -> List[dict]:
+        """Take every queued update"""
+        updates, self._queue = self._queue, []
+        self._slots.clear()
+        self.sent += len(updates)
+        return updates
+    
+    def to_dict(self) -> dict:
+        """Convert to dictionary"""
+        return {
+            "simul_id": self.simul_id,
+            "name": self.name,
+            "host": self.host.username,
+            "boards": len(self.boards),
+            "max_boards": self.max_boards,
+            "open": self.open,
+            "playing": sum(1 for room in self.boards.values() if room.status == STATUS_PLAYING),
+        }
+
+
+class SimulManager:
+    """
+    Seats simul hosts in many rooms and multiplexes their updates
+    
+    Host rooms are added to GameManager directly so the host's own
+    room_id stays free; handlers find the room from the message instead.
+    """
+    
+    def __init__(self, game_manager: GameManager, send: Callable,
+                 flush_interval: float = SIMUL_FLUSH_INTERVAL):
+        self.game_manager = game_manager
+        self.send = send  # send_encoded(socket, msg_type, message)
+        self.flush_interval = flush_interval
+        self.simuls: Dict[str, Simul] = {}
+        self.hosts: Dict[str, Simul] = {}  # host username -> simul
+        self.rooms: Dict[str, Simul] = {}  # room_id -> simul
+        self._lock = threading.Lock()
+    
+    def create(self, host: Player, name: str, max_boards: int) -> Optional[Simul]:
+        """Open a simul for opponents to join, or None if the host already has one"""
+        with self._lock:
+            if host.username in self.hosts:
+                return None
+            simul = Simul(str(uuid.uuid4())[:8], name, host, max_boards)
+            self.simuls[simul.simul_id] = simul
+            self.hosts[host.username] = simul
+            return simul
+    
+    def get(self, simul_id: str) -> Optional[Simul]:
+        """Get simul by ID"""
+        return self.simuls.get(simul_id)
+    
+    def add_board(self, simul: Simul, opponent: Player) -> Optional[Room]:
+        """Seat an opponent against the host in a new room and start the game"""
+        with self._lock:
+            if not simul.open or len(simul.boards) >= simul.max_boards:
+                return None
+            room_id = str(uuid.uuid4())[:8]
+            room = Room(room_id, f"{simul.name} #{len(simul.boards) + 1}", simul.host)
+            self.game_manager.rooms[room_id] = room
+            self.game_manager.join_room(room_id, opponent)
+            # start_game sets player colors; the host's belongs to their own room
+            color = simul.host.color
+            room.start_game()
+            simul.host.color = color
+            simul.boards[room_id] = room
+            self.rooms[room_id] = simul
+            return room
+    
+    def host_room(self, player: Player, room_id: str) -> Optional[Room]:
+        """The board a host addressed, if player hosts it"""
+        simul = self.rooms.get(room_id)
+        if simul is None or simul.host is not player:
+            return None
+        return simul.boards.get(room_id)
+    
+    def is_board(self, room: Room) -> bool:
+        """Check whether a room is a board of an open simul"""
+        return room.room_id in self.rooms
+    
+    def queue(self, room: Room, recipient: Player, msg_type: str, data: dict) -> bool:
+        """
+        Queue an update if recipient is the simul host of room
+        
+        Returns:
+            True if queued for the host stream, False to send it directly
+        """
+        simul = self.rooms.get(room.room_id)
+        if simul is None or simul.host is not recipient:
+            return False
+        with self._lock:
+            simul.queue(room.room_id, msg_type, data)
+        return True
+    
+    def flush(self) -> int:
+        """
+        Send each host its queued updates as one SIMUL_UPDATE
+        
+        Returns:
+            Number of updates sent
+        """
+        with self._lock:
+            batches = [(simul, simul.drain()) for simul in self.hosts.values()]
+        sent = 0
+        for simul, updates in batches:
+            if not updates:
+                continue
+            message = create_message(MSG_SIMUL_UPDATE, {
+                "simul_id": simul.simul_id, "updates": updates}).encode('utf-8')
+            try:
+                self.send(simul.host.socket, MSG_SIMUL_UPDATE, message)
+            except OSError:
+                continue
+            sent += len(updates)
+        return sent
+    
+    def flush_periodically(self, running: Callable[[], bool]):
+        """Flush host streams every flush_interval while running() is true"""
+        while running():
+            time.sleep(self.flush_interval)
+            self.flush()
+    
+    def close(self, host: Player) -> List[Room]:
+        """
+        End a host's simul
+        
+        Returns:
+            Boards still being played, for the caller to finish
+        """
+        with self._lock:
+            simul = self.hosts.pop(host.username, None)
+            if simul is None:
+                return []
+            simul.open = False
+            self.simuls.pop(simul.simul_id, None)
+            for room_id in simul.boards:
+                self.rooms.pop(room_id, None)
+            return [room for room in simul.boards.values() if room.status == STATUS_PLAYING]
@@ -0,0 +1,317 @@
+"""
+Swiss tournaments - Pairing, rounds and standings on top of GameManager
+Each round pairs players within score groups, opens every room at once
+and folds results into standings and tie-breaks as games finish
+"""
+
+import itertools
+import threading
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.constants import *
+from game_manager import GameManager, Player, Room
+
+TOURNAMENT_REGISTERING = "registering"
+TOURNAMENT_RUNNING = "running"
+TOURNAMENT_FINISHED = "finished"
+
+BYE_SCORE = 1.0
+WHITE_SCORE = {RESULT_WHITE_WIN: 1.0, RESULT_BLACK_WIN: 0.0, RESULT_DRAW: 0.5}
+
+
+class Standing:
+    """One player's score and tie-breaks, kept current as results arrive"""
+    
+    __slots__ = ('username', 'rating', 'score', 'buchholz', 'sonneborn_berger', 'wins',
+                 'games', 'opponents', 'color_balance', 'last_color', 'had_bye')
+    
+    def __init__(self, username: str, rating: float):
+        self.username = username
+        self.rating = rating
+        self.score = 0.0
+        self.buchholz = 0.0  # Sum of opponents' scores
+        self.sonneborn_berger = 0.0  # Opponents' scores weighted by our result
+        self.wins = 0
+        self.games: List[Tuple["Standing", float]] = []  # (opponent, our score)
+        self.opponents: Set[str] = set()  # Paired against, finished or not
+        self.color_balance = 0  # Whites minus blacks
+        self.last_color: Optional[str] = None
+        self.had_bye = False
+    
+    def sort_key(self) -> tuple:
+        """Standings order: score, then Buchholz, Sonneborn-Berger, wins"""
+        return (-self.score, -self.buchholz, -self.sonneborn_berger, -self.wins, self.username)
+    
+    def add_score(self, points: float):
+        """Add points, updating tie-breaks of everyone we have played"""
+        if not points:
+            return
+        self.score += points
+        for opponent, result in self.games:
+            opponent.buchholz += points
+            opponent.sonneborn_berger += points * (1.0 - result)
+    
+    def to_dict(self, rank: int) -> dict:
+        """Convert to dictionary"""
+        return {
+            "rank": rank,
+            "username": self.username,
+            "score": self.score,
+            "buchholz": self.buchholz,
+            "sonneborn_berger": self.sonneborn_berger,
+            "wins": self.wins,
+            "games": len(self.games),
+        }
+
+
+def record_result(white: Standing, black: Standing, white_score: float):
+    """Fold one finished game into both players' standings"""
+    black_score = 1.0 - white_score
+    # Existing opponents' tie-breaks move with the new scores
+    white.add_score(white_score)
+    black.add_score(black_score)
+    for player, opponent, score in ((white, black, white_score), (black, white, black_score)):
+        player.games.append((opponent, score))
+        if score == 1.0:
+            player.wins += 1
+    # The new game adds each side's current score to the other's tie-breaks
+    white.buchholz += black.score
+    white.sonneborn_berger += black.score * white_score
+    black.buchholz += white.score
+    black.sonneborn_berger += white.score * black_score
+
+
+def _choose_colors(first: Standing, second: Standing) -> Tuple[Standing, Standing]:
+    """Give white to whoever is owed it, the higher ranked on a tie"""
+    if first.color_balance != second.color_balance:
+        return (first, second) if first.color_balance < second.color_balance else (second, first)
+    if first.last_color != second.last_color:
+        return (second, first) if first.last_color == COLOR_WHITE else (first, second)
+    return first, second
+
+
+def _pair_pool(pool: List[Standing], allow_rematch: bool = False
+               ) -> Tuple[List[Tuple[Standing, Standing]], List[Standing]]:
+    """
+    Pair a score group (with players floated down from above)
+    
+    The top half plays the bottom half in order, as in the Dutch system.
+    A player whose natural opponent was already played takes the next one
+    in the bottom half, then anyone else below; players left over float
+    down to the next group.
+    
+    Returns:
+        (pairs, unpaired players)
+    """
+    size = len(pool)
+    half = size // 2
+    taken = [False] * size
+    pairs = []
+    
+    def can_play(a: Standing, b: Standing) -> bool:
+        return allow_rematch or b.username not in a.opponents
+    
+    for i in range(size):
+        if taken[i]:
+            continue
+        player = pool[i]
+        if i < half:
+            # Natural opponent first, then the rest of the bottom half
+            order = itertools.chain(range(half + i, size), range(half, half + i), range(i + 1, half))
+        else:
+            order = range(i + 1, size)
+        for j in order:
+            if not taken[j] and can_play(player, pool[j]):
+                taken[i] = taken[j] = True
+                pairs.append((player, pool[j]))
+                break
+    return pairs, [pool[i] for i in range(size) if not taken[i]]
+
+
+def pair_round(standings: List[Standing]) -> Tuple[List[Tuple[Standing, Standing]], Optional[Standing]]:
+    """
+    Swiss pairings for the next round
+    
+    Returns:
+        ([(white, black), ...], player receiving the bye or None)
+    """
+    ordered = sorted(standings, key=lambda s: (-s.score, -s.rating, s.username))
+    bye = None
+    if len(ordered) % 2:
+        # Lowest-ranked player who has not had a bye sits out
+        bye = next((s for s in reversed(ordered) if not s.had_bye), ordered[-1])
+        ordered.remove(bye)
+    
+    # Score groups, highest first
+    groups: List[List[Standing]] = []
+    for standing in ordered:
+        if groups and groups[-1][0].score == standing.score:
+            groups[-1].append(standing)
+        else:
+            groups.append([standing])
+    
+    pairs = []
+    floaters: List[Standing] = []
+    for group in groups:
+        group_pairs, floaters = _pair_pool(floaters + group)
+        pairs += group_pairs
+    if floaters:
+        # Whoever is left at the bottom meets again rather than sit out
+        group_pairs, floaters = _pair_pool(floaters, allow_rematch=True)
+        pairs += group_pairs
+    
+    return [_choose_colors(a, b) for a, b in pairs], bye
+
+
+class Tournament:
+    """A Swiss tournament played in GameManager rooms"""
+    
+    def __init__(self, tournament_id: str, name: str, rounds: int, creator: str):
+        self.tournament_id = tournament_id
+        self.name = name
+        self.rounds = rounds
+        self.creator = creator
+        self.status = TOURNAMENT_REGISTERING
+        self.round = 0
+        self.standings: Dict[str, Standing] = {}
+        self.pending: Dict[str, Tuple[Standing, Standing]] = {}  # room_id -> (white, black)
+        self._ranked: Optional[List[Standing]] = None
+    
+    def register(self, player: Player) -> bool:
+        """Add a player before the first round"""
+        if self.status != TOURNAMENT_REGISTERING or player.username in self.standings:
+            return False
+        self.standings[player.username] = Standing(player.username, player.rating)
+        return True
+    
+    def ranked(self) -> List[Standing]:
+        """Standings in order, re-sorted only after results change"""
+        if self._ranked is None:
+            self._ranked = sorted(self.standings.values(), key=Standing.sort_key)
+        return self._ranked
+    
+    def record(self, room_id: str, result: str) -> bool:
+        """
+        Record the result of a round game
+        
+        Returns:
+            True if this was the last game of the round
+        """
+        pairing = self.pending.pop(room_id, None)
+        if pairing is None:
+            return False
+        white, black = pairing
+        record_result(white, black, WHITE_SCORE.get(result, 0.5))
+        self._ranked = None
+        return not self.pending
+    
+    def to_dict(self, top: int = 20) -> dict:
+        """Convert to dictionary"""
+        return {
+            "tournament_id": self.tournament_id,
+            "name": self.name,
+            "status": self.status,
+            "round": self.round,
+            "rounds": self.rounds,
+            "players": len(self.standings),
+            "standings": [s.to_dict(rank) for rank, s in enumerate(self.ranked()[:top], 1)],
+        }
+
+
+class TournamentManager:
+    """Runs tournaments and launches their rounds as batches of rooms"""
+    
+    def __init__(self, game_manager: GameManager):
+        self.game_manager = game_manager
+        self.tournaments: Dict[str, Tournament] = {}
+        self.rooms: Dict[str, Tournament] = {}  # room_id -> tournament
+        self._lock = threading.RLock()
+    
+    def create(self, name: str, rounds: int, creator: Player) -> Tournament:
+        """Open a tournament for registration"""
+        with self._lock:
+            tournament = Tournament(str(uuid.uuid4())[:8], name, rounds, creator.username)
+            self.tournaments[tournament.tournament_id] = tournament
+            return tournament
+    
+    def get(self, tournament_id: str) -> Optional[Tournament]:
+        """Get tournament by ID"""
+        return self.tournaments.get(tournament_id)
+    
+    def start_round(self, tournament: Tournament) -> List[Room]:
+        """
+        Pair the next round and open all of its rooms
+        
+        Players who are offline or busy in another game lose that round's
+        game by forfeit. Returns the rooms whose games have started.
+        """
+        with self._lock:
+            tournament.status = TOURNAMENT_RUNNING
+            tournament.round += 1
+            pairs, bye = pair_round(list(tournament.standings.values()))
+            if bye:
+                bye.had_bye = True
+                bye.add_score(BYE_SCORE)
+            
+            rooms = []
+            for white, black in pairs:
+                white.opponents.add(black.username)
+                black.opponents.add(white.username)
+                for standing, color in ((white, COLOR_WHITE), (black, COLOR_BLACK)):
+                    standing.color_balance += 1 if color == COLOR_WHITE else -1
+                    standing.last_color = color
+                
+                white_player = self._seat(white.username)
+                black_player = self._seat(black.username)
+                if white_player and black_player:
+                    room = self.game_manager.create_room(
+                        f"{tournament.name} R{tournament.round}", white_player)
+                    self.game_manager.join_room(room.room_id, black_player)
+                    room.start_game()
+                    tournament.pending[room.room_id] = (white, black)
+                    self.rooms[room.room_id] = tournament
+                    rooms.append(room)
+                elif white_player or black_player:
+                    # Forfeit: whoever showed up wins; if neither did, nobody scores
+                    record_result(white, black, 1.0 if white_player else 0.0)
+            tournament._ranked = None
+            if not tournament.pending:
+                self._finish_round(tournament)
+            return rooms
+    
+    def _seat(self, username: str) -> Optional[Player]:
+        """Free an online player for a round game, or None if unavailable"""
+        player = self.game_manager.get_player(username)
+        if player is None:
+            return None
+        if player.room_id:
+            room = self.game_manager.rooms.get(player.room_id)
+            if room and room.status == STATUS_PLAYING:
+                return None
+            self.game_manager.leave_room(player)
+        return player
+    
+    def is_round_game(self, room: Room) -> bool:
+        """Check whether a room holds a tournament game still to be scored"""
+        return room.room_id in self.rooms
+    
+    def on_game_over(self, room: Room, result: str) -> Optional[Tournament]:
+        """
+        Record a finished room if it belongs to a tournament
+        
+        Returns:
+            The tournament if its round just ended, else None
+        """
+        with self._lock:
+            tournament = self.rooms.pop(room.room_id, None)
+            if tournament is None or not tournament.record(room.room_id, result):
+                return None
+            self._finish_round(tournament)
+            return tournament
+    
+    def _finish_round(self, tournament: Tournament):
+        if tournament.round >= tournament.rounds:
+            tournament.status = TOURNAMENT_FINISHED
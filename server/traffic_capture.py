@@ -0,0 +1,107 @@
+"""
+Traffic capture - Records inbound messages for later replay
+Each line is a JSON array: [seconds since start, connection id, type, data]
+A null type marks a disconnect. A message that created a room, simul or
+tournament is followed by [seconds, connection id, type, null, created id]
+once its handler returns. Paths ending in .gz are gzip-compressed.
+"""
+
+import gzip
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Iterator, Optional
+
+CAPTURE_VERSION = 2
+FLUSH_INTERVAL = 1.0  # Seconds between flushes, so a killed server loses little
+
+
+def _open(path: str, mode: str):
+    """Open a capture file, compressed if it ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class TrafficRecorder:
+    """Thread-safe writer for a capture log"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.started = time.monotonic()
+        self.messages = 0
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._file = _open(path, 'w')
+        self._file.write(json.dumps({
+            "version": CAPTURE_VERSION,
+            "started": datetime.now().isoformat()
+        }) + "\n")
+    
+    def now(self) -> float:
+        """Seconds since the capture started"""
+        return time.monotonic() - self.started
+    
+    def record(self, received_at: float, conn_id: int, msg_type: Optional[str],
+               data: dict = None):
+        """
+        Write one inbound message, before it is handled
+        
+        Args:
+            received_at: Capture time from now() when the message arrived
+            conn_id: Connection the message came from
+            msg_type: Message type, or None for a disconnect
+            data: Message payload
+        """
+        self._write(received_at, [round(received_at, 4), conn_id, msg_type, data])
+    
+    def record_created(self, conn_id: int, msg_type: str, created_id: str):
+        """
+        Note the room, simul or tournament a handled message created, so
+        replays can map recorded ids to their own
+        """
+        at = self.now()
+        self._write(at, [round(at, 4), conn_id, msg_type, None, created_id])
+    
+    def _write(self, at: float, entry: list):
+        line = json.dumps(entry, separators=(',', ':')) + "\n"
+        with self._lock:
+            if self._file:
+                self._file.write(line)
+                self.messages += 1
+                if at - self._last_flush >= FLUSH_INTERVAL:
+                    self._file.flush()
+                    self._last_flush = at
+    
+    def close(self):
+        """Flush and close the log"""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path: str) -> Iterator[list]:
+    """
+    Read a capture log
+    
+    Yields:
+        [seconds, connection id, type, data, None] for a message or
+        disconnect, and [seconds, connection id, type, None, created id]
+        once a message created something
+    """
+    with _open(path, 'r') as f:
+        header = json.loads(f.readline())
+        version = header.get("version")
+        if version not in (1, CAPTURE_VERSION):
+            raise ValueError(f"Unsupported capture version: {version}")
+        for line in f:
+            entry = json.loads(line)
+            if len(entry) == 4:
+                entry.append(None)
+            elif version == 1:
+                # Version 1 put the created id on the message itself
+                yield entry[:4] + [None]
+                entry = entry[:3] + [None, entry[4]]
+            yield entry
@@ -7,6 +7,7 @@ import os
 
 # Add paths
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
 
 def test_imports():
     """Test all imports work"""
@@ -64,8 +65,8 @@ def test_chess_engine():
         assert engine.get_current_turn() == "white"
         print("✅ Initial turn is white")
         
-        # Test valid move
-        assert engine.make_move("e2", "e4") == True
+        # Test valid move (make_move returns (success, captured_piece))
+        assert engine.make_move("e2", "e4") == (True, None)
         print("✅ Valid move e2-e4 accepted")
         
         # Test turn switched
@@ -73,7 +74,10 @@ def test_chess_engine():
         print("✅ Turn switched to black")
         
         # Test invalid move
-        assert engine.make_move("e7", "e5") == True
+        assert engine.make_move("e7", "e4") == (False, None)
+        print("✅ Invalid move e7-e4 rejected")
+        
+        assert engine.make_move("e7", "e5") == (True, None)
         print("✅ Valid move e7-e5 accepted")
         
         # Test legal moves
@@ -92,7 +96,7 @@ def test_chess_engine():
         print(f"✅ Color at e4: {color}")
         
         return True
-        
+    
     except Exception as e:
         print(f"❌ Chess engine test failed: {e}")
         import traceback
@@ -100,6 +104,165 @@ def test_chess_engine():
         return False
 
 
+def test_packed_engine():
+    """Test packing an idle game and rebuilding it lazily"""
+    print("\n🧪 Testing packed engine...")
+    
+    try:
+        from server.chess_engine import ChessEngine
+        
+        engine = ChessEngine()
+        for from_sq, to_sq in [("e2", "e4"), ("d7", "d5"), ("e4", "d5"), ("d8", "d5")]:
+            engine.make_move(from_sq, to_sq)
+        engine.undo_move()
+        fen = engine.get_board_state()
+        key = engine.position_key()
+        
+        assert engine.pack()
+        assert engine.is_packed()
+        assert engine.position_key() == key
+        print("✅ Engine packed")
+        
+        assert engine.captured_by_white == ["p"]
+        assert not engine.is_packed()
+        assert engine.get_board_state() == fen
+        print("✅ Engine rebuilt on access")
+        
+        assert engine.redo_move()
+        assert engine.captured_by_black == ["P"]
+        assert not engine.redo_move()
+        print("✅ Undo/redo stacks restored")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Packed engine test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_position_keys():
+    """Test incremental Zobrist keys, shared cache and repetitions"""
+    print("\n🧪 Testing position keys...")
+    
+    try:
+        import chess
+        import chess.polyglot
+        from server.chess_engine import ChessEngine
+        from position_cache import get_position_cache
+        
+        engine = ChessEngine()
+        moves = [("e2", "e4"), ("a7", "a6"), ("e4", "e5"), ("d7", "d5"),
+                 ("e5", "d6"), ("g8", "f6"), ("g1", "f3"), ("b8", "c6"),
+                 ("f1", "e2"), ("c6", "b8"), ("e1", "g1")]
+        for from_sq, to_sq in moves:
+            assert engine.make_move(from_sq, to_sq)[0]
+            assert engine.position_key() == chess.polyglot.zobrist_hash(engine.board)
+        print("✅ Incremental keys match after en passant and castling")
+        
+        engine.undo_move()
+        assert engine.position_key() == chess.polyglot.zobrist_hash(engine.board)
+        print("✅ Keys restored on undo")
+        
+        cache = get_position_cache()
+        ChessEngine().get_legal_moves("g1")
+        hits = cache.hits
+        other = ChessEngine()
+        other.get_legal_moves("g1")
+        assert cache.hits > hits
+        print("✅ Position cache shared across games")
+        
+        # make_move only peeks at the cache, so it must not add to the counters
+        cache.clear()
+        for engine in (ChessEngine(), ChessEngine()):
+            engine.get_legal_moves("e2")
+            assert engine.make_move("e2", "e4")[0]
+            engine.is_check()
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+        print("✅ Hit ratio counts each lookup once")
+        
+        shuffle = [("g1", "f3"), ("g8", "f6"), ("f3", "g1"), ("f6", "g8")]
+        for from_sq, to_sq in shuffle * 2:
+            other.make_move(from_sq, to_sq)
+        assert other.repetition_count() == 3
+        assert other.is_repetition()
+        print("✅ Threefold repetition detected")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Position key test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_batch_replay():
+    """Test validating and applying move sequences in bulk"""
+    print("\n🧪 Testing batch replay...")
+    
+    try:
+        from server.chess_engine import ChessEngine, encode_move
+        import chess
+        
+        moves = ["e2e4", "d7d5", "e4d5", "d8d5", "b1c3"]
+        engine = ChessEngine()
+        applied, sans = engine.apply_moves(moves, with_san=True)
+        assert applied == 5
+        assert sans == ["e4", "d5", "exd5", "Qxd5", "Nc3"]
+        assert engine.captured_by_white == ["p"]
+        assert engine.captured_by_black == ["P"]
+        assert engine.get_move_history() == sans
+        print("✅ Sequence applied with captures and SAN")
+        
+        replayed, applied = ChessEngine.from_moves(
+            ["e2e4", "e7e5", "e1e3", "g1f3"])
+        assert applied == 2
+        assert replayed.get_current_turn() == "white"
+        print("✅ Replay stops at first illegal move")
+        
+        packed = [encode_move(chess.Move.from_uci(m)) for m in moves]
+        replayed, applied = ChessEngine.from_moves(packed)
+        assert applied == 5
+        assert replayed.get_board_state() == engine.get_board_state()
+        print("✅ Packed moves replayed")
+        
+        # Keys skipped during a bulk replay are filled in when needed
+        import chess.polyglot
+        shuffle = ["g8f6", "g1f3", "f6g8", "f3g1"] * 2
+        replayed, applied = ChessEngine.from_moves(moves + shuffle, trusted=True)
+        assert applied == 13
+        assert replayed.repetition_count() == 3
+        assert replayed.position_key() == chess.polyglot.zobrist_hash(replayed.board)
+        for _ in range(6):
+            replayed.undo_move()
+        assert replayed.position_key() == chess.polyglot.zobrist_hash(replayed.board)
+        assert replayed.make_move("f6", "g8")[0]
+        print("✅ Trusted replay keeps keys and repetitions right")
+        
+        # Castling written as king-takes-rook captures nothing
+        castle = ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6", "e1h1"]
+        engine = ChessEngine()
+        assert engine.apply_moves(castle)[0] == 7
+        assert engine.captured_by_white == [] and engine.get_piece_at("g1") == "K"
+        engine = ChessEngine()
+        engine.apply_moves(castle[:-1])
+        engine.get_legal_moves("e1")  # Cache the position first
+        assert engine.make_move("e1", "h1") == (True, None)
+        assert engine.captured_by_white == []
+        print("✅ King-takes-rook castling records no capture, cached or not")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Batch replay test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 def test_game_manager():
     """Test game manager functionality"""
     print("\n🧪 Testing game manager...")
@@ -134,8 +297,32 @@ def test_game_manager():
         assert len(rooms) == 1
         print(f"✅ Available rooms: {len(rooms)}")
         
-        return True
+        # The sweeper packs under the room lock, so play never sees a half-packed game
+        import threading
+        player2 = Player("TestPlayer2", mock_socket, ("127.0.0.1", 1235))
+        manager.join_room(room.room_id, player2)
+        room.start_game()
+        done = threading.Event()
+        
+        def sweep():
+            while not done.is_set():
+                room.pack_if_idle(0)
         
+        sweeper = threading.Thread(target=sweep)
+        sweeper.start()
+        try:
+            for _ in range(200):
+                with room.lock:
+                    assert room.game.make_move("g1", "f3")[0]
+                    assert room.game.get_board_state()
+                    assert room.game.undo_move()
+        finally:
+            done.set()
+            sweeper.join()
+        print("✅ Idle packing is safe alongside moves")
+        
+        return True
+    
     except Exception as e:
         print(f"❌ Game manager test failed: {e}")
         import traceback
@@ -143,12 +330,923 @@ def test_game_manager():
         return False
 
 
+def test_server_dispatch():
+    """Test server handlers through the in-process harness"""
+    print("\n🧪 Testing server dispatch...")
+    
+    try:
+        from benchmarks.server_harness import run
+        
+        report = run(games=2, plies=6, seed=1)
+        assert report["handlers"]["MOVE"]["count"] == 12
+        assert report["bytes_out"] > 0
+        print(f"✅ Simulated games: {report['moves_per_s']:.0f} moves/s")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Server dispatch test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_traffic_replay():
+    """Test capturing traffic and replaying it in-process"""
+    print("\n🧪 Testing traffic capture and replay...")
+    
+    try:
+        import tempfile
+        from traffic_capture import TrafficRecorder, read_capture
+        from benchmarks.replay_traffic import replay_in_process
+        
+        path = os.path.join(tempfile.mkdtemp(), "capture.jsonl.gz")
+        recorder = TrafficRecorder(path)
+        recorder.record(0.0, 1, "LOGIN", {"username": "alice"})
+        recorder.record(0.1, 1, "CREATE_ROOM", {"room_name": "r"})
+        recorder.record_created(1, "CREATE_ROOM", "oldroom1")
+        recorder.record(0.2, 2, "LOGIN", {"username": "bob"})
+        recorder.record(0.3, 2, "JOIN_ROOM", {"room_id": "oldroom1"})
+        recorder.record(0.4, 1, "MOVE", {"from": "e2", "to": "e4"})
+        recorder.record(0.5, 2, "MOVE", {"from": "e7", "to": "e5"})
+        recorder.record(0.6, 1, None)
+        recorder.close()
+        
+        entries = list(read_capture(path))
+        assert len(entries) == 8
+        assert entries[1][4] is None and entries[2][3:] == [None, "oldroom1"]
+        print("✅ Capture written and read back")
+        
+        report = replay_in_process(path, speed=0)
+        assert report["events"] == 6
+        assert report["errors_out"] == 0
+        print("✅ Capture replayed with room ids remapped")
+        
+        path = os.path.join(tempfile.mkdtemp(), "simul.jsonl")
+        recorder = TrafficRecorder(path)
+        recorder.record(0.0, 1, "LOGIN", {"username": "host"})
+        recorder.record(0.1, 1, "CREATE_SIMUL", {"boards": 2})
+        recorder.record_created(1, "CREATE_SIMUL", "oldsimul")
+        recorder.record(0.2, 2, "LOGIN", {"username": "guest"})
+        recorder.record(0.3, 2, "JOIN_SIMUL", {"simul_id": "oldsimul"})
+        recorder.record_created(2, "JOIN_SIMUL", "oldboard")
+        recorder.record(0.4, 1, "MOVE", {"from": "e2", "to": "e4", "room_id": "oldboard"})
+        recorder.record(0.5, 2, "MOVE", {"from": "e7", "to": "e5"})
+        recorder.record(0.6, 1, "CREATE_TOURNAMENT", {"name": "Cup", "rounds": 1})
+        recorder.record_created(1, "CREATE_TOURNAMENT", "oldcup")
+        recorder.record(0.7, 2, "JOIN_TOURNAMENT", {"tournament_id": "oldcup"})
+        recorder.record(0.8, 2, None)
+        recorder.close()
+        
+        report = replay_in_process(path, speed=0)
+        assert report["events"] == 8
+        assert report["errors_out"] == 0
+        print("✅ Simul, board and tournament ids remapped")
+        
+        # Version 1 logs kept the created id on the message itself
+        path = os.path.join(tempfile.mkdtemp(), "v1.jsonl")
+        with open(path, 'w') as f:
+            f.write('{"version": 1}\n[0.0,1,"LOGIN",{"username":"carol"}]\n'
+                    '[0.1,1,"CREATE_ROOM",{"room_name":"r"},"oldroom2"]\n')
+        assert [entry[4] for entry in read_capture(path)] == [None, None, "oldroom2"]
+        print("✅ Version 1 capture read back")
+        
+        # A message is captured before it is handled, even if its handler fails
+        import contextlib
+        import io
+        import socket
+        import threading
+        from main import ChessServer
+        from common.protocol import create_message
+        server = ChessServer()
+        server.recorder = TrafficRecorder(os.path.join(tempfile.mkdtemp(), "fail.jsonl"))
+        def fail(*args):
+            raise RuntimeError("handler failed")
+        server.dispatch = fail
+        server.running = True
+        server_side, client_side = socket.socketpair()
+        handler = threading.Thread(target=server.handle_client,
+                                   args=(server_side, "test"), daemon=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler.start()
+            client_side.sendall(create_message("CHAT", {"message": "boom"}).encode('utf-8'))
+            handler.join(5)
+        client_side.close()
+        server.recorder.close()
+        entries = list(read_capture(server.recorder.path))
+        assert [entry[2] for entry in entries] == ["CHAT", None]
+        print("✅ Message captured although its handler failed")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Traffic replay test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_metrics():
+    """Test metrics collection and text exposition"""
+    print("\n🧪 Testing metrics...")
+    
+    try:
+        from metrics import ServerMetrics
+        
+        metrics = ServerMetrics()
+        metrics.connection_opened()
+        metrics.message_handled("MOVE", 0.0003)
+        metrics.message_handled("NOT_A_TYPE", 0.002)
+        metrics.send_started()
+        metrics.send_finished("MOVE_UPDATE", 120)
+        metrics.add_collector(lambda: ["chess_players 2"])
+        
+        text = metrics.render()
+        assert "chess_connections 1" in text
+        assert 'chess_messages_received_total{type="MOVE"} 1' in text
+        assert 'chess_messages_received_total{type="other"} 1' in text
+        assert 'chess_handler_seconds_bucket{type="MOVE",le="0.0005"} 1' in text
+        assert "chess_outbound_bytes_total 120" in text
+        assert "chess_players 2" in text
+        print("✅ Metrics rendered in exposition format")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Metrics test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_player_store():
+    """Test persistent ratings and stats with write-behind"""
+    print("\n🧪 Testing player store...")
+    
+    try:
+        import contextlib
+        import io
+        import tempfile
+        import threading
+        import time
+        from common.constants import MSG_RESIGN, MSG_LEADERBOARD, RESULT_DRAW
+        from main import ChessServer
+        from player_store import PlayerStore
+        from benchmarks.server_harness import ServerHarness
+        
+        path = os.path.join(tempfile.mkdtemp(), "players.db")
+        harness = ServerHarness(ChessServer(player_db=path))
+        with contextlib.redirect_stdout(io.StringIO()):
+            white, black = harness.setup_game(0)
+            harness.send(white, MSG_RESIGN)
+            harness.send(white, MSG_RESIGN)  # Game already over, not counted again
+            
+            # Results racing on another game are recorded once
+            racers, _ = harness.setup_game(1)
+            room = harness.server.game_manager.rooms[racers.player.room_id]
+            store, record_game = harness.server.player_store, harness.server.player_store.record_game
+            store.record_game = lambda *args: (time.sleep(0.01), record_game(*args))  # Widen races
+            threads = [threading.Thread(target=harness.server.broadcast_game_over,
+                                        args=(room, RESULT_DRAW)) for _ in range(8)]
+            threads.append(threading.Thread(target=harness.server.leave_game,
+                                            args=(racers.player,)))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            del store.record_game
+            assert store.get("white1").games == 1
+            harness.server.run_rating_period()
+            harness.send(black, MSG_LEADERBOARD, {"page": 0})
+            for bad in ({"page": -1}, {"page": "x"}, {"page": float("inf")}, ["page"]):
+                harness.send(black, MSG_LEADERBOARD, bad)
+            assert black.socket.errors_sent == 4
+            black.socket.errors_sent = 0
+            harness.server.player_store.record_game("white0", "black0", RESULT_DRAW)
+            harness.server.shutdown()
+        assert harness.server.leaderboard.rank("black0") == 1
+        assert black.socket.errors_sent == 0
+        print("✅ Games recorded in memory and flushed on shutdown")
+        
+        store = PlayerStore(path)
+        record = store.get("white0")
+        assert (record.games, record.losses, record.draws) == (2, 1, 1)
+        assert record.rating < 1200 < store.get("black0").rating  # Rated on shutdown
+        assert store.get("black0").wins == 1
+        store.login("newcomer")
+        store.flush()
+        assert store.rows_written == 1
+        store.close()
+        assert PlayerStore(path).get("newcomer") is not None
+        print("✅ Ratings and stats survive a restart")
+        
+        # A batch the database refuses is queued again, not lost
+        import player_store
+        store = PlayerStore(path, flush_interval=0.01)
+        upsert, player_store.UPSERT = player_store.UPSERT, "INSERT INTO missing VALUES (?)"
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                store.record_game("retry", "newcomer", RESULT_DRAW)
+                assert not store.flush(timeout=0.3)
+                store.record_game("retry", "newcomer", RESULT_DRAW)  # Newer than the failed rows
+        finally:
+            player_store.UPSERT = upsert
+        assert store.flush(timeout=10)
+        assert store.close()
+        assert PlayerStore(path).get("retry").draws == 2
+        print("✅ Failed writes retried until they succeed")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Player store test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_glicko2():
+    """Test vectorized Glicko-2 against Glickman's worked example"""
+    print("\n🧪 Testing Glicko-2 ratings...")
+    
+    try:
+        import numpy as np
+        from ratings import rate_period
+        
+        ratings = np.array([1500.0, 1400.0, 1550.0, 1700.0])
+        rds = np.array([200.0, 30.0, 100.0, 300.0])
+        volatilities = np.full(4, 0.06)
+        white = np.array([0, 2, 3])
+        black = np.array([1, 0, 0])
+        scores = np.array([1.0, 1.0, 1.0])  # Player 0 beats 1, loses to 2 and 3
+        
+        ratings, rds, volatilities = rate_period(ratings, rds, volatilities,
+                                                 white, black, scores)
+        assert abs(ratings[0] - 1464.06) < 0.01
+        assert abs(rds[0] - 151.52) < 0.01
+        assert abs(volatilities[0] - 0.05999) < 1e-5
+        print(f"✅ Example player rated {ratings[0]:.2f} ± {rds[0]:.2f}")
+        
+        idle = rate_period(np.array([1500.0, 1500.0]), np.array([50.0, 50.0]),
+                           np.array([0.06, 0.06]), np.array([], dtype=np.int64),
+                           np.array([], dtype=np.int64), np.array([]))
+        assert idle[0][0] == 1500.0 and idle[1][0] > 50.0
+        print("✅ Idle players keep their rating and gain deviation")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Glicko-2 test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_leaderboard():
+    """Test incremental leaderboard against a full sort"""
+    print("\n🧪 Testing leaderboard...")
+    
+    try:
+        import random
+        from leaderboard import Leaderboard
+        
+        leaderboard = Leaderboard(page_size=10)
+        rng = random.Random(5)
+        ratings = {}
+        for i in range(2000):
+            username = f"p{rng.randrange(300)}"
+            ratings[username] = rng.uniform(800, 2400)
+            leaderboard.update(username, ratings[username])
+            if i % 7 == 0:
+                leaderboard.page(rng.randrange(30))  # Populate the page cache
+            if i % 13 == 0:
+                username = f"p{rng.randrange(300)}"
+                leaderboard.remove(username)
+                ratings.pop(username, None)
+        
+        order = sorted(ratings, key=lambda name: (-ratings[name], name))
+        assert [entry["username"] for entry in leaderboard.top(20)] == order[:20]
+        assert all(leaderboard.rank(name) == i + 1 for i, name in enumerate(order))
+        for page in range(len(order) // 10 + 1):
+            assert [entry["username"] for entry in leaderboard.page(page)] == \
+                order[page * 10:page * 10 + 10]
+        around = leaderboard.around(order[1], 3)
+        assert [entry["username"] for entry in around] == order[:7]  # Clipped at the top
+        print(f"✅ Top-K, ranks, cached pages and neighbours match ({len(order)} players)")
+        
+        small = Leaderboard(page_size=10, max_pages=4)
+        for i in range(100):
+            small.update(f"q{i}", 1000 + i)
+        for page in (0, 1, 2, 3, 0, 4, 10**12):
+            small.page(page)
+        assert list(small._pages) == [2, 3, 0, 4]  # Page 1 least recently read
+        assert small.page(10) == [] and 10 not in small._pages
+        print("✅ Page cache bounded; pages past the end not cached")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Leaderboard test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_tournament():
+    """Test Swiss pairing, tie-breaks and a tournament played through the server"""
+    print("\n🧪 Testing tournament...")
+    
+    try:
+        import contextlib
+        import io
+        from common.constants import (MSG_LOGIN, MSG_RESIGN, MSG_CREATE_TOURNAMENT,
+                                      MSG_JOIN_TOURNAMENT, MSG_START_TOURNAMENT)
+        from tournament import Standing, pair_round, record_result, TOURNAMENT_FINISHED
+        from benchmarks.server_harness import ServerHarness
+        
+        # Pairing: no rematches, top half meets bottom half in round one
+        standings = [Standing(f"p{i}", 2000 - i) for i in range(8)]
+        pairs, bye = pair_round(standings)
+        assert bye is None
+        assert sorted(sorted(s.username for s in pair) for pair in pairs) == \
+            [["p0", "p4"], ["p1", "p5"], ["p2", "p6"], ["p3", "p7"]]
+        
+        # Tie-breaks: p0 beats p1, then p1 beats p2
+        a, b, c = Standing("a", 0), Standing("b", 0), Standing("c", 0)
+        record_result(a, b, 1.0)
+        record_result(b, c, 1.0)
+        assert (a.buchholz, a.sonneborn_berger) == (1.0, 1.0)
+        assert (b.buchholz, b.sonneborn_berger) == (1.0, 0.0)
+        
+        harness = ServerHarness()
+        players = [harness.connect() for _ in range(5)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, connection in enumerate(players):
+                harness.send(connection, MSG_LOGIN, {"username": f"swiss{i}"})
+            harness.send(players[0], MSG_CREATE_TOURNAMENT, {"name": "Cup", "rounds": 3})
+            tournament = next(iter(harness.server.tournaments.tournaments.values()))
+            for connection in players[1:]:
+                harness.send(connection, MSG_JOIN_TOURNAMENT,
+                             {"tournament_id": tournament.tournament_id})
+            harness.send(players[0], MSG_START_TOURNAMENT,
+                         {"tournament_id": tournament.tournament_id})
+            
+            while tournament.status != TOURNAMENT_FINISHED:
+                assert len(tournament.pending) == 2  # Whole round launched at once
+                for white, _ in list(tournament.pending.values()):
+                    loser = next(c for c in players if c.player.username == white.username)
+                    harness.send(loser, MSG_RESIGN)
+        
+        ranked = tournament.ranked()
+        assert tournament.round == 3
+        assert sum(s.score for s in ranked) == 3 * 2 + 3  # Two games and a bye per round
+        assert all(len(s.opponents) == len(s.games) for s in ranked)  # No rematches
+        print(f"✅ Pairings, tie-breaks and a 3-round event "
+              f"(winner {ranked[0].username} on {ranked[0].score})")
+        
+        # A player who drops mid-round forfeits, and later rounds still run
+        players = [harness.connect() for _ in range(4)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, connection in enumerate(players):
+                harness.send(connection, MSG_LOGIN, {"username": f"drop{i}"})
+            tournament = harness.server.tournaments.create("Drop", 2, players[0].player)
+            for connection in players:
+                tournament.register(connection.player)
+            harness.server.start_tournament_round(tournament)
+            
+            white, black = next(iter(tournament.pending.values()))
+            leaver = next(c for c in players if c.player.username == black.username)
+            harness.server.leave_game(leaver.player, disconnect=True)
+            assert tournament.round == 1 and len(tournament.pending) == 1
+            assert (white.score, black.score) == (1.0, 0.0)
+            for white, _ in list(tournament.pending.values()):
+                loser = next(c for c in players if c.player.username == white.username)
+                harness.send(loser, MSG_RESIGN)
+            assert tournament.round == 2  # Next round paired without the leaver's result
+            
+            # The leaver is offline, so their round two game is forfeited at pairing
+            assert len(tournament.pending) == 1
+            for white, _ in list(tournament.pending.values()):
+                loser = next(c for c in players if c.player.username == white.username)
+                harness.send(loser, MSG_RESIGN)
+        
+        assert tournament.status == TOURNAMENT_FINISHED
+        assert tournament.standings[black.username].score == 0.0
+        print("✅ Player dropping mid-round forfeits and the event finishes")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Tournament test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_simul():
+    """Test one simul host playing several boards over a coalesced stream"""
+    print("\n🧪 Testing simul...")
+    
+    try:
+        import contextlib
+        import io
+        import json
+        from common.constants import (MSG_LOGIN, MSG_MOVE, MSG_CREATE_SIMUL, MSG_JOIN_SIMUL,
+                                      MSG_SIMUL_UPDATE, MSG_MOVE_UPDATE,
+                                      STATUS_FINISHED)
+        from benchmarks.server_harness import ServerHarness
+        
+        harness = ServerHarness()
+        sent = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            host = harness.connect()
+            harness.send(host, MSG_LOGIN, {"username": "coach"})
+            host.socket.sendall = sent.append  # Keep what reaches the host
+            harness.send(host, MSG_CREATE_SIMUL, {"boards": 3})
+            simul = harness.server.simuls.hosts["coach"]
+            students = []
+            for i in range(3):
+                student = harness.connect()
+                harness.send(student, MSG_LOGIN, {"username": f"student{i}"})
+                harness.send(student, MSG_JOIN_SIMUL, {"simul_id": simul.simul_id})
+                students.append(student)
+            
+            # Each board is addressed by room; the host keeps no room of their own
+            assert host.player.room_id is None
+            for student in students:
+                room_id = student.player.room_id
+                harness.send(host, MSG_MOVE, {"from": "e2", "to": "e4", "room_id": room_id})
+                harness.send(student, MSG_MOVE, {"from": "e7", "to": "e5"})
+                harness.send(host, MSG_MOVE, {"from": "g1", "to": "f3", "room_id": room_id})
+            assert all(harness.server.game_manager.rooms[s.player.room_id].game
+                       .get_current_turn() == "black" for s in students)
+            
+            sent.clear()
+            assert harness.server.simuls.flush() == 3 + 3  # Game starts + latest move per board
+            assert len(sent) == 1
+            update = json.loads(sent[0])
+            assert update["type"] == MSG_SIMUL_UPDATE
+            moves = [u for u in update["data"]["updates"] if u["type"] == MSG_MOVE_UPDATE]
+            assert [u["data"]["to"] for u in moves] == ["f3"] * 3
+            
+            # A departing opponent forfeits their board
+            board = harness.server.game_manager.rooms[students[0].player.room_id]
+            harness.server.leave_game(students[0].player, disconnect=True)
+            assert board.status == STATUS_FINISHED
+            assert simul.to_dict()["playing"] == 2
+            
+            # A departing host forfeits unfinished boards
+            rooms = list(simul.boards.values())
+            harness.server.end_simul(host.player)
+            assert all(room.status == STATUS_FINISHED for room in rooms)
+            assert harness.server.simuls.flush() == 0
+        
+        print(f"✅ 3 boards, {simul.queued} host updates in one message of {len(moves) + 3}")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Simul test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_move_tracing():
+    """Test per-stage move latency traces on server and client"""
+    print("\n🧪 Testing move tracing...")
+    
+    try:
+        import contextlib
+        import io
+        from common.constants import MSG_MOVE
+        from common.tracing import (TraceAggregator, new_trace, get_trace, stamp,
+                                    STAGE_CLIENT_RECEIVE, STAGE_RENDERED)
+        from benchmarks.server_harness import ServerHarness
+        
+        harness = ServerHarness()
+        with contextlib.redirect_stdout(io.StringIO()):
+            white, black = harness.setup_game(0)
+            data = {"from": "e2", "to": "e4", "promotion": None, "trace": new_trace()}
+            harness.send(white, MSG_MOVE, data)
+        
+        summary = harness.server.traces.summary()
+        assert list(summary) == ["client_send→validated", "validated→encoded",
+                                 "encoded→sent_white", "sent_white→sent_black"]
+        assert len(data["trace"]["stages"]) == 2  # Wire copy stops at validation
+        print("✅ Server recorded per-stage breakdown")
+        
+        client = TraceAggregator()
+        stamp(get_trace(data), STAGE_CLIENT_RECEIVE)
+        stamp(get_trace(data), STAGE_RENDERED)
+        client.record(data["trace"])
+        assert "client_receive→rendered" in client.summary()
+        assert get_trace({"trace": "bogus"}) is None
+        print("✅ Client recorded receive and redraw stages")
+        
+        hostile = TraceAggregator()
+        hostile.record({"stages": [["client_send", 0], ['x"} 1\nfake', 1], [["list"], 2],
+                                   ["rendered", 3], ["client_receive", "nan?"]]})
+        hostile.record({"stages": [["client_send", i] for i in range(1000)]})
+        assert list(hostile.summary()) == [] and hostile.traces == 1
+        assert get_trace({"trace": {"stages": [["client_send", 0]] * 1000}}) is None
+        print("✅ Unknown stages and oversized traces ignored")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Move tracing test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_admin_diagnostics():
+    """Test admin-only profiling and allocation snapshots"""
+    print("\n🧪 Testing admin diagnostics...")
+    
+    try:
+        import tempfile
+        from common.constants import MSG_ADMIN, MSG_LOGIN, MSG_CREATE_SIMUL, MSG_JOIN_SIMUL
+        from main import ChessServer
+        from benchmarks.server_harness import ServerHarness
+        
+        output_dir = tempfile.mkdtemp()
+        harness = ServerHarness(ChessServer(admin_token="secret", profile_dir=output_dir))
+        connection = harness.connect()
+        harness.send(connection, MSG_ADMIN, {"token": "wrong", "command": "status"})
+        harness.send(connection, MSG_ADMIN, {"token": "sécret", "command": "status"})
+        assert connection.socket.errors_sent == 2
+        assert not os.listdir(output_dir)
+        print("✅ Bad admin token rejected")
+        
+        for options in ({"interval": "fast"}, {"interval": 0}, {"interval": -1},
+                        {"interval": float("nan")}, ["interval"]):
+            harness.send(connection, MSG_ADMIN,
+                         {"token": "secret", "command": "profile_start", "options": options})
+        assert connection.socket.errors_sent == 2 + 5
+        assert not harness.server.diagnostics.profiler
+        print("✅ Invalid sampling intervals rejected")
+        
+        diagnostics = harness.server.diagnostics
+        assert diagnostics._prefix("snapshot") != diagnostics._prefix("snapshot")
+        diagnostics.run("snapshot")  # Starts allocation tracing
+        assert diagnostics.run("profile_start", {"interval": 1e-9})["interval"] == 0.001  # Clamped
+        harness.play(games=2, plies=30, seed=3)
+        result = diagnostics.run("profile_stop")
+        assert all(os.path.exists(path) for path in result["files"])
+        print(f"✅ Profile written ({result['samples']} busy samples)")
+        
+        # Queued updates for a simul host are held in simul.py
+        host = harness.connect()
+        harness.send(host, MSG_LOGIN, {"username": "diag_host"})
+        harness.send(host, MSG_CREATE_SIMUL, {"boards": 1})
+        student = harness.connect()
+        harness.send(student, MSG_LOGIN, {"username": "diag_student"})
+        harness.send(student, MSG_JOIN_SIMUL,
+                     {"simul_id": harness.server.simuls.hosts["diag_host"].simul_id})
+        
+        result = diagnostics.run("snapshot")
+        diagnostics.run("snapshot_stop")
+        assert all(os.path.exists(path) for path in result["files"])
+        assert {"rooms", "engines", "queues"} <= set(result["subsystems"])
+        print(f"✅ Allocation snapshot grouped into {sorted(result['subsystems'])}")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Admin diagnostics test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_ai_search():
+    """Test the AI search and its transposition table"""
+    print("\n🧪 Testing AI search...")
+    
+    try:
+        import chess
+        from client.ai.chess_ai import ChessAI, MATE_SCORE
+        from client.ai.transposition import (TranspositionTable, BOUND_LOWER,
+                                             encode_move, decode_move)
+        
+        table = TranspositionTable(1024)
+        move = chess.Move.from_uci("e7e8q")
+        table.store(12345, 7, BOUND_LOWER, -321, encode_move(move))
+        assert table.probe(12345) == (7, BOUND_LOWER, -321, encode_move(move))
+        assert decode_move(table.probe(12345)[3]) == move
+        # A shallower result from the same search keeps the deep one
+        table.store(12345 + 1024 * 8, 2, BOUND_LOWER, 5, 0)
+        assert table.probe(12345)[0] == 7 and table.probe(12345 + 1024 * 8)[0] == 2
+        print("✅ Table entries pack, unpack and keep the deeper result")
+        
+        # Scholar's mate is found, and counted as mate in one
+        board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4")
+        ai = ChessAI('hard')
+        assert ai.get_move(board) == chess.Move.from_uci("h5f7")
+        assert ai.last_search["score"] == MATE_SCORE - 1
+        assert board.fen().endswith("4 4")  # The caller's board is left alone
+        
+        # Transposed leaves are found in the table
+        board = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        with_tt, without_tt = ChessAI('hard'), ChessAI('hard', tt_entries=0)
+        assert with_tt._get_minimax_move(board, 3) == without_tt._get_minimax_move(board, 3)
+        assert with_tt.last_search["score"] == without_tt.last_search["score"]
+        assert with_tt.last_search["tt_hit_rate"] > 0
+        print(f"✅ Mate found; {with_tt.last_search['nodes']} nodes with the table, "
+              f"{without_tt.last_search['nodes']} without")
+        
+        # Ordering: table move, captures by MVV-LVA, killers, then the rest
+        from client.ai.move_ordering import MoveOrderer
+        orderer = MoveOrderer()
+        board = chess.Board("4k3/8/3r4/q1P5/2N5/8/3P4/4K2R w K - 0 1")
+        orderer.record_cutoff(board, chess.Move.from_uci("h1h7"), 3, 1)
+        ordered = orderer.order(board, list(board.legal_moves), chess.Move.from_uci("e1g1"), 1)
+        assert [move.uci() for move in ordered[:5]] == ["e1g1", "c4a5", "c5d6", "c4d6", "h1h7"]
+        print("✅ Table move, captures by MVV-LVA, then killers")
+        
+        # Quiescence sees the recapture that a plain depth-1 search misses
+        from client.ai.see import static_exchange
+        from client.ai.chess_ai import PIECE_VALUES
+        board = chess.Board("4k3/8/3p4/4p3/8/8/8/Q3K3 w - - 0 1")
+        greedy = chess.Move.from_uci("a1e5")
+        assert static_exchange(board, greedy, PIECE_VALUES) == -800
+        careful, blind = ChessAI('hard'), ChessAI('hard', quiescence=False)
+        assert blind._get_minimax_move(board, 1) == greedy
+        assert careful._get_minimax_move(board, 1) != greedy
+        print(f"✅ Static exchange and quiescence ({careful.last_search['qnodes']} capture nodes)")
+        
+        # Incremental evaluation matches a fresh count through castling,
+        # en passant and promotion, and unwinds with the board
+        import random
+        from client.ai.evaluation import Evaluator, material_and_squares
+        evaluator = Evaluator()
+        rng = random.Random(7)
+        for fen in (chess.STARTING_FEN, "r3k2r/1P4pp/8/3pP3/8/8/6PP/R3K2R w KQkq d6 0 1"):
+            board = chess.Board(fen)
+            evaluator.reset(board)
+            for _ in range(60):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                move = rng.choice(moves)
+                evaluator.push(board, move)
+                board.push(move)
+                assert evaluator.scores[-1] == material_and_squares(board)
+            while board.move_stack:
+                board.pop()
+                evaluator.pop()
+            assert evaluator.scores == [material_and_squares(board)]
+        mirrored = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        evaluator.reset(mirrored)
+        score = evaluator.evaluate(mirrored)
+        mirrored = mirrored.mirror()
+        evaluator.reset(mirrored)
+        assert evaluator.evaluate(mirrored) == score
+        searched = ChessAI('hard')
+        searched._get_minimax_move(mirrored, 3)
+        assert len(searched.evaluator.scores) == 1  # Every push was popped
+        print("✅ Incremental evaluation matches a full count and is symmetric")
+        
+        # PVS and aspiration windows keep plain alpha-beta's result; the
+        # pruning cuts nodes, and null moves are never tried with only pawns
+        board = chess.Board("r3k2r/pp1n1ppp/2p1pn2/q7/1bPP4/2N1PN2/P2B1PPP/R2QKB1R w KQkq - 0 10")
+        plain = ChessAI('hard', null_move=False, lmr=False, futility=False, pvs=False,
+                        aspiration=False)
+        exact = ChessAI('hard', null_move=False, lmr=False, futility=False)
+        selective = ChessAI('hard')
+        assert plain._get_minimax_move(board, 4) == exact._get_minimax_move(board, 4)
+        assert plain.last_search["score"] == exact.last_search["score"]
+        selective._get_minimax_move(board, 4)
+        nodes = selective.last_search["nodes"]
+        assert nodes < plain.last_search["nodes"]
+        assert selective.last_search["null_cutoffs"] > 0
+        pawns = chess.Board("8/8/4k3/8/2p5/8/1P2K3/8 w - - 0 1")
+        selective._get_minimax_move(pawns, 5)
+        assert selective.last_search["null_cutoffs"] == 0
+        print(f"✅ Selective search: depth 4 in {nodes} nodes, "
+              f"{plain.last_search['nodes']} without pruning")
+        
+        # Budgets stop the deepening; the last finished iteration's move is played
+        import time
+        budgeted = ChessAI('hard', node_limit=800)
+        move = budgeted.get_move(board)
+        assert move in board.legal_moves and budgeted.last_search["nodes"] <= 801
+        timed = ChessAI('hard', time_limit=0.3)
+        start = time.perf_counter()
+        timed.get_move(board)
+        assert time.perf_counter() - start < 0.6 and timed.last_search["depth"] >= 1
+        print(f"✅ Node budget reached depth {budgeted.last_search['depth']}, "
+              f"0.3 s budget reached depth {timed.last_search['depth']}")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ AI search test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_ai_background():
+    """Test searching for AI moves off the calling thread"""
+    print("\n🧪 Testing AI background search...")
+    
+    try:
+        import queue
+        import time
+        import chess
+        from client.ai.chess_ai import ChessAI, AIOpponent
+        
+        board = chess.Board("r3k2r/pp1n1ppp/2p1pn2/q7/1bPP4/2N1PN2/P2B1PPP/R2QKB1R w KQkq - 0 10")
+        ai = ChessAI('hard', time_limit=float('inf'))
+        # Callbacks are queued for this thread, as root.after would for Tk
+        main_loop = queue.Queue()
+        progress, done = [], []
+        start = time.perf_counter()
+        handle = ai.start_search(board, progress.append, done.append, main_loop.put)
+        assert time.perf_counter() - start < 0.1 and not handle.done()
+        move = handle.result(timeout=0.4)
+        assert move in board.legal_moves and move == handle.best_move
+        while not main_loop.empty():
+            main_loop.get()()
+        assert done == [move] and [info["depth"] for info in progress][0] == 1
+        assert progress[-1]["move"] == move
+        print(f"✅ Timed out after depth {progress[-1]['depth']} with the best move so far")
+        
+        opponent = AIOpponent(difficulty='hard')
+        opponent.ai.time_limit = float('inf')
+        done = []
+        handle = opponent.start_move(board, on_done=done.append)
+        time.sleep(0.1)
+        opponent.cancel_move()
+        assert handle.done() and handle.future.result() is None and done == []
+        handle = opponent.start_move(board)
+        handle.stop()
+        assert handle.result() in board.legal_moves  # Stopped before depth 1 finished
+        opponent.close()
+        print("✅ Cancelled search reports nothing; a stopped one still moves")
+        
+        # Pondering: a hit keeps the search begun on the opponent's time
+        board = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        ai = ChessAI('hard', time_limit=0.3)
+        board.push(ai.get_move(board))
+        expected = ai.ponder(board)
+        assert expected in board.legal_moves
+        time.sleep(0.3)
+        board.push(expected)
+        start = time.perf_counter()
+        move = ai.get_move(board)
+        assert move in board.legal_moves and ai.ponder_hits == 1
+        assert time.perf_counter() - start < 0.6 and ai.last_search["time_s"] >= 0.55
+        print(f"✅ Ponder hit thought {ai.last_search['time_s']:.2f} s on a 0.3 s budget")
+        
+        board.push(move)
+        expected = ai.ponder(board)
+        board.push(next(reply for reply in board.legal_moves if reply != expected))
+        done = []
+        handle = ai.start_search(board, on_done=done.append)
+        assert handle.result() in board.legal_moves and ai.ponder_misses == 1
+        assert done == [handle.result()]
+        print("✅ Ponder miss cancelled and searched afresh")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ AI background search test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_opening_book():
+    """Test building and probing a Polyglot opening book"""
+    print("\n🧪 Testing opening book...")
+    
+    try:
+        import tempfile
+        import chess
+        import chess.polyglot
+        from client.ai.chess_ai import ChessAI
+        from client.ai.opening_book import OpeningBook, build_book
+        
+        directory = tempfile.mkdtemp()
+        pgn_path = os.path.join(directory, "games.pgn")
+        book_path = os.path.join(directory, "book.bin")
+        with open(pgn_path, "w") as pgn:
+            pgn.write('[Result "1-0"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. O-O 1-0\n\n'
+                      '[Result "1/2-1/2"]\n\n1. e4 c5 2. Nf3 1/2-1/2\n\n'
+                      '[Result "0-1"]\n\n1. d4 d5 0-1\n\n'
+                      '[Result "*"]\n\n1. c4 *\n')
+        # Moves by the losing side and from unfinished games are left out
+        assert build_book([pgn_path], book_path) == 7
+        book = OpeningBook(book_path)
+        start = chess.Board()
+        assert book.moves(start) == [(chess.Move.from_uci("e2e4"), 3)]
+        castle = chess.Board("r1bqkbnr/1ppp1ppp/p1n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 0 4")
+        assert book.moves(castle) == [(chess.Move.from_uci("e1g1"), 2)]
+        with chess.polyglot.open_reader(book_path) as reader:
+            assert [entry.move for entry in reader.find_all(castle)] == [castle.parse_uci("e1g1")]
+        after_e4 = chess.Board()
+        after_e4.push_uci("e2e4")
+        assert book.moves(after_e4) == [(chess.Move.from_uci("c7c5"), 1)]
+        book.close()
+        print("✅ Book built from PGN, castling stored the Polyglot way")
+        
+        ai = ChessAI('hard', time_limit=0.2, book=book_path)
+        assert ai.get_move(start) == chess.Move.from_uci("e2e4") and ai.last_search["book"]
+        assert ai.get_move(castle) == chess.Move.from_uci("e1g1")
+        assert ai.get_move(after_e4) == chess.Move.from_uci("c7c5")
+        out_of_book = chess.Board(
+            "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        assert ai.get_move(out_of_book) in out_of_book.legal_moves
+        assert "book" not in ai.last_search
+        ai.close()
+        
+        empty_path = os.path.join(directory, "empty.bin")
+        open(empty_path, "wb").close()
+        assert OpeningBook(empty_path).choose(start) is None
+        print("✅ AI plays book moves, then searches once out of book")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Opening book test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_endgame_bitbases():
+    """Test generating, caching and probing the endgame bitbases"""
+    print("\n🧪 Testing endgame bitbases...")
+    
+    try:
+        import tempfile
+        import chess
+        from client.ai.bitbase import Bitbases, BITBASE_BYTES
+        from client.ai.chess_ai import ChessAI, KNOWN_WIN
+        
+        directory = tempfile.mkdtemp()
+        bitbases = Bitbases(directory)
+        assert bitbases.probe(chess.Board("8/8/8/4k3/8/8/8/KQ6 w - - 0 1")) is None  # Not loaded
+        bitbases.warm_up().join()
+        cases = [
+            ("8/8/8/8/k7/8/7P/K7 w - - 0 1", 1),  # The pawn outruns the king
+            ("7k/8/8/8/8/8/7P/7K w - - 0 1", 0),  # Rook pawn, king in the corner
+            ("8/8/8/8/8/8/3kP3/7K b - - 0 1", 0),  # The pawn is lost
+            ("4k3/8/4K3/4P3/8/8/8/8 b - - 0 1", -1),  # King ahead of the pawn
+            ("4k3/4P3/4K3/8/8/8/8/8 b - - 0 1", 0),  # Stalemate
+            ("8/8/8/4k3/8/8/8/KQ6 w - - 0 1", 1),
+            ("8/8/8/8/8/8/kQ6/7K b - - 0 1", 0),  # The queen is lost
+            ("8/8/8/4k3/8/8/8/R3K3 b - - 0 1", -1),
+            ("8/8/8/4k3/8/8/8/RN2K3 w - - 0 1", None),  # Not covered
+        ]
+        for fen, expected in cases:
+            board = chess.Board(fen)
+            assert bitbases.probe(board) == expected, fen
+            assert bitbases.probe(board.mirror()) == expected, fen
+        assert bitbases.generated == 3
+        assert os.path.getsize(bitbases.path(chess.PAWN)) == BITBASE_BYTES
+        bitbases.close()
+        
+        # Tables on disk are mapped, not generated again
+        cached = Bitbases(directory)
+        cached.warm_up().join()
+        assert cached.probe(chess.Board(cases[0][0])) == 1 and cached.generated == 0
+        assert not Bitbases().directory.startswith(os.getcwd())
+        print("✅ KPK, KRK and KQK results correct, tables cached on disk")
+        
+        ai = ChessAI('hard', node_limit=3000)
+        ai.bitbases = cached
+        assert ai._evaluate_board(chess.Board(cases[1][0])) == 0
+        assert ai._evaluate_board(chess.Board(cases[0][0])) > KNOWN_WIN
+        board = chess.Board("8/8/8/8/8/k7/8/KR6 w - - 0 1")
+        for _ in range(40):
+            if board.is_game_over():
+                break
+            board.push(ai.get_move(board) if board.turn == chess.WHITE
+                       else next(iter(board.legal_moves)))
+        assert board.is_checkmate()
+        cached.close()
+        print("✅ AI scores drawn endings as draws and mates with the rook")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Endgame bitbase test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 def test_protocol():
     """Test message protocol"""
     print("\n🧪 Testing protocol...")
     
     try:
-        from common.protocol import create_message, parse_message
+        from common.protocol import create_message, parse_message, decode_messages
         
         # Test create message
         msg = create_message("TEST", {"data": "test_value"})
@@ -160,8 +1258,44 @@ def test_protocol():
         assert parsed["data"]["data"] == "test_value"
         print("✅ Message parsed correctly")
         
-        return True
+        # Test several messages arriving in one read
+        messages, rest = decode_messages(msg + create_message("NEXT") + msg[:10])
+        assert [m["type"] for m in messages] == ["TEST", "NEXT"]
+        assert rest == msg[:10]
+        print("✅ Concatenated messages split correctly")
         
+        # Bad input becomes an ERROR and the stream carries on after it
+        messages, rest = decode_messages('garbage{"type":"A"}[1]{"type": tru}' + msg[:10])
+        assert [m["type"] for m in messages] == ["ERROR", "A", "ERROR", "ERROR"]
+        assert rest == msg[:10]
+        for i in range(len(msg)):
+            assert decode_messages(msg[:i]) == ([], msg[:i])
+        print("✅ Malformed input skipped, partial messages kept")
+        
+        import socket
+        from common.protocol import MessageReader
+        server_side, client_side = socket.socketpair()
+        reader = MessageReader(server_side, 4096, max_size=100)
+        client_side.sendall(b'{"type": "' + b"x" * 200)
+        assert reader.read() is None and reader.overflowed
+        server_side.close()
+        client_side.close()
+        print("✅ Oversized message drops the connection")
+        
+        server_side, client_side = socket.socketpair()
+        reader = MessageReader(server_side, 4096)
+        encoded = '{"type": "CHAT", "data": {"message": "é"}}'.encode('utf-8')
+        split = encoded.index("é".encode('utf-8')) + 1
+        client_side.sendall(b'{"type": "\xff\xfe"}' + encoded[:split])
+        assert [m["type"] for m in reader.read()] == ["\ufffd\ufffd"]
+        client_side.sendall(encoded[split:])
+        assert reader.read()[0]["data"]["message"] == "é"
+        server_side.close()
+        client_side.close()
+        print("✅ Invalid UTF-8 replaced, split characters joined")
+        
+        return True
+    
     except Exception as e:
         print(f"❌ Protocol test failed: {e}")
         import traceback
@@ -186,7 +1320,7 @@ def test_ui_components():
         print("✅ Button style generated")
         
         return True
-        
+    
     except Exception as e:
         print(f"❌ UI components test failed: {e}")
         import traceback
@@ -204,7 +1338,24 @@ def main():
     
     results.append(("Imports", test_imports()))
     results.append(("Chess Engine", test_chess_engine()))
+    results.append(("Packed Engine", test_packed_engine()))
+    results.append(("Position Keys", test_position_keys()))
+    results.append(("Batch Replay", test_batch_replay()))
     results.append(("Game Manager", test_game_manager()))
+    results.append(("Server Dispatch", test_server_dispatch()))
+    results.append(("Traffic Replay", test_traffic_replay()))
+    results.append(("Metrics", test_metrics()))
+    results.append(("Player Store", test_player_store()))
+    results.append(("Glicko-2", test_glicko2()))
+    results.append(("Leaderboard", test_leaderboard()))
+    results.append(("Tournament", test_tournament()))
+    results.append(("Simul", test_simul()))
+    results.append(("Move Tracing", test_move_tracing()))
+    results.append(("Admin Diagnostics", test_admin_diagnostics()))
+    results.append(("AI Search", test_ai_search()))
+    results.append(("AI Background", test_ai_background()))
+    results.append(("Opening Book", test_opening_book()))
+    results.append(("Endgame Bitbases", test_endgame_bitbases()))
     results.append(("Protocol", test_protocol()))
     results.append(("UI Components", test_ui_components()))
     